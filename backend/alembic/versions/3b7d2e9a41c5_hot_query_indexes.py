@@ -0,0 +1,70 @@
+"""Hot query indexes
+
+Revision ID: 3b7d2e9a41c5
+Revises: 8548e1c614b0
+Create Date: 2026-10-19 09:00:00.000000
+
+Partial composite indexes for the queries that run on every chat turn and
+list request: messages by conversation / shared conversation / user / agent
+ordered by (created_at, id), conversations by user newest first, and the
+per-user conversations that have a summary embedding. All of them filter on
+``status = 1`` so soft-deleted rows are left out of the indexes.
+
+Indexes are built CONCURRENTLY so the migration does not lock the tables.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d2e9a41c5'
+down_revision: Union[str, Sequence[str], None] = '8548e1c614b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE = sa.text('status = 1')
+
+INDEXES = [
+    ('ix_message_conversation_created_active', 'message',
+     ['conversation_id', 'created_at', 'id'], ACTIVE),
+    ('ix_message_shared_conversation_created_active', 'message',
+     ['shared_conversation_id', 'created_at', 'id'], ACTIVE),
+    ('ix_message_user_created_active', 'message',
+     ['user_id', 'created_at', 'id'], ACTIVE),
+    ('ix_message_agent_created_active', 'message',
+     ['agent_id', 'created_at', 'id'], ACTIVE),
+    ('ix_conversation_user_created_active', 'conversation',
+     ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], ACTIVE),
+    ('ix_conversation_user_embedding_active', 'conversation',
+     ['user_id'], sa.text('status = 1 AND summary_embedding IS NOT NULL')),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=False,
+                postgresql_where=where,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+    op.execute('ANALYZE message')
+    op.execute('ANALYZE conversation')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
@@ -0,0 +1,155 @@
+"""Conversation overview read model
+
+Revision ID: 6d1a9b3e8f20
+Revises: c5f8a2d17b36
+Create Date: 2026-10-19 12:00:00.000000
+
+``conversation_overview`` holds per-conversation sidebar data (counts, last
+message snippet and time, latest replying agent). Triggers on ``message``
+keep it current inside the writing transaction:
+
+- AFTER INSERT (statement level): incremental upsert per conversation
+- AFTER UPDATE (statement level): rows whose status or content changed
+  (soft deletes, edits) get their conversations recomputed from
+  ``message`` via the partial index from 3b7d2e9a41c5
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d1a9b3e8f20'
+down_revision: Union[str, Sequence[str], None] = 'c5f8a2d17b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+REBUILD_FUNCTION = """
+CREATE OR REPLACE FUNCTION conversation_overview_rebuild(ids integer[]) RETURNS void AS $$
+BEGIN
+    DELETE FROM conversation_overview WHERE conversation_id = ANY(ids);
+    INSERT INTO conversation_overview
+        (conversation_id, message_count, user_message_count, agent_message_count,
+         last_message_at, last_message_preview, last_message_role, active_agent_id)
+    SELECT c.id, s.total, s.users, s.agents,
+           l.created_at, left(l.content, 200), l.role, a.agent_id
+    FROM conversation c
+    CROSS JOIN LATERAL (
+        SELECT count(*) AS total,
+               count(*) FILTER (WHERE user_id IS NOT NULL) AS users,
+               count(*) FILTER (WHERE agent_id IS NOT NULL) AS agents
+        FROM message WHERE conversation_id = c.id AND status = 1
+    ) s
+    LEFT JOIN LATERAL (
+        SELECT created_at, content, role FROM message
+        WHERE conversation_id = c.id AND status = 1
+        ORDER BY created_at DESC, id DESC LIMIT 1
+    ) l ON true
+    LEFT JOIN LATERAL (
+        SELECT agent_id FROM message
+        WHERE conversation_id = c.id AND status = 1 AND agent_id IS NOT NULL
+        ORDER BY created_at DESC, id DESC LIMIT 1
+    ) a ON true
+    WHERE c.id = ANY(ids);
+END;
+$$ LANGUAGE plpgsql
+"""
+
+INSERT_FUNCTION = """
+CREATE OR REPLACE FUNCTION conversation_overview_on_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO conversation_overview AS o
+        (conversation_id, message_count, user_message_count, agent_message_count,
+         last_message_at, last_message_preview, last_message_role, active_agent_id)
+    SELECT n.conversation_id,
+           count(*),
+           count(*) FILTER (WHERE n.user_id IS NOT NULL),
+           count(*) FILTER (WHERE n.agent_id IS NOT NULL),
+           max(n.created_at),
+           (array_agg(left(n.content, 200) ORDER BY n.created_at DESC, n.id DESC))[1],
+           (array_agg(n.role ORDER BY n.created_at DESC, n.id DESC))[1],
+           (array_agg(n.agent_id ORDER BY n.created_at DESC, n.id DESC)
+                FILTER (WHERE n.agent_id IS NOT NULL))[1]
+    FROM new_rows n
+    WHERE n.conversation_id IS NOT NULL AND n.status = 1
+    GROUP BY n.conversation_id
+    ON CONFLICT (conversation_id) DO UPDATE SET
+        message_count = o.message_count + EXCLUDED.message_count,
+        user_message_count = o.user_message_count + EXCLUDED.user_message_count,
+        agent_message_count = o.agent_message_count + EXCLUDED.agent_message_count,
+        last_message_at = GREATEST(o.last_message_at, EXCLUDED.last_message_at),
+        last_message_preview = CASE WHEN o.last_message_at IS NULL OR EXCLUDED.last_message_at >= o.last_message_at
+            THEN EXCLUDED.last_message_preview ELSE o.last_message_preview END,
+        last_message_role = CASE WHEN o.last_message_at IS NULL OR EXCLUDED.last_message_at >= o.last_message_at
+            THEN EXCLUDED.last_message_role ELSE o.last_message_role END,
+        active_agent_id = COALESCE(EXCLUDED.active_agent_id, o.active_agent_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+UPDATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION conversation_overview_on_update() RETURNS trigger AS $$
+DECLARE
+    ids integer[];
+BEGIN
+    SELECT array_agg(DISTINCT n.conversation_id) INTO ids
+    FROM new_rows n JOIN old_rows o ON o.id = n.id
+    WHERE n.conversation_id IS NOT NULL
+      AND (n.status IS DISTINCT FROM o.status
+           OR n.content IS DISTINCT FROM o.content
+           OR n.conversation_id IS DISTINCT FROM o.conversation_id);
+    IF ids IS NOT NULL THEN
+        PERFORM conversation_overview_rebuild(ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('conversation_overview',
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('user_message_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('agent_message_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_message_at', sa.DateTime(), nullable=True),
+    sa.Column('last_message_preview', sa.String(length=200), nullable=True),
+    sa.Column('last_message_role', sa.Integer(), nullable=True),
+    sa.Column('active_agent_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['conversation_id'], ['conversation.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('conversation_id')
+    )
+
+    op.execute(REBUILD_FUNCTION)
+    op.execute(INSERT_FUNCTION)
+    op.execute(UPDATE_FUNCTION)
+    op.execute("""
+    CREATE TRIGGER conversation_overview_on_insert
+    AFTER INSERT ON message
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION conversation_overview_on_insert()
+    """)
+    op.execute("""
+    CREATE TRIGGER conversation_overview_on_update
+    AFTER UPDATE ON message
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION conversation_overview_on_update()
+    """)
+
+    # Backfill every existing conversation
+    op.execute("SELECT conversation_overview_rebuild(ARRAY(SELECT id FROM conversation))")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS conversation_overview_on_update ON message")
+    op.execute("DROP TRIGGER IF EXISTS conversation_overview_on_insert ON message")
+    op.execute("DROP FUNCTION IF EXISTS conversation_overview_on_update()")
+    op.execute("DROP FUNCTION IF EXISTS conversation_overview_on_insert()")
+    op.execute("DROP FUNCTION IF EXISTS conversation_overview_rebuild(integer[])")
+    op.drop_table('conversation_overview')
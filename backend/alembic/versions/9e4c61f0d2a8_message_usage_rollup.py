@@ -0,0 +1,83 @@
+"""Message usage rollup
+
+Revision ID: 9e4c61f0d2a8
+Revises: 3b7d2e9a41c5
+Create Date: 2026-10-19 10:00:00.000000
+
+Per-user and per-agent message totals kept up to date by a statement-level
+AFTER INSERT trigger on ``message``. The trigger aggregates the inserted
+rows (transition table) once per statement, so a bulk insert costs one
+upsert per distinct user/agent rather than one per row.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4c61f0d2a8'
+down_revision: Union[str, Sequence[str], None] = '3b7d2e9a41c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Shared by the trigger (over the inserted rows) and the backfill (over the
+# whole table); {source} is the relation to aggregate.
+UPSERT_SQL = """
+    INSERT INTO message_usage_rollup AS r
+        (scope, subject_id, message_count, content_chars, first_message_at, last_message_at)
+    SELECT s.scope, s.subject_id, count(*), coalesce(sum(length(s.content)), 0),
+           min(s.created_at), max(s.created_at)
+    FROM (
+        SELECT 'user' AS scope, user_id AS subject_id, content, created_at
+        FROM {source} WHERE user_id IS NOT NULL
+        UNION ALL
+        SELECT 'agent', agent_id, content, created_at
+        FROM {source} WHERE agent_id IS NOT NULL
+    ) s
+    GROUP BY s.scope, s.subject_id
+    ON CONFLICT (scope, subject_id) DO UPDATE SET
+        message_count = r.message_count + EXCLUDED.message_count,
+        content_chars = r.content_chars + EXCLUDED.content_chars,
+        first_message_at = LEAST(r.first_message_at, EXCLUDED.first_message_at),
+        last_message_at = GREATEST(r.last_message_at, EXCLUDED.last_message_at)
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('message_usage_rollup',
+    sa.Column('scope', sa.String(length=16), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('message_count', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.Column('content_chars', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.Column('first_message_at', sa.DateTime(), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('scope', 'subject_id')
+    )
+
+    op.execute(f"""
+    CREATE OR REPLACE FUNCTION message_usage_rollup_refresh() RETURNS trigger AS $$
+    BEGIN
+        {UPSERT_SQL.format(source='new_rows')};
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+    CREATE TRIGGER message_usage_rollup_refresh
+    AFTER INSERT ON message
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION message_usage_rollup_refresh()
+    """)
+
+    # Backfill from existing messages
+    op.execute(UPSERT_SQL.format(source='message'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS message_usage_rollup_refresh ON message")
+    op.execute("DROP FUNCTION IF EXISTS message_usage_rollup_refresh()")
+    op.drop_table('message_usage_rollup')
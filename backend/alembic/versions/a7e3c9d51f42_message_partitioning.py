@@ -0,0 +1,238 @@
+"""Monthly partitions for message, message archive
+
+Revision ID: a7e3c9d51f42
+Revises: 6d1a9b3e8f20
+Create Date: 2026-10-19 13:00:00.000000
+
+``message`` becomes a table range-partitioned by month on ``created_at``
+(``message_YYYY_MM`` plus ``message_default`` for anything outside the
+created ranges). The primary key turns into ``(id, created_at)``, so
+``message_body`` loses its foreign key to ``message.id``.
+``message_ensure_partitions(from_month, months_ahead)`` creates missing
+monthly partitions; the archiver calls it on every pass.
+
+Rows are copied into the new table with the triggers detached, then the
+indexes from 3b7d2e9a41c5 and the rollup / overview triggers are recreated
+on the partitioned table. The INSERT triggers skip statements run with
+``alphacode.archive_restore = on``: restored messages were counted when
+they were first written.
+
+Also adds ``message_archive`` (compressed batches of archived messages) and
+``conversation.archived_at``.
+"""
+import gzip
+import json
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3c9d51f42'
+down_revision: Union[str, Sequence[str], None] = '6d1a9b3e8f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 2
+# Defaults of MESSAGE_INLINE_MAX_BYTES / MESSAGE_PREVIEW_CHARS (see c5f8a2d17b36)
+INLINE_MAX_BYTES = 8192
+PREVIEW_CHARS = 500
+
+ACTIVE = sa.text('status = 1')
+
+INDEXES = [
+    ('ix_message_conversation_created_active', ['conversation_id', 'created_at', 'id']),
+    ('ix_message_shared_conversation_created_active', ['shared_conversation_id', 'created_at', 'id']),
+    ('ix_message_user_created_active', ['user_id', 'created_at', 'id']),
+    ('ix_message_agent_created_active', ['agent_id', 'created_at', 'id']),
+]
+
+FOREIGN_KEYS = [
+    ('message_shared_conversation_id_fkey', 'shared_conversation', 'shared_conversation_id'),
+    ('message_conversation_id_fkey', 'conversation', 'conversation_id'),
+    ('message_user_id_fkey', 'user', 'user_id'),
+    ('message_agent_id_fkey', 'agent', 'agent_id'),
+]
+
+RESTORE_GUARD = "current_setting('alphacode.archive_restore', true) IS DISTINCT FROM 'on'"
+
+TRIGGERS = {
+    'message_usage_rollup_refresh': """
+    CREATE TRIGGER message_usage_rollup_refresh
+    AFTER INSERT ON message
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT {when} EXECUTE FUNCTION message_usage_rollup_refresh()
+    """,
+    'conversation_overview_on_insert': """
+    CREATE TRIGGER conversation_overview_on_insert
+    AFTER INSERT ON message
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT {when} EXECUTE FUNCTION conversation_overview_on_insert()
+    """,
+    'conversation_overview_on_update': """
+    CREATE TRIGGER conversation_overview_on_update
+    AFTER UPDATE ON message
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION conversation_overview_on_update()
+    """,
+}
+
+PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION message_ensure_partitions(from_month date, months_ahead integer) RETURNS integer AS $$
+DECLARE
+    m date := date_trunc('month', from_month)::date;
+    last_month date := (date_trunc('month', now() AT TIME ZONE 'utc') + make_interval(months => months_ahead))::date;
+    name text;
+    created integer := 0;
+BEGIN
+    -- One caller at a time (every worker runs an archiver)
+    PERFORM pg_advisory_xact_lock(hashtext('message_ensure_partitions'));
+    WHILE m <= last_month LOOP
+        name := 'message_' || to_char(m, 'YYYY_MM');
+        IF to_regclass(name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF message FOR VALUES FROM (%L) TO (%L)',
+                name, m, (m + interval '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        m := (m + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def _drop_triggers() -> None:
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON message")
+
+
+def _create_triggers(guarded: bool) -> None:
+    for sql in TRIGGERS.values():
+        op.execute(sql.format(when=f"WHEN ({RESTORE_GUARD})" if guarded else ""))
+
+
+def _create_indexes_and_keys(primary_key) -> None:
+    op.create_primary_key('message_pkey', 'message', primary_key)
+    op.create_index(op.f('ix_message_id'), 'message', ['id'], unique=False)
+    for name, columns in INDEXES:
+        op.create_index(name, 'message', columns, postgresql_where=ACTIVE)
+    for name, table, column in FOREIGN_KEYS:
+        op.create_foreign_key(name, 'message', table, [column], ['id'])
+
+
+def _swap_table(old: str, partitioned: bool) -> None:
+    """Rebuild ``message`` with the same columns and move the rows over."""
+    op.execute(f"ALTER TABLE message RENAME TO {old}")
+    op.execute(
+        f"CREATE TABLE message (LIKE {old} INCLUDING DEFAULTS)"
+        + (" PARTITION BY RANGE (created_at)" if partitioned else "")
+    )
+    if partitioned:
+        op.execute(PARTITION_FUNCTION)
+        op.execute(
+            f"SELECT message_ensure_partitions("
+            f"coalesce((SELECT min(created_at) FROM {old}), now() AT TIME ZONE 'utc')::date, {MONTHS_AHEAD})"
+        )
+        op.execute("CREATE TABLE message_default PARTITION OF message DEFAULT")
+    op.execute(f"INSERT INTO message SELECT * FROM {old}")
+    # The id sequence belongs to the old table; keep it alive
+    op.execute("ALTER SEQUENCE message_id_seq OWNED BY NONE")
+    op.execute(f"DROP TABLE {old}")
+    op.execute("ALTER SEQUENCE message_id_seq OWNED BY message.id")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _drop_triggers()
+    op.drop_constraint('message_body_message_id_fkey', 'message_body', type_='foreignkey')
+
+    # The partition key must be set on every row
+    op.execute("UPDATE message SET created_at = coalesce(last_updated, now() AT TIME ZONE 'utc') WHERE created_at IS NULL")
+    _swap_table('message_unpartitioned', partitioned=True)
+    op.execute("ALTER TABLE message ALTER COLUMN created_at SET NOT NULL")
+    op.execute("ALTER TABLE message ALTER COLUMN created_at SET DEFAULT (now() AT TIME ZONE 'utc')")
+    _create_indexes_and_keys(['id', 'created_at'])
+    _create_triggers(guarded=True)
+
+    op.add_column('conversation', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.create_table('message_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('conversation_id', sa.Integer(), nullable=True),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('first_message_at', sa.DateTime(), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(), nullable=True),
+    sa.Column('encoding', sa.String(length=16), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_message_archive_conversation_id'), 'message_archive', ['conversation_id'], unique=False)
+
+
+def _restore_archives() -> None:
+    """Put every archived message back into ``message`` (downgrade only)."""
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        archive = conn.execute(sa.text(
+            "SELECT id, encoding, data FROM message_archive WHERE id > :last_id ORDER BY id LIMIT 1"
+        ), {"last_id": last_id}).fetchone()
+        if archive is None:
+            break
+        archive_id, encoding, data = archive
+        if encoding != 'gzip':
+            raise RuntimeError(f"message_archive {archive_id} uses {encoding}; decompress it before downgrading")
+        rows, bodies = [], []
+        for item in json.loads(gzip.decompress(bytes(data)).decode("utf-8")):
+            content = item["content"]
+            length = None
+            if len(content.encode("utf-8")) > INLINE_MAX_BYTES:
+                bodies.append({"id": item["id"], "data": gzip.compress(content.encode("utf-8"), compresslevel=6)})
+                content, length = content[:PREVIEW_CHARS], len(content)
+            rows.append({
+                **item,
+                "content": content,
+                "content_length": length,
+                "created_at": datetime.fromisoformat(item["created_at"]),
+                "last_updated": datetime.fromisoformat(item["last_updated"]) if item["last_updated"] else None,
+            })
+        if rows:
+            conn.execute(sa.text(
+                "INSERT INTO message (id, role, created_at, status, content, content_type, message_type, "
+                "shared_conversation_id, conversation_id, user_id, agent_id, reaction, last_updated, content_length) "
+                "VALUES (:id, :role, :created_at, :status, :content, :content_type, :message_type, "
+                ":shared_conversation_id, :conversation_id, :user_id, :agent_id, :reaction, :last_updated, :content_length)"
+            ), rows)
+        if bodies:
+            conn.execute(
+                sa.text("INSERT INTO message_body (message_id, encoding, data) VALUES (:id, 'gzip', :data)"),
+                bodies
+            )
+        last_id = archive_id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _drop_triggers()
+    _restore_archives()
+    op.drop_index(op.f('ix_message_archive_conversation_id'), table_name='message_archive')
+    op.drop_table('message_archive')
+    op.drop_column('conversation', 'archived_at')
+
+    _swap_table('message_partitioned', partitioned=False)
+    op.execute("DROP FUNCTION IF EXISTS message_ensure_partitions(date, integer)")
+    op.execute("ALTER TABLE message ALTER COLUMN created_at DROP NOT NULL")
+    op.execute("ALTER TABLE message ALTER COLUMN created_at DROP DEFAULT")
+    _create_indexes_and_keys(['id'])
+    _create_triggers(guarded=False)
+
+    op.create_foreign_key(
+        'message_body_message_id_fkey', 'message_body', 'message', ['message_id'], ['id'], ondelete='CASCADE'
+    )
@@ -0,0 +1,118 @@
+"""Change counters for HTTP caching
+
+Revision ID: b2f8d4a6c3e1
+Revises: a7e3c9d51f42
+Create Date: 2026-10-19 14:00:00.000000
+
+``cache_version`` counts writes per reference table (``agent``, ``prompt``,
+``role``; ``subject_id = 0``) and per user for the conversation list
+(``conversation_user``: the user's conversations and their overview rows).
+Statement-level triggers bump the counters inside the writing transaction,
+so ETags change with every write, whichever worker or script made it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f8d4a6c3e1'
+down_revision: Union[str, Sequence[str], None] = 'a7e3c9d51f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+REFERENCE_TABLES = ['agent', 'prompt', 'role']
+
+UPSERT = """
+    INSERT INTO cache_version AS v (scope, subject_id, version, updated_at)
+    {source}
+    ON CONFLICT (scope, subject_id) DO UPDATE SET
+        version = v.version + 1,
+        updated_at = EXCLUDED.updated_at;
+"""
+
+TABLE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION cache_version_bump_table() RETURNS trigger AS $$
+BEGIN
+    {UPSERT.format(source="VALUES (TG_TABLE_NAME, 0, 1, now() AT TIME ZONE 'utc')")}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+CONVERSATION_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION cache_version_bump_conversation_users() RETURNS trigger AS $$
+BEGIN
+    {UPSERT.format(source='''SELECT DISTINCT 'conversation_user', user_id, 1, now() AT TIME ZONE 'utc'
+    FROM new_rows WHERE user_id IS NOT NULL''')}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+OVERVIEW_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION cache_version_bump_overview_users() RETURNS trigger AS $$
+BEGIN
+    {UPSERT.format(source='''SELECT DISTINCT 'conversation_user', c.user_id, 1, now() AT TIME ZONE 'utc'
+    FROM new_rows n JOIN conversation c ON c.id = n.conversation_id
+    WHERE c.user_id IS NOT NULL''')}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# (trigger, table, event, function); transition tables allow one event per trigger
+ROW_TRIGGERS = [
+    ('cache_version_conversation_insert', 'conversation', 'INSERT', 'cache_version_bump_conversation_users'),
+    ('cache_version_conversation_update', 'conversation', 'UPDATE', 'cache_version_bump_conversation_users'),
+    ('cache_version_overview_insert', 'conversation_overview', 'INSERT', 'cache_version_bump_overview_users'),
+    ('cache_version_overview_update', 'conversation_overview', 'UPDATE', 'cache_version_bump_overview_users'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cache_version',
+    sa.Column('scope', sa.String(length=32), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'subject_id')
+    )
+    op.execute(TABLE_FUNCTION)
+    op.execute(CONVERSATION_FUNCTION)
+    op.execute(OVERVIEW_FUNCTION)
+
+    for table in REFERENCE_TABLES:
+        op.execute(f"""
+        CREATE TRIGGER cache_version_{table}
+        AFTER INSERT OR UPDATE OR DELETE ON "{table}"
+        FOR EACH STATEMENT EXECUTE FUNCTION cache_version_bump_table()
+        """)
+    for name, table, event, function in ROW_TRIGGERS:
+        op.execute(f"""
+        CREATE TRIGGER {name}
+        AFTER {event} ON {table}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+        """)
+
+    # Start every reference table at version 1
+    op.execute(
+        "INSERT INTO cache_version (scope, subject_id, version, updated_at) "
+        "SELECT t, 0, 1, now() AT TIME ZONE 'utc' FROM unnest(ARRAY['agent', 'prompt', 'role']) AS t"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _, _ in ROW_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+    for table in REFERENCE_TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS cache_version_{table} ON "{table}"')
+    op.execute("DROP FUNCTION IF EXISTS cache_version_bump_overview_users()")
+    op.execute("DROP FUNCTION IF EXISTS cache_version_bump_conversation_users()")
+    op.execute("DROP FUNCTION IF EXISTS cache_version_bump_table()")
+    op.drop_table('cache_version')
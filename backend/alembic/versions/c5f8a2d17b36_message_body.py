@@ -0,0 +1,116 @@
+"""Out-of-line compressed message bodies
+
+Revision ID: c5f8a2d17b36
+Revises: 9e4c61f0d2a8
+Create Date: 2026-10-19 11:00:00.000000
+
+Adds ``message_body`` (gzip-compressed full content) and
+``message.content_length``. Existing messages larger than the inline
+threshold are moved out of line in batches, leaving a preview in
+``message.content``. The usage rollup trigger now counts the full length.
+"""
+import gzip
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f8a2d17b36'
+down_revision: Union[str, Sequence[str], None] = '9e4c61f0d2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Defaults of MESSAGE_INLINE_MAX_BYTES / MESSAGE_PREVIEW_CHARS at the time of
+# this revision
+INLINE_MAX_BYTES = 8192
+PREVIEW_CHARS = 500
+BATCH_SIZE = 500
+
+ROLLUP_FUNCTION = """
+CREATE OR REPLACE FUNCTION message_usage_rollup_refresh() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO message_usage_rollup AS r
+        (scope, subject_id, message_count, content_chars, first_message_at, last_message_at)
+    SELECT s.scope, s.subject_id, count(*), coalesce(sum(s.chars), 0),
+           min(s.created_at), max(s.created_at)
+    FROM (
+        SELECT 'user' AS scope, user_id AS subject_id, {chars} AS chars, created_at
+        FROM new_rows WHERE user_id IS NOT NULL
+        UNION ALL
+        SELECT 'agent', agent_id, {chars}, created_at
+        FROM new_rows WHERE agent_id IS NOT NULL
+    ) s
+    GROUP BY s.scope, s.subject_id
+    ON CONFLICT (scope, subject_id) DO UPDATE SET
+        message_count = r.message_count + EXCLUDED.message_count,
+        content_chars = r.content_chars + EXCLUDED.content_chars,
+        first_message_at = LEAST(r.first_message_at, EXCLUDED.first_message_at),
+        last_message_at = GREATEST(r.last_message_at, EXCLUDED.last_message_at);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('message', sa.Column('content_length', sa.Integer(), nullable=True))
+    op.create_table('message_body',
+    sa.Column('message_id', sa.Integer(), nullable=False),
+    sa.Column('encoding', sa.String(length=16), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['message_id'], ['message.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('message_id')
+    )
+    op.execute(ROLLUP_FUNCTION.format(chars='coalesce(content_length, length(content))'))
+
+    # Move existing large contents out of line, one batch at a time
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(
+            "SELECT id, content FROM message "
+            "WHERE id > :last_id AND content_length IS NULL AND octet_length(content) > :limit "
+            "ORDER BY id LIMIT :batch"
+        ), {"last_id": last_id, "limit": INLINE_MAX_BYTES, "batch": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            sa.text("INSERT INTO message_body (message_id, encoding, data) VALUES (:id, 'gzip', :data)"),
+            [{"id": id, "data": gzip.compress(content.encode("utf-8"), compresslevel=6)} for id, content in rows]
+        )
+        conn.execute(
+            sa.text("UPDATE message SET content = :preview, content_length = :length WHERE id = :id"),
+            [{"id": id, "preview": content[:PREVIEW_CHARS], "length": len(content)} for id, content in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Put full contents back inline before dropping the side table
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(
+            "SELECT message_id, encoding, data FROM message_body "
+            "WHERE message_id > :last_id ORDER BY message_id LIMIT :batch"
+        ), {"last_id": last_id, "batch": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        for message_id, encoding, data in rows:
+            if encoding != 'gzip':
+                raise RuntimeError(f"message {message_id} uses {encoding}; decompress it before downgrading")
+        conn.execute(
+            sa.text("UPDATE message SET content = :content WHERE id = :id"),
+            [{"id": message_id, "content": gzip.decompress(bytes(data)).decode("utf-8")}
+             for message_id, _, data in rows]
+        )
+        last_id = rows[-1][0]
+
+    op.execute(ROLLUP_FUNCTION.format(chars='length(content)'))
+    op.drop_table('message_body')
+    op.drop_column('message', 'content_length')
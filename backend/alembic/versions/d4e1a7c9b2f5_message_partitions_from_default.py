@@ -0,0 +1,107 @@
+"""message_ensure_partitions moves rows out of the default partition
+
+Revision ID: d4e1a7c9b2f5
+Revises: b2f8d4a6c3e1
+Create Date: 2026-10-19 15:00:00.000000
+
+Messages imported with an old ``created_at`` (bulk endpoint) land in
+``message_default`` when their month has no partition yet, and
+``CREATE TABLE ... PARTITION OF`` then fails for that month because the
+default partition holds rows of its range. The function now creates such a
+month as a standalone table, moves the month's rows from ``message_default``
+into it and attaches it. Only row-level triggers are cloned to partitions,
+so the move does not touch the usage rollup or the overview.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e1a7c9b2f5'
+down_revision: Union[str, Sequence[str], None] = 'b2f8d4a6c3e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION message_ensure_partitions(from_month date, months_ahead integer) RETURNS integer AS $$
+DECLARE
+    m date := date_trunc('month', from_month)::date;
+    next_month date;
+    last_month date := (date_trunc('month', now() AT TIME ZONE 'utc') + make_interval(months => months_ahead))::date;
+    name text;
+    created integer := 0;
+BEGIN
+    -- One caller at a time (every worker runs an archiver)
+    PERFORM pg_advisory_xact_lock(hashtext('message_ensure_partitions'));
+    WHILE m <= last_month LOOP
+        name := 'message_' || to_char(m, 'YYYY_MM');
+        next_month := (m + interval '1 month')::date;
+        IF to_regclass(name) IS NULL THEN
+            IF EXISTS (SELECT 1 FROM message_default WHERE created_at >= m AND created_at < next_month) THEN
+                EXECUTE format('CREATE TABLE %I (LIKE message INCLUDING DEFAULTS)', name);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM message_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    m, next_month, name
+                );
+                EXECUTE format(
+                    'ALTER TABLE message ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    name, m, next_month
+                );
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF message FOR VALUES FROM (%L) TO (%L)',
+                    name, m, next_month
+                );
+            END IF;
+            created := created + 1;
+        END IF;
+        m := next_month;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# As created by a7e3c9d51f42
+PREVIOUS_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION message_ensure_partitions(from_month date, months_ahead integer) RETURNS integer AS $$
+DECLARE
+    m date := date_trunc('month', from_month)::date;
+    last_month date := (date_trunc('month', now() AT TIME ZONE 'utc') + make_interval(months => months_ahead))::date;
+    name text;
+    created integer := 0;
+BEGIN
+    -- One caller at a time (every worker runs an archiver)
+    PERFORM pg_advisory_xact_lock(hashtext('message_ensure_partitions'));
+    WHILE m <= last_month LOOP
+        name := 'message_' || to_char(m, 'YYYY_MM');
+        IF to_regclass(name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF message FOR VALUES FROM (%L) TO (%L)',
+                name, m, (m + interval '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        m := (m + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(PARTITION_FUNCTION)
+    # Give rows already stranded in the default partition their own months
+    op.execute(
+        "SELECT message_ensure_partitions(min(created_at)::date, 2) FROM message_default HAVING count(*) > 0"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(PREVIOUS_PARTITION_FUNCTION)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 try:
     from pydantic_settings import BaseSettings
 except Exception:
@@ -13,6 +13,24 @@ except Exception:
                     setattr(self, k, v)
 
 
+# Connection pool presets per deployment profile (DB_PROFILE); explicit DB_POOL_* values win.
+# A WebSocket turn opens several short sessions, so size max connections
+# (pool_size + max_overflow) against concurrent turns per worker, and keep
+# workers x that total below the server's max_connections.
+DB_POOL_PROFILES: Dict[str, Dict[str, Any]] = {
+    "dev": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 30.0, "pool_recycle": 1800},
+    "default": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30.0, "pool_recycle": 1800},
+    "production": {"pool_size": 20, "max_overflow": 30, "pool_timeout": 10.0, "pool_recycle": 900},
+}
+
+
+def _to_async_url(db_url: str) -> str:
+    # Convert postgresql:// to postgresql+asyncpg://
+    if db_url.startswith("postgresql://"):
+        return db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return db_url
+
+
 class Settings(BaseSettings):
     # Database
     POSTGRES_SERVER: str = "localhost"
@@ -21,18 +39,93 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "alphacode"
     DATABASE_URL: Optional[str] = None  # Có thể override từ .env
     DB_URL: Optional[str] = None  # Alternative name from .env
+    DB_REPLICA_URL: Optional[str] = None  # read replica for list/search queries; unset = primary only
+    DB_READ_YOUR_WRITES_SECONDS: float = 10.0  # read recently written conversations from the primary
+    DB_PROFILE: str = "default"  # dev | default | production (pool presets, see DB_POOL_PROFILES)
+    DB_POOL_SIZE: Optional[int] = None  # persistent connections per worker
+    DB_MAX_OVERFLOW: Optional[int] = None  # extra connections under burst load
+    DB_POOL_TIMEOUT: Optional[float] = None  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: Optional[int] = None  # recycle connections older than this (seconds)
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256  # asyncpg prepared statements per connection (0 behind pgbouncer)
+    DB_ECHO: bool = False  # log every SQL statement (debugging only)
+    DB_SLOW_QUERY_MS: float = 200.0  # log statements slower than this (0 = off)
+    DB_N_PLUS_ONE_THRESHOLD: int = 10  # same statement this many times in one request/turn
+    MESSAGE_BULK_MAX: int = 10000  # messages accepted per POST /messages/bulk
+    MESSAGE_BULK_CHUNK_SIZE: int = 1000  # rows per multi-row INSERT statement
+    MESSAGE_INLINE_MAX_BYTES: int = 8192  # larger contents are compressed into message_body
+    MESSAGE_PREVIEW_CHARS: int = 500  # preview kept in message.content for large messages
+    MESSAGE_COMPRESSION: str = "gzip"  # gzip | zstd (needs the zstandard package)
+    MESSAGE_PARTITION_MONTHS_AHEAD: int = 2  # monthly message partitions created in advance
+    ARCHIVE_ENABLED: bool = True  # background archive pass (also creates the partitions)
+    ARCHIVE_INTERVAL_SECONDS: int = 3600
+    ARCHIVE_INACTIVE_DAYS: int = 90  # archive conversations idle this long (0 = never)
+    ARCHIVE_BATCH_SIZE: int = 100  # conversations archived per pass
+    ARCHIVE_DELETED_BATCH_SIZE: int = 5000  # soft-deleted messages archived per pass (0 = keep)
 
     # AI / LLM
+    LLM_PROVIDER: str = "gemini"  # gemini | stub (offline, for load testing)
     GENAI_API_KEY: Optional[str] = None
     LLM_MODEL: Optional[str] = None
     EMBED_MODEL: Optional[str] = None
     CHROMA_PERSIST_DIR: Optional[str] = None
 
+    # Prompt context budget (approximate tokens)
+    CONTEXT_TOKEN_BUDGET: int = 6000
+    CONTEXT_SUMMARY_TOKENS: int = 512
+    CONTEXT_RETRIEVED_TOKENS: int = 1024
+    CONTEXT_MAX_TURNS: int = 8
+
+    # LLM scheduler (process-wide concurrency and rate limits, 0 = unlimited)
+    LLM_MAX_IN_FLIGHT: int = 8
+    LLM_MAX_QUEUE: int = 100
+    LLM_QUEUE_TIMEOUT: float = 30.0
+    LLM_REQUESTS_PER_MINUTE: int = 0
+    LLM_TOKENS_PER_MINUTE: int = 0
+
+    # WebSocket
+    WS_INBOUND_QUEUE_SIZE: int = 16  # queued client messages per session
+    WS_OUTBOUND_QUEUE_SIZE: int = 64  # queued server frames per session
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # drop_oldest | disconnect
+    WS_IDLE_TIMEOUT: int = 1800  # seconds without client frames before closing (0 = never)
+    WS_PING_INTERVAL: int = 30  # heartbeat ping to quiet clients
+    WS_SWEEP_INTERVAL: int = 10  # janitor pass interval
+    WS_MEMORY_LIMIT_MB: int = 256  # agent caches across sessions (0 = unlimited)
+    WS_CHUNK_SIZE: int = 32768  # content chars per frame for ?chunked=true clients
+    WS_BINARY_THRESHOLD: int = 65536  # JSON bytes before gzip binary frame for ?binary=true clients
+    WS_RESUME_GRACE_SECONDS: int = 120  # reconnect window with resume token (0 = disabled)
+    WS_REGISTRY_BACKEND: str = "memory"  # memory (single worker) | sqlite (multi-worker, one host)
+    WS_REGISTRY_PATH: str = "ws_registry.db"
+
+    # Semantic response cache for context-free questions (opt-in)
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_TTL_SECONDS: int = 3600
+    RESPONSE_CACHE_SIMILARITY: float = 0.92
+
+    # HTTP caching (ETag / 304) and the agents / prompts / roles response cache
+    REFERENCE_CACHE_ENABLED: bool = True
+    REFERENCE_CACHE_TTL_SECONDS: float = 5.0  # trust a table version this long between DB checks
+    REFERENCE_CACHE_MAX_ENTRIES: int = 500
+
     # Security
     SECRET_KEY: str = "your-secret-key"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    @property
+    def db_pool_options(self) -> Dict[str, Any]:
+        """Pool parameters: DB_PROFILE preset overridden by explicit DB_POOL_* settings."""
+        options = dict(DB_POOL_PROFILES.get(self.DB_PROFILE, DB_POOL_PROFILES["default"]))
+        for key, value in (
+            ("pool_size", self.DB_POOL_SIZE),
+            ("max_overflow", self.DB_MAX_OVERFLOW),
+            ("pool_timeout", self.DB_POOL_TIMEOUT),
+            ("pool_recycle", self.DB_POOL_RECYCLE),
+        ):
+            if value is not None:
+                options[key] = value
+        return options
+
     # Database URL helpers
     @property
     def sync_database_url(self) -> str:
@@ -52,12 +145,16 @@ class Settings(BaseSettings):
         """
         db_url = self.DATABASE_URL or self.DB_URL
         if db_url:
-            # Convert postgresql:// to postgresql+asyncpg://
-            if db_url.startswith("postgresql://"):
-                return db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-            return db_url
+            return _to_async_url(db_url)
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
 
+    @property
+    def async_replica_database_url(self) -> Optional[str]:
+        """
+        URL asyncpg của read replica, None nếu không cấu hình DB_REPLICA_URL.
+        """
+        return _to_async_url(self.DB_REPLICA_URL) if self.DB_REPLICA_URL else None
+
     class Config:
         case_sensitive = True         # phân biệt chữ hoa / thường
         env_file = ".env"             # đọc biến môi trường từ file .env
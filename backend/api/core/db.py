@@ -1,21 +1,56 @@
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from typing import AsyncGenerator
+from fastapi import Request
+from typing import AsyncGenerator, Optional
 
 from .config import settings
+from .query_stats import query_stats
+from .pool_stats import TimedQueuePool, pool_stats
+from .read_routing import RecentWrites, install as install_read_routing
 
 
 class Base(DeclarativeBase):
     pass
 
 
-# Create async engine
+def _with_statement_cache(url: str):
+    # SQLAlchemy's asyncpg dialect keeps its own prepared-statement cache per
+    # connection, sized through the URL; asyncpg's cache gets the same size
+    return make_url(url).update_query_dict({
+        "prepared_statement_cache_size": str(settings.DB_PREPARED_STATEMENT_CACHE_SIZE)
+    })
+
+
+# Create async engine (shared connection pool for all requests and WebSocket sessions)
 engine = create_async_engine(
-    settings.async_database_url,
+    _with_statement_cache(settings.async_database_url),
     future=True,
-    echo=True,
+    echo=settings.DB_ECHO,
+    poolclass=TimedQueuePool,
+    pool_pre_ping=True,
+    connect_args={"statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+    **settings.db_pool_options,
 )
 
+# Optional read replica for list / history / search queries (own pool, same sizing)
+replica_engine = None
+if settings.async_replica_database_url:
+    replica_engine = create_async_engine(
+        _with_statement_cache(settings.async_replica_database_url),
+        future=True,
+        echo=settings.DB_ECHO,
+        pool_pre_ping=True,
+        connect_args={"statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+        **settings.db_pool_options,
+    )
+    query_stats.instrument(replica_engine)
+
+# Query counts / DB time per request and turn, slow-query log (GET /metrics/db)
+query_stats.instrument(engine)
+# Checkouts, overflow and wait times (GET /metrics/db/pool)
+pool_stats.instrument(engine)
+
 # Create async session factory
 async_session = async_sessionmaker(
     engine,
@@ -25,11 +60,53 @@ async_session = async_sessionmaker(
     autoflush=False,
 )
 
+# Read-only sessions; the primary when no replica is configured
+replica_session = async_sessionmaker(
+    replica_engine or engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+# Subjects written recently by this process (read-your-writes, see read_routing)
+recent_writes = RecentWrites(window=settings.DB_READ_YOUR_WRITES_SECONDS)
+install_read_routing(recent_writes)
+
+
+def read_session_factory(kind: Optional[str] = None, subject_id: Optional[int] = None) -> async_sessionmaker:
+    """Session factory for a read: the replica unless ``(kind, subject_id)`` was just written."""
+    if kind and recent_writes.is_recent(kind, subject_id):
+        return async_session
+    return replica_session
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
 
 
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only endpoints that tolerate replica lag."""
+    async with replica_session() as session:
+        yield session
+
+
+def get_read_session_for(kind: str, path_param: str):
+    """Dependency: read session routed by a path parameter (read-your-writes).
+
+    ``Depends(get_read_session_for(CONVERSATION, "conversation_id"))`` reads
+    from the primary while that conversation has recent writes.
+    """
+    async def dependency(request: Request) -> AsyncGenerator[AsyncSession, None]:
+        value = request.path_params.get(path_param)
+        subject_id = int(value) if value is not None and str(value).isdigit() else None
+        async with read_session_factory(kind, subject_id)() as session:
+            yield session
+
+    return dependency
+
+
 async def init_models():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
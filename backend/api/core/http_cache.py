@@ -0,0 +1,220 @@
+"""Conditional GETs (ETag / Last-Modified) and the reference-data response cache.
+
+Validators come from ``cache_version`` (migration b2f8d4a6c3e1): a counter
+bumped by triggers on every write to a table, or to one user's
+conversations. The ETag of a response is a hash of that counter and the
+request URL, so checking ``If-None-Match`` costs one primary-key lookup and
+a match is answered with ``304 Not Modified`` before anything is loaded.
+
+Reference data (agents, prompts, roles) is additionally kept serialized in
+``reference_cache``: a hit skips the query and the Pydantic serialization.
+Versions are trusted for ``REFERENCE_CACHE_TTL_SECONDS`` between lookups;
+writes through the services invalidate this process immediately, other
+workers see the new version once their TTL runs out.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.core.config import settings
+from api.core.models import CacheVersion
+
+CONVERSATION_USER = "conversation_user"
+
+# Browsers must revalidate, but may reuse the body on 304
+CACHE_CONTROL = "private, no-cache"
+
+Version = Tuple[int, Optional[datetime]]
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def dump_json(schema: Any, data: Any) -> bytes:
+    """Validate ORM objects against ``schema`` and serialize them to JSON."""
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(schema)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _http_date(moment: datetime) -> str:
+    return format_datetime(moment.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def last_modified_boundary(updated_at: Optional[datetime]) -> Optional[datetime]:
+    """``Last-Modified`` to send for a version written at ``updated_at``.
+
+    HTTP dates have one-second resolution, so the header is the next second
+    boundary after the write; it is withheld until that boundary has passed,
+    since a second write in the same second would share the date and a
+    client revalidating with it would get a stale 304.
+    """
+    if updated_at is None:
+        return None
+    boundary = updated_at.replace(microsecond=0) + timedelta(seconds=1)
+    return boundary if datetime.utcnow() >= boundary else None
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent.
+
+    ``last_modified`` is the exact ``updated_at`` of the version.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/"x" matches "x"
+        wanted = etag.removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # Exact comparison: any write at or after the client's date is a change
+        return last_modified.replace(tzinfo=timezone.utc) < since
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    boundary = last_modified_boundary(last_modified)
+    if boundary is not None:
+        headers["Last-Modified"] = _http_date(boundary)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def request_key(request: Request) -> str:
+    return f"{request.url.path}?{request.url.query}"
+
+
+async def get_version(db: AsyncSession, scope: str, subject_id: int = 0) -> Version:
+    """Current ``(version, updated_at)`` of a scope; ``(0, None)`` if never written."""
+    result = await db.execute(
+        select(CacheVersion.version, CacheVersion.updated_at)
+        .where(CacheVersion.scope == scope, CacheVersion.subject_id == subject_id)
+    )
+    row = result.first()
+    return (row[0], row[1]) if row else (0, None)
+
+
+class ReferenceCache:
+    """Serialized responses of rarely changing tables, keyed by URL."""
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 500, enabled: bool = True):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds a table version is trusted without a database lookup
+            max_entries: Cached responses kept (least recently used evicted)
+            enabled: False serves every request from the database (ETags still apply)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._versions: Dict[str, Tuple[Version, float]] = {}
+        self._entries: "OrderedDict[str, Tuple[str, int, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    async def version(self, db: AsyncSession, table: str) -> Version:
+        cached = self._versions.get(table)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        version = await get_version(db, table)
+        self._versions[table] = (version, time.monotonic())
+        return version
+
+    def invalidate(self, table: str):
+        """Forget a table's version and responses (call after writing to it)."""
+        self.invalidations += 1
+        self._versions.pop(table, None)
+        for key in [k for k, entry in self._entries.items() if entry[0] == table]:
+            del self._entries[key]
+
+    async def respond(
+        self,
+        request: Request,
+        db: AsyncSession,
+        table: str,
+        load: Callable[[], Awaitable[Any]],
+        schema: Any
+    ) -> Response:
+        """Conditional, cached JSON response for a reference-data GET.
+
+        Args:
+            request: Incoming request (URL and conditional headers)
+            db: Session used for the version lookup
+            table: Table whose version the response depends on
+            load: Loads the data on a cache miss
+            schema: Response type, e.g. ``List[schemas.Agent]``
+        """
+        version, updated_at = await self.version(db, table)
+        key = request_key(request)
+        etag = make_etag(table, version, key)
+        if is_not_modified(request, etag, updated_at):
+            self.not_modified += 1
+            return not_modified_response(etag, updated_at)
+
+        entry = self._entries.get(key) if self.enabled else None
+        if entry is not None and entry[1] == version:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            body = entry[2]
+        else:
+            self.misses += 1
+            body = dump_json(schema, await load())
+            if self.enabled:
+                self._entries[key] = (table, version, body)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers=validator_headers(etag, updated_at)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "ttl": self.ttl,
+        }
+
+
+# Process-wide instance; services invalidate it on writes
+reference_cache = ReferenceCache(
+    ttl=settings.REFERENCE_CACHE_TTL_SECONDS,
+    max_entries=settings.REFERENCE_CACHE_MAX_ENTRIES,
+    enabled=settings.REFERENCE_CACHE_ENABLED
+)
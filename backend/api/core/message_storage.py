@@ -0,0 +1,107 @@
+"""Out-of-line, compressed storage for large message contents.
+
+Contents larger than ``MESSAGE_INLINE_MAX_BYTES`` (pipeline results, long
+reports) are compressed into ``message_body``; ``message.content`` keeps
+only a preview and ``message.content_length`` records the full length.
+History and list queries therefore never drag the large payloads along;
+callers that need the full text fetch it explicitly.
+
+zstd is used when the optional ``zstandard`` package is installed and
+``MESSAGE_COMPRESSION=zstd``; otherwise gzip from the standard library.
+The codec is stored per row, so both can be read back.
+"""
+
+import gzip
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.core.config import settings
+from api.core.models import Message, MessageBody
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+
+def _codec() -> str:
+    if settings.MESSAGE_COMPRESSION == ZSTD and zstandard is not None:
+        return ZSTD
+    return GZIP
+
+
+def compress(content: str) -> Tuple[str, bytes]:
+    """Compress text; returns ``(encoding, data)``."""
+    raw = content.encode("utf-8")
+    if _codec() == ZSTD:
+        return ZSTD, zstandard.ZstdCompressor(level=6).compress(raw)
+    return GZIP, gzip.compress(raw, compresslevel=6)
+
+
+def decompress(encoding: str, data: bytes) -> str:
+    if encoding == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed messages")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return gzip.decompress(data).decode("utf-8")
+
+
+def preview(content: str) -> str:
+    return content[:settings.MESSAGE_PREVIEW_CHARS]
+
+
+def split_content(content: str) -> Tuple[str, Optional[int], Optional[Tuple[str, bytes]]]:
+    """Decide where a content goes.
+
+    Returns:
+        ``(inline_content, content_length, body)`` where ``body`` is
+        ``(encoding, data)`` for out-of-line contents and None otherwise
+    """
+    if len(content.encode("utf-8")) <= settings.MESSAGE_INLINE_MAX_BYTES:
+        return content, None, None
+    return preview(content), len(content), compress(content)
+
+
+async def set_content(db: AsyncSession, message: Message, content: str):
+    """Assign a message's content, moving large ones out of line.
+
+    New messages are flushed to get their id when a body row is needed.
+    The caller commits.
+    """
+    inline, length, body = split_content(content)
+    message.content = inline
+    message.content_length = length
+    if message.id is not None:
+        await db.execute(delete(MessageBody).where(MessageBody.message_id == message.id))
+    if body is not None:
+        if message.id is None:
+            db.add(message)
+            await db.flush()
+        encoding, data = body
+        db.add(MessageBody(message_id=message.id, encoding=encoding, data=data))
+
+
+async def load_content(db: AsyncSession, message: Message) -> str:
+    """Full content of a message (one extra lookup if stored out of line)."""
+    if message.content_length is None:
+        return message.content
+    body = await db.get(MessageBody, message.id)
+    if body is None:
+        return message.content
+    return decompress(body.encoding, body.data)
+
+
+async def load_contents(db: AsyncSession, messages: List[Message]) -> Dict[int, str]:
+    """Full contents for several messages with one query for the bodies."""
+    contents = {m.id: m.content for m in messages}
+    external = [m.id for m in messages if m.content_length is not None]
+    if external:
+        result = await db.execute(select(MessageBody).where(MessageBody.message_id.in_(external)))
+        for body in result.scalars():
+            contents[body.message_id] = decompress(body.encoding, body.data)
+    return contents
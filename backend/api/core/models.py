@@ -1,6 +1,6 @@
 """SQLAlchemy ORM models for database tables."""
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, ARRAY, Float
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, LargeBinary, ForeignKey, ARRAY, Float, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -67,6 +67,25 @@ class Conversation(Base):
     last_updated = Column(DateTime, nullable=True)
     summary = Column(Text, nullable=True)
     summary_embedding = Column(ARRAY(Float), nullable=True)
+    # Set while the messages live in message_archive (restored on reopen)
+    archived_at = Column(DateTime, nullable=True)
+
+    # Sidebar read model; only loaded on purpose (contains_eager), never lazily
+    overview = relationship("ConversationOverview", uselist=False, lazy="raise")
+
+    # Partial indexes for the hot queries (only active rows are ever listed)
+    __table_args__ = (
+        Index(
+            "ix_conversation_user_created_active",
+            "user_id", created_at.desc(), id.desc(),
+            postgresql_where=text("status = 1")
+        ),
+        Index(
+            "ix_conversation_user_embedding_active",
+            "user_id",
+            postgresql_where=text("status = 1 AND summary_embedding IS NOT NULL")
+        ),
+    )
 
 
 class ConversationAgent(Base):
@@ -93,11 +112,18 @@ class SharedConversation(Base):
 
 
 class Message(Base):
+    """A chat message.
+
+    The table is range-partitioned by month on ``created_at`` (migration
+    a7e3c9d51f42), so the database primary key is ``(id, created_at)``; the
+    ORM still identifies rows by ``id`` alone.
+    """
     __tablename__ = "message"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # autoincrement must be explicit: the table's primary key is composite
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     role = Column(Integer, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     status = Column(Integer, default=1)
     content = Column(Text, nullable=False)
     content_type = Column(Integer, nullable=False)
@@ -108,3 +134,121 @@ class Message(Base):
     agent_id = Column(Integer, ForeignKey("agent.id"), nullable=True)
     reaction = Column(String, nullable=True)
     last_updated = Column(DateTime, nullable=True)
+    # Full length in chars when the content lives in message_body; `content` then holds a preview
+    content_length = Column(Integer, nullable=True)
+
+    @property
+    def content_external(self) -> bool:
+        return self.content_length is not None
+
+    # Partial indexes for the hot queries (only active rows are ever listed)
+    __table_args__ = (
+        Index(
+            "ix_message_conversation_created_active",
+            "conversation_id", "created_at", "id",
+            postgresql_where=text("status = 1")
+        ),
+        Index(
+            "ix_message_shared_conversation_created_active",
+            "shared_conversation_id", "created_at", "id",
+            postgresql_where=text("status = 1")
+        ),
+        Index(
+            "ix_message_user_created_active",
+            "user_id", "created_at", "id",
+            postgresql_where=text("status = 1")
+        ),
+        Index(
+            "ix_message_agent_created_active",
+            "agent_id", "created_at", "id",
+            postgresql_where=text("status = 1")
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+
+class ConversationOverview(Base):
+    """Denormalised per-conversation sidebar data.
+
+    Maintained by triggers on ``message`` in the same transaction as the
+    message write (see migration 6d1a9b3e8f20): inserts are applied
+    incrementally, soft deletes / edits recompute the affected rows.
+    """
+    __tablename__ = "conversation_overview"
+
+    conversation_id = Column(Integer, ForeignKey("conversation.id", ondelete="CASCADE"), primary_key=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    user_message_count = Column(Integer, nullable=False, default=0)
+    agent_message_count = Column(Integer, nullable=False, default=0)
+    last_message_at = Column(DateTime, nullable=True)
+    last_message_preview = Column(String(200), nullable=True)
+    last_message_role = Column(Integer, nullable=True)
+    active_agent_id = Column(Integer, nullable=True)  # agent of the latest agent reply
+
+
+class MessageBody(Base):
+    """Compressed full content of a large message (see api/core/message_storage.py)."""
+    __tablename__ = "message_body"
+
+    # No FK: ``message`` is partitioned and its id alone is not unique there.
+    # Bodies are removed together with their message (archiver).
+    message_id = Column(Integer, primary_key=True)
+    encoding = Column(String(16), nullable=False)  # gzip | zstd
+    data = Column(LargeBinary, nullable=False)
+
+
+class MessageUsageRollup(Base):
+    """Per-user / per-agent message totals.
+
+    Maintained by the ``message_usage_rollup_refresh`` trigger on every
+    INSERT into ``message`` (see migration 9e4c61f0d2a8), so usage reads are
+    a primary-key lookup. Counts every message ever written, including ones
+    soft deleted later.
+    """
+    __tablename__ = "message_usage_rollup"
+
+    scope = Column(String(16), primary_key=True)  # "user" | "agent"
+    subject_id = Column(Integer, primary_key=True)
+    message_count = Column(BigInteger, nullable=False, default=0)
+    content_chars = Column(BigInteger, nullable=False, default=0)
+    first_message_at = Column(DateTime, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+
+
+class MessageArchive(Base):
+    """Compressed batch of messages moved out of ``message``.
+
+    ``kind="conversation"``: active messages of a conversation inactive for
+    ``ARCHIVE_INACTIVE_DAYS``, restored when the conversation is reopened.
+    ``kind="deleted"``: soft-deleted messages, kept for audit / manual recovery.
+    ``data`` is a JSON array of message rows with their full contents,
+    compressed like ``message_body`` (see api/services/archiver.py).
+    """
+    __tablename__ = "message_archive"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(16), nullable=False)  # conversation | deleted
+    conversation_id = Column(Integer, nullable=True, index=True)
+    message_count = Column(Integer, nullable=False)
+    first_message_at = Column(DateTime, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+    encoding = Column(String(16), nullable=False)  # gzip | zstd
+    data = Column(LargeBinary, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class CacheVersion(Base):
+    """Change counter per table (``subject_id = 0``) or per subject.
+
+    Bumped by statement-level triggers (migration b2f8d4a6c3e1) on every
+    write to ``agent`` / ``prompt`` / ``role`` and, per user, to that user's
+    conversations and their overviews. HTTP ETags are derived from it (see
+    api/core/http_cache.py), so a conditional GET is one primary-key lookup.
+    """
+    __tablename__ = "cache_version"
+
+    scope = Column(String(32), primary_key=True)  # table name | "conversation_user"
+    subject_id = Column(Integer, primary_key=True, default=0)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,120 @@
+"""Keyset (cursor) pagination on ``(created_at, id)``.
+
+Cursors are opaque base64url tokens encoding the sort key of a boundary row.
+``after`` returns the page following the cursor in the list's natural order,
+``before`` the page preceding it. Unlike OFFSET, the cost of a page does not
+grow with how deep the client has scrolled.
+"""
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000  # same upper bound the list endpoints already accepted
+
+AFTER = "after"
+BEFORE = "before"
+
+
+@dataclass
+class Page:
+    """One page of rows plus cursors to the neighbouring pages."""
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def encode_cursor(created_at: Optional[datetime], id: int) -> str:
+    """Encode a row's sort key as an opaque cursor."""
+    raw = json.dumps([created_at.isoformat() if created_at else None, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Decode a cursor back into ``(created_at, id)``.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return (datetime.fromisoformat(created_at) if created_at else None, int(id))
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def row_cursor(row: Any) -> str:
+    return encode_cursor(row.created_at, row.id)
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt,
+    model,
+    cursor: Optional[str] = None,
+    direction: str = AFTER,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False
+) -> Page:
+    """Run ``stmt`` as a keyset-paginated query ordered by ``(created_at, id)``.
+
+    Args:
+        db: Async DB session
+        stmt: Filtered ``select(model)`` statement without ORDER BY / LIMIT
+        model: Mapped class with ``created_at`` and ``id`` columns
+        cursor: Cursor from a previous page, or None for the first page
+        direction: ``after`` (next page) or ``before`` (previous page)
+        limit: Page size (clamped to MAX_PAGE_SIZE)
+        descending: Natural order is newest first
+
+    Returns:
+        Page with items in natural order
+    """
+    if direction not in (AFTER, BEFORE):
+        raise HTTPException(status_code=400, detail="direction must be 'after' or 'before'")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    key = tuple_(model.created_at, model.id)
+
+    # Scan forward in natural order for "after", backward for "before"
+    forward = direction == AFTER
+    scan_desc = descending if forward else not descending
+    if cursor:
+        boundary = tuple_(*decode_cursor(cursor))
+        stmt = stmt.where(key < boundary if scan_desc else key > boundary)
+    if scan_desc:
+        stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        stmt = stmt.order_by(model.created_at.asc(), model.id.asc())
+
+    result = await db.execute(stmt.limit(limit + 1))
+    rows = list(result.scalars().all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+
+    page = Page(items=rows)
+    if rows:
+        if forward:
+            page.next_cursor = row_cursor(rows[-1]) if has_more else None
+            page.prev_cursor = row_cursor(rows[0]) if cursor else None
+        else:
+            page.prev_cursor = row_cursor(rows[0]) if has_more else None
+            page.next_cursor = row_cursor(rows[-1])
+    return page
+
+
+def set_page_headers(response: Response, page: Page):
+    """Expose page cursors as response headers so list bodies stay unchanged."""
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.prev_cursor:
+        response.headers["X-Prev-Cursor"] = page.prev_cursor
@@ -0,0 +1,93 @@
+"""Connection pool metrics (``GET /metrics/db/pool``).
+
+``TimedQueuePool`` is the async engine's queue pool with the time spent
+waiting for a connection measured; pool events count checkouts, new
+connections and invalidations. Together with the live ``size`` /
+``checkedout`` / ``overflow`` figures this shows whether the pool is sized
+for the number of concurrent WebSocket turns.
+"""
+
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from api.services.timings import TimingStats
+
+
+class PoolStats:
+    """Counters and wait-time samples for one engine's pool."""
+
+    def __init__(self):
+        self.waits = TimingStats(window=5000)
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.max_checked_out = 0
+        self._engine = None
+
+    @property
+    def pool(self):
+        # Read through the engine: dispose() replaces the pool object
+        return self._engine.pool if self._engine is not None else None
+
+    def instrument(self, engine):
+        """Attach to an engine (sync or async); wait times need ``TimedQueuePool``."""
+        target = getattr(engine, "sync_engine", engine)
+        self._engine = target
+        event.listen(target, "checkout", self._on_checkout)
+        event.listen(target, "connect", self._on_connect)
+        event.listen(target, "invalidate", self._on_invalidate)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        if self.pool is not None:
+            self.max_checked_out = max(self.max_checked_out, self.pool.checkedout())
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "max_checked_out": self.max_checked_out,
+            "wait": self.waits.get_stats().get("checkout", {}),
+        }
+        pool = self.pool
+        if pool is not None and hasattr(pool, "size"):
+            stats.update({
+                "size": pool.size(),
+                "max_overflow": getattr(pool, "_max_overflow", None),
+                "timeout": pool.timeout() if hasattr(pool, "timeout") else None,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            })
+        return stats
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited (into ``pool_stats``)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.waits.record("checkout", time.perf_counter() - started)
+
+
+# Process-wide instance, attached to the engine in api/core/db.py
+pool_stats = PoolStats()
@@ -0,0 +1,235 @@
+"""SQLAlchemy query instrumentation.
+
+Engine events time every statement and attribute it to the current *query
+scope* (an HTTP request or a WebSocket turn, tracked in a ContextVar so
+tasks spawned inside a scope are included). Per scope we count queries and
+DB time and flag N+1 patterns (the same statement repeated many times);
+process-wide aggregates are served by ``GET /metrics/db``.
+
+Statements slower than ``DB_SLOW_QUERY_MS`` are logged with the *shape* of
+their parameters (names and types, row count for executemany), never the
+values.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+
+from api.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bound the number of distinct statements / scope names kept in memory
+MAX_TRACKED_STATEMENTS = 500
+MAX_TRACKED_SCOPES = 200
+
+_whitespace = re.compile(r"\s+")
+_placeholders = re.compile(r"(\$\d+|%\(\w+\)s|\?)(\s*,\s*(\$\d+|%\(\w+\)s|\?))+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapse whitespace and expanded IN-lists so equal queries group together."""
+    statement = _whitespace.sub(" ", statement).strip()
+    return _placeholders.sub("?, ...", statement)
+
+
+def parameters_shape(parameters: Any, executemany: bool) -> str:
+    """Describe parameters without their values."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameters[0] if parameters else None
+        return f"{len(parameters)} rows x {parameters_shape(first, False)}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+class QueryScope:
+    """Queries issued while handling one request or turn."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, int] = {}
+        self.n_plus_one: set = set()
+
+
+class QueryStats:
+    """Process-wide query aggregates."""
+
+    def __init__(self, slow_query_ms: float = 200.0, n_plus_one_threshold: int = 10):
+        """Initialize the stats.
+
+        Args:
+            slow_query_ms: Log statements taking at least this long (0 = off)
+            n_plus_one_threshold: Repetitions of one statement within a scope
+                that count as an N+1 pattern
+        """
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.current: ContextVar[Optional[QueryScope]] = ContextVar("query_scope", default=None)
+        self.reset()
+
+    def reset(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.slow_queries = 0
+        self.n_plus_one_detected = 0
+        self._statements: Dict[str, Dict[str, float]] = {}
+        self._scopes: Dict[str, Dict[str, float]] = {}
+
+    # ---------------- engine events ----------------
+
+    def instrument(self, engine):
+        """Attach to an engine (sync or async)."""
+        target = getattr(engine, "sync_engine", engine)
+        event.listen(target, "before_cursor_execute", self._before_execute)
+        event.listen(target, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        self.record(statement, elapsed, parameters, executemany)
+
+    def record(self, statement: str, seconds: float, parameters: Any = None, executemany: bool = False):
+        key = normalize_statement(statement)
+        self.queries += 1
+        self.seconds += seconds
+
+        stats = self._statements.get(key)
+        if stats is None and len(self._statements) < MAX_TRACKED_STATEMENTS:
+            stats = self._statements[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        if stats is not None:
+            stats["count"] += 1
+            stats["total_ms"] += seconds * 1000
+            stats["max_ms"] = max(stats["max_ms"], seconds * 1000)
+
+        if self.slow_query_ms and seconds * 1000 >= self.slow_query_ms:
+            self.slow_queries += 1
+            logger.warning(
+                f"Slow query ({seconds * 1000:.0f} ms): {key[:500]} "
+                f"params={parameters_shape(parameters, executemany)}"
+            )
+
+        scope = self.current.get()
+        if scope is not None:
+            scope.count += 1
+            scope.seconds += seconds
+            repeats = scope.statements.get(key, 0) + 1
+            scope.statements[key] = repeats
+            if repeats == self.n_plus_one_threshold and key not in scope.n_plus_one:
+                scope.n_plus_one.add(key)
+                self.n_plus_one_detected += 1
+                logger.warning(
+                    f"Possible N+1 in {scope.name}: statement ran {repeats}+ times: {key[:300]}"
+                )
+
+    # ---------------- scopes ----------------
+
+    @contextmanager
+    def scope(self, name: str):
+        """Attribute queries in the enclosed block (and tasks it spawns) to ``name``."""
+        scope = QueryScope(name)
+        token = self.current.set(scope)
+        try:
+            yield scope
+        finally:
+            self.current.reset(token)
+            self._finish(scope)
+
+    def _finish(self, scope: QueryScope):
+        stats = self._scopes.get(scope.name)
+        if stats is None:
+            if len(self._scopes) >= MAX_TRACKED_SCOPES:
+                return
+            stats = self._scopes[scope.name] = {
+                "count": 0, "queries": 0, "db_ms": 0.0, "max_queries": 0, "n_plus_one": 0
+            }
+        stats["count"] += 1
+        stats["queries"] += scope.count
+        stats["db_ms"] += scope.seconds * 1000
+        stats["max_queries"] = max(stats["max_queries"], scope.count)
+        stats["n_plus_one"] += len(scope.n_plus_one)
+        logger.debug(f"{scope.name}: {scope.count} queries, {scope.seconds * 1000:.1f} ms DB")
+
+    def get_stats(self, top: int = 20) -> Dict[str, Any]:
+        """Totals, per-scope averages and the most expensive statements."""
+        statements = sorted(self._statements.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+        return {
+            "queries": self.queries,
+            "total_ms": round(self.seconds * 1000, 1),
+            "slow_queries": self.slow_queries,
+            "slow_query_ms": self.slow_query_ms,
+            "n_plus_one_detected": self.n_plus_one_detected,
+            "scopes": {
+                name: {
+                    "count": s["count"],
+                    "avg_queries": round(s["queries"] / s["count"], 2),
+                    "avg_db_ms": round(s["db_ms"] / s["count"], 2),
+                    "max_queries": s["max_queries"],
+                    "n_plus_one": s["n_plus_one"],
+                }
+                for name, s in sorted(self._scopes.items())
+            },
+            "top_statements": [
+                {
+                    "statement": key[:500],
+                    "count": s["count"],
+                    "total_ms": round(s["total_ms"], 1),
+                    "avg_ms": round(s["total_ms"] / s["count"], 2),
+                    "max_ms": round(s["max_ms"], 1),
+                }
+                for key, s in statements[:top]
+            ],
+        }
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware opening a query scope per HTTP request.
+
+    Adds ``X-DB-Queries`` / ``X-DB-Time-Ms`` response headers (queries issued
+    before the response started) and aggregates by route template.
+    """
+
+    def __init__(self, app, stats: "QueryStats"):
+        self.app = app
+        self.stats = stats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with self.stats.scope(f"{scope['method']} {scope['path']}") as query_scope:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start":
+                    # Route is resolved by now: group by template, not by raw path
+                    route = scope.get("route")
+                    if route is not None and getattr(route, "path", None):
+                        query_scope.name = f"{scope['method']} {route.path}"
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(query_scope.count).encode()))
+                    headers.append((b"x-db-time-ms", f"{query_scope.seconds * 1000:.1f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
+
+
+# Process-wide instance, attached to the engine in api/core/db.py
+query_stats = QueryStats(
+    slow_query_ms=settings.DB_SLOW_QUERY_MS,
+    n_plus_one_threshold=settings.DB_N_PLUS_ONE_THRESHOLD
+)
@@ -0,0 +1,115 @@
+"""Read-your-writes bookkeeping for replica reads.
+
+Read-only endpoints use the replica session factory (``DB_REPLICA_URL``).
+A replica lags the primary slightly, so a client that just wrote to a
+conversation (chat turn, edit, delete) could read stale data from it. Every
+committed write records the conversations, users and shared conversations
+it touched; reads scoped to one of them go to the primary for
+``DB_READ_YOUR_WRITES_SECONDS`` afterwards.
+
+ORM flushes are picked up automatically; set-based statements (bulk
+inserts, soft deletes) call ``note_write`` / ``note_row_write``.
+Tracking is per process: with several workers, pin a client's WebSocket
+and its reads to one worker or keep the window above the replica lag.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+CONVERSATION = "conversation"
+USER = "user"
+SHARED_CONVERSATION = "shared_conversation"
+
+# Bound memory use; the oldest entries are dropped first
+MAX_TRACKED_WRITES = 10000
+
+_PENDING_KEY = "written_subjects"
+
+# Columns that name a subject, in any table
+SUBJECT_COLUMNS = {
+    "conversation_id": CONVERSATION,
+    "shared_conversation_id": SHARED_CONVERSATION,
+    "user_id": USER,
+}
+
+
+class RecentWrites:
+    """Subjects written within the last ``window`` seconds."""
+
+    def __init__(self, window: float = 10.0, max_entries: int = MAX_TRACKED_WRITES):
+        self.window = window
+        self.max_entries = max_entries
+        self._written: "OrderedDict[Tuple[str, int], float]" = OrderedDict()
+
+    def mark(self, subjects: Iterable[Tuple[str, int]]):
+        now = time.monotonic()
+        for key in subjects:
+            self._written.pop(key, None)
+            self._written[key] = now
+        while len(self._written) > self.max_entries:
+            self._written.popitem(last=False)
+
+    def is_recent(self, kind: str, subject_id: Optional[int]) -> bool:
+        if subject_id is None:
+            return False
+        written = self._written.get((kind, subject_id))
+        return written is not None and time.monotonic() - written < self.window
+
+
+def row_subjects(table: str, values: Mapping[str, Any]) -> Iterable[Tuple[str, int]]:
+    """(kind, id) pairs a write to one row of ``table`` affects."""
+    if table in (CONVERSATION, SHARED_CONVERSATION) and isinstance(values.get("id"), int):
+        yield table, values["id"]
+    for column, kind in SUBJECT_COLUMNS.items():
+        value = values.get(column)
+        if isinstance(value, int):
+            yield kind, value
+
+
+def _pending(db) -> set:
+    session = getattr(db, "sync_session", db)
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+def note_write(db, kind: str, subject_id: Optional[int]):
+    """Record a write made with a set-based statement; applied on commit.
+
+    Args:
+        db: Session (sync or async) the statement ran in
+        kind: CONVERSATION, USER or SHARED_CONVERSATION
+        subject_id: Id of the affected subject
+    """
+    if subject_id is not None:
+        _pending(db).add((kind, subject_id))
+
+
+def note_row_write(db, table: str, values: Mapping[str, Any]):
+    """Record a set-based write of one row, given (some of) its column values."""
+    _pending(db).update(row_subjects(table, values))
+
+
+def install(recent: RecentWrites):
+    """Hook ORM session events so committed writes land in ``recent``."""
+
+    @event.listens_for(Session, "after_flush")
+    def _collect(session, flush_context):
+        pending = _pending(session)
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(obj, "__tablename__", None)
+            if table:
+                # Loaded values only: never trigger a lazy load inside a flush
+                pending.update(row_subjects(table, vars(obj)))
+
+    @event.listens_for(Session, "after_commit")
+    def _publish(session):
+        pending = session.info.pop(_PENDING_KEY, None)
+        if pending:
+            recent.mark(pending)
+
+    @event.listens_for(Session, "after_rollback")
+    def _discard(session):
+        session.info.pop(_PENDING_KEY, None)
@@ -1,8 +1,8 @@
 """Pydantic schemas for API request/response models."""
 
 from typing import List, Optional
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, field_validator
+from datetime import datetime, timezone
 
 
 # ----------------- Base Schemas -----------------
@@ -133,11 +133,29 @@ class Conversation(ConversationBase):
     last_updated: Optional[datetime] = None
     summary: Optional[str] = None
     summary_embedding: Optional[List[float]] = None
+    archived_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class ConversationOverview(BaseModel):
+    message_count: int = 0
+    user_message_count: int = 0
+    agent_message_count: int = 0
+    last_message_at: Optional[datetime] = None
+    last_message_preview: Optional[str] = None
+    last_message_role: Optional[int] = None
+    active_agent_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ConversationWithOverview(Conversation):
+    overview: Optional[ConversationOverview] = None
+
+
 class ConversationAgentBase(BaseModel):
     conversation_id: int
     agent_id: int
@@ -202,6 +220,27 @@ class MessageCreate(MessageBase):
     reaction: Optional[str] = None
 
 
+class MessageBulkItem(MessageCreate):
+    created_at: Optional[datetime] = None  # keep original timestamps when importing history
+
+    @field_validator("created_at")
+    @classmethod
+    def naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # message.created_at is timestamp without time zone: "...Z" / "+07:00" become naive UTC
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class MessageBulkCreate(BaseModel):
+    messages: List[MessageBulkItem]
+
+
+class MessageBulkResult(BaseModel):
+    count: int
+    ids: List[int]
+
+
 class MessageUpdate(BaseModel):
     content: Optional[str] = None
     reaction: Optional[str] = None
@@ -239,6 +278,26 @@ class Message(MessageBase):
     agent_id: Optional[int] = None
     reaction: Optional[str] = None
     last_updated: Optional[datetime] = None
+    # True when `content` is only a preview; full text at GET /messages/{id}/content
+    content_external: bool = False
+    content_length: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class MessageContent(BaseModel):
+    id: int
+    content: str
+
+
+class MessageUsage(BaseModel):
+    scope: str
+    subject_id: int
+    message_count: int
+    content_chars: int
+    first_message_at: Optional[datetime] = None
+    last_message_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
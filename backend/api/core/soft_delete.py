@@ -0,0 +1,66 @@
+"""Set-based soft deletes: one ``UPDATE ... SET status = 0`` per batch.
+
+Rows are never loaded into the session; the database marks every matching
+active row in a single statement. The UPDATE runs in a CTE that only hands
+back the row count and the distinct ids that route reads (conversation /
+user / shared conversation, see read_routing), so replica reads of those
+subjects go to the primary for a while.
+"""
+
+from typing import Dict
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.core.read_routing import CONVERSATION, SHARED_CONVERSATION, SUBJECT_COLUMNS, note_write
+
+
+def soft_delete_stmt(model, *conditions):
+    """Build ``UPDATE model SET status=0, last_updated=now() WHERE status=1 AND ...``."""
+    return (
+        update(model)
+        .where(model.status == 1, *conditions)
+        .values(status=0, last_updated=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _subject_columns(model) -> Dict[str, str]:
+    """Columns of ``model`` naming a read-routing subject, mapped to the subject kind."""
+    columns = {name: kind for name, kind in SUBJECT_COLUMNS.items() if hasattr(model, name)}
+    if model.__tablename__ in (CONVERSATION, SHARED_CONVERSATION):
+        columns["id"] = model.__tablename__
+    return columns
+
+
+async def soft_delete(db: AsyncSession, model, *conditions, commit: bool = True) -> int:
+    """Soft delete all active rows of ``model`` matching ``conditions``.
+
+    Args:
+        db: Async DB session
+        model: Mapped class with ``status`` and ``last_updated`` columns
+        *conditions: WHERE clauses (ANDed)
+        commit: Commit immediately; pass False to batch several statements
+            into one transaction
+
+    Returns:
+        Number of rows soft deleted
+    """
+    subjects = _subject_columns(model)
+    deleted = (
+        soft_delete_stmt(model, *conditions)
+        .returning(*[getattr(model, name) for name in subjects] or [model.status])
+        .cte("deleted")
+    )
+    # One result row: the count plus the distinct subject ids of each kind
+    result = await db.execute(
+        select(func.count(), *(func.array_agg(deleted.c[name].distinct()) for name in subjects))
+        .select_from(deleted)
+    )
+    count, *ids = result.one()
+    for kind, values in zip(subjects.values(), ids):
+        for subject_id in values or ():
+            note_write(db, kind, subject_id)
+    if commit:
+        await db.commit()
+    return count
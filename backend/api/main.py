@@ -5,7 +5,7 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Query, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uuid
@@ -22,7 +22,18 @@ from api.routers import shared_conversation
 from api.routers import mcp
 from api.websocket.agents.chat_agent import ChatAgent
 from api.websocket.utils.session import SessionManager
-from api.websocket.utils.message import Message
+from api.websocket.utils.registry import create_registry
+from api.websocket.utils.pipeline import TurnPipeline
+from api.websocket.utils.message import Message, MessageType
+from api.core.config import settings
+from api.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, set_page_headers
+from api.core.query_stats import QueryStatsMiddleware, query_stats
+from api.core.pool_stats import pool_stats
+from api.core.http_cache import reference_cache
+from api.services.archiver import message_archiver
+from api.services.llm_scheduler import llm_scheduler
+from api.services.response_cache import response_cache
+from api.services.timings import timings, process_memory
 
 # Configure logging
 logging.basicConfig(
@@ -39,10 +50,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "X-DB-Queries", "X-DB-Time-Ms", "ETag", "Last-Modified"],
 )
+app.add_middleware(QueryStatsMiddleware, stats=query_stats)
 
 # Initialize WebSocket session manager
-session_manager = SessionManager()
+session_manager = SessionManager(
+    outbound_queue_size=settings.WS_OUTBOUND_QUEUE_SIZE,
+    slow_consumer_policy=settings.WS_SLOW_CONSUMER_POLICY,
+    idle_timeout=settings.WS_IDLE_TIMEOUT,
+    ping_interval=settings.WS_PING_INTERVAL,
+    memory_limit=settings.WS_MEMORY_LIMIT_MB * 1024 * 1024,
+    registry=create_registry(settings.WS_REGISTRY_BACKEND, settings.WS_REGISTRY_PATH),
+    resume_grace=settings.WS_RESUME_GRACE_SECONDS,
+    chunk_size=settings.WS_CHUNK_SIZE,
+    binary_threshold=settings.WS_BINARY_THRESHOLD
+)
 
 # register routers
 app.include_router(conversation.router, tags=["conversation"])
@@ -66,118 +89,228 @@ def healthcheck():
 async def get_ws_stats():
     """Get WebSocket server statistics."""
     return JSONResponse({
-        "active_sessions": session_manager.get_active_count(),
+        "active_sessions": await session_manager.get_global_count(),
+        "worker": {
+            "active_sessions": session_manager.get_active_count(),
+            "registry": session_manager.registry.get_stats(),
+        },
+        "outbound_queues": session_manager.get_queue_stats(),
+        "memory": session_manager.get_memory_stats(),
+        "llm": llm_scheduler.get_stats(),
+        "response_cache": response_cache.get_stats(),
+        "timings": timings.get_stats(),
+        "process": process_memory(),
+    })
+
+@app.get("/metrics/db")
+async def get_db_metrics(top: int = Query(20, ge=1, le=100)):
+    """Query counts and DB time per route / WebSocket turn, slow queries, N+1 hits, top statements."""
+    return JSONResponse(query_stats.get_stats(top=top))
+
+@app.get("/metrics/db/pool")
+async def get_db_pool_metrics():
+    """Connection pool size, checked-out / overflow counts and checkout wait times."""
+    return JSONResponse({
+        "profile": settings.DB_PROFILE,
+        "config": settings.db_pool_options,
+        "pool": pool_stats.get_stats(),
+        # Compare against the pool: each running turn may hold a connection
+        "active_ws_sessions": session_manager.get_active_count(),
     })
 
+@app.get("/metrics/http-cache")
+async def get_http_cache_metrics():
+    """Reference-data response cache: hits, misses, 304s and invalidations."""
+    return JSONResponse(reference_cache.get_stats())
+
+@app.get("/metrics/db/archive")
+async def get_db_archive_metrics():
+    """Archiver counters (this worker) and message_archive totals."""
+    return JSONResponse(await message_archiver.get_stats())
+
 @app.get("/ws/conversation/{conversation_id}/messages")
-async def get_conversation_messages(conversation_id: int):
-    """Get all messages from a conversation."""
-    from api.core.db import async_session
+async def get_conversation_messages(
+    conversation_id: int,
+    response: Response,
+    cursor: str = None,
+    direction: str = "after",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Get messages from a conversation, oldest first.
+    
+    Paged by cursor: follow the X-Next-Cursor header (direction=after) to load
+    newer messages or X-Prev-Cursor (direction=before) for older ones.
+    """
     from api.core.models import Message
+    from api.services.archiver import conversation_read_session
     from sqlalchemy import select
     
-    async with async_session() as db:
-        stmt = select(Message).where(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at.asc())
-        result = await db.execute(stmt)
-        messages = result.scalars().all()
+    # Restored first if archived; replica, except right after this conversation's writes
+    async with conversation_read_session(conversation_id) as db:
+        stmt = select(Message).where(Message.conversation_id == conversation_id)
+        page = await paginate(db, stmt, Message, cursor=cursor, direction=direction, limit=limit)
+        set_page_headers(response, page)
         
         return [{
             "id": msg.id,
             "role": msg.role,
-            "content": msg.content,
+            "content": msg.content,  # preview when content_external; full text at /messages/{id}/content
+            "content_external": msg.content_external,
             "user_id": msg.user_id,
             "agent_id": msg.agent_id,
             "created_at": msg.created_at.isoformat() if msg.created_at else None
-        } for msg in messages]
+        } for msg in page.items]
 
 @app.websocket("/ws/chat")
 async def websocket_chat_endpoint(
     websocket: WebSocket,
     user_id: int = 1,  # Default user ID, should be from auth token
     agent_id: int = 1,  # Default agent ID
-    conversation_id: int = None  # Optional: continue existing conversation
+    conversation_id: int = None,  # Optional: continue existing conversation
+    resume_token: str = None,  # Optional: reattach to a recently disconnected session
+    chunked: bool = False,  # Client reassembles chunked frames (metadata.chunk)
+    binary: bool = False  # Client accepts gzip-compressed binary frames
 ):
     """WebSocket endpoint for chat communication.
     
     Each connection creates a new session with its own agent instance.
-    Messages are processed by the agent and responses are pushed back to the client.
+    A receiver loop reads frames and puts chat messages on a bounded queue;
+    a per-session worker processes them in order and pushes responses back.
+    While a turn is running the client can still send commands:
+    - {"type": "command", "content": "cancel"}: abort the running turn
+      (with "metadata": {"clear_queue": true} also drops queued messages)
+    - {"type": "command", "content": "ping"}: heartbeat, answered with "pong"
+    - {"type": "command", "content": "pong"}: reply to a server heartbeat ping;
+      sessions silent for WS_IDLE_TIMEOUT seconds are closed
+    
+    The welcome message carries a resume token in its metadata. Reconnecting
+    with ?resume_token=... within WS_RESUME_GRACE_SECONDS reattaches to the
+    same warm agent and replays frames that were not delivered.
+    
+    Large replies (Mermaid diagrams, reports) are sent as chunked text frames
+    (?chunked=true) or one gzip-compressed binary frame (?binary=true) when the
+    client opts in; permessage-deflate is negotiated by the server as well.
     
     Query parameters:
     - user_id: User ID (default: 1)
     - agent_id: Agent ID (default: 1)
     - conversation_id: Optional conversation ID to continue existing chat
+    - resume_token: Optional token from a previous welcome message
+    - chunked: Accept chunked frames for large payloads (default: false)
+    - binary: Accept gzip binary frames for large payloads (default: false)
     """
-    session_id = str(uuid.uuid4())
-    agent = None
+    session_id = None
+    pipeline = None
+    capabilities = {"chunked": chunked, "binary": binary}
     
     try:
         # Accept WebSocket connection
         await websocket.accept()
-        logger.info(f"New WebSocket connection: {session_id} (user={user_id}, agent={agent_id})")
-        
-        # Create agent instance for this session
-        agent = ChatAgent(session_id, user_id=user_id, agent_id=agent_id)
-        
-        # Set conversation ID if continuing existing chat
-        if conversation_id:
-            agent.conversation_id = conversation_id
         
-        # Register session
-        session_manager.register(session_id, websocket, agent)
+        if resume_token:
+            session_id = session_manager.resume(
+                resume_token, websocket, user_id=user_id, capabilities=capabilities
+            )
         
-        # Send welcome message
-        welcome_msg = Message.system(
-            f"Welcome! Your session ID is {session_id[:8]}... Type /help for commands."
-        )
-        await websocket.send_text(welcome_msg.to_json())
+        if session_id:
+            session = session_manager.get_session(session_id)
+            pipeline = session["pipeline"]
+            logger.info(f"WebSocket resumed: {session_id} (user={user_id})")
+            await session_manager.send_message(session_id, Message.system(
+                f"Session {session_id[:8]}... resumed.",
+                metadata={"resumed": True, "session_id": session_id, "resume_token": resume_token}
+            ))
+        else:
+            session_id = str(uuid.uuid4())
+            logger.info(f"New WebSocket connection: {session_id} (user={user_id}, agent={agent_id})")
+            
+            # Create agent instance for this session
+            agent = ChatAgent(session_id, user_id=user_id, agent_id=agent_id)
+            
+            # Set conversation ID if continuing existing chat
+            if conversation_id:
+                agent.conversation_id = conversation_id
+                # Bring an archived conversation back before its history is read
+                await message_archiver.restore_conversation(conversation_id)
+            
+            async def send(msg: Message, sid: str = session_id):
+                # Delivered by the session's writer task (bounded outbound queue)
+                await session_manager.send_message(sid, msg)
+            
+            pipeline = TurnPipeline(
+                session_id,
+                agent,
+                send,
+                queue_size=settings.WS_INBOUND_QUEUE_SIZE,
+                on_busy=lambda busy, sid=session_id: session_manager.set_busy(sid, busy)
+            )
+            
+            # Register session; the pipeline is stopped when the session is finally removed
+            token = session_manager.register(
+                session_id, websocket, agent, on_close=pipeline.close, capabilities=capabilities
+            )
+            session_manager.get_session(session_id)["pipeline"] = pipeline
+            
+            # Send welcome message
+            welcome_msg = Message.system(
+                f"Welcome! Your session ID is {session_id[:8]}... Type /help for commands.",
+                metadata={"session_id": session_id, "resume_token": token}
+            )
+            await send(welcome_msg)
+            
+            pipeline.start()
         
-        # Main message loop
+        # Receiver loop: never blocks on message processing
         while True:
             # Receive message from client
             raw_message = await websocket.receive_text()
+            session_manager.touch(session_id)
             logger.info(f"[{session_id[:8]}] Received: {raw_message[:100]}")
             
             # Parse message
             message = Message.from_json(raw_message)
             
+            if message.message_type == MessageType.COMMAND:
+                command = message.content.strip().lower()
+                if command in ("cancel", "stop"):
+                    pipeline.cancel_turn(clear_queue=bool(message.metadata.get("clear_queue")))
+                    continue
+                if command == "pong":
+                    # Heartbeat reply; activity already recorded
+                    continue
+                if command == "ping":
+                    await session_manager.send_message(
+                        session_id,
+                        Message.system("pong", metadata={"heartbeat": True})
+                    )
+                    continue
+            
             # Handle empty messages
             if not message.content.strip():
                 continue
             
-            try:
-                # Send typing indicator (optional)
-                typing_msg = Message.typing(True)
-                await websocket.send_text(typing_msg.to_json())
-                
-                # Process message with agent
-                response_text = await agent.handle_message(message.content)
-                
-                # Send response
-                response_msg = Message.text(response_text)
-                await websocket.send_text(response_msg.to_json())
-                
-                logger.info(f"[{session_id[:8]}] Sent response: {response_text[:100]}")
-                
-            except Exception as e:
-                logger.error(f"Error processing message for {session_id}: {e}", exc_info=True)
-                error_msg = Message.error(
-                    f"Failed to process message: {str(e)}",
-                    error_code="PROCESSING_ERROR"
-                )
-                await websocket.send_text(error_msg.to_json())
+            if not pipeline.submit(message):
+                await session_manager.send_message(session_id, Message.error(
+                    "Too many pending messages, please wait for the current reply.",
+                    error_code="QUEUE_FULL"
+                ))
     
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected: {session_id}")
+        # Keep the session warm for a reconnect; a running turn still completes
+        if session_id and session_manager.detach(session_id, websocket):
+            session_id = None
     
     except Exception as e:
         logger.error(f"Unexpected error for session {session_id}: {e}", exc_info=True)
     
     finally:
-        # Clean up session
-        session_manager.unregister(session_id)
-        logger.info(f"Session cleaned up: {session_id}")
+        if session_id:
+            session = session_manager.get_session(session_id)
+            if session is not None and session["websocket"] is websocket:
+                # Clean up session (also stops its pipeline)
+                session_manager.unregister(session_id)
+                logger.info(f"Session cleaned up: {session_id}")
 
 # Startup and shutdown events
 @app.on_event("startup")
@@ -185,8 +318,15 @@ async def startup_event():
     """Log server startup."""
     logger.info("AlphaCode API with WebSocket support started")
     logger.info("WebSocket endpoint: ws://localhost:8000/ws/chat")
+    await session_manager.start_registry()
+    session_manager.start_janitor(settings.WS_SWEEP_INTERVAL)
+    if settings.ARCHIVE_ENABLED:
+        message_archiver.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Log server shutdown."""
     logger.info("AlphaCode API shutting down")
+    session_manager.stop_janitor()
+    message_archiver.stop()
+    await session_manager.stop_registry()
@@ -1,9 +1,12 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import or_, select
+from sqlalchemy.orm import contains_eager
 
-from api.core.models import Conversation, ConversationAgent  # phải là SQLAlchemy Base model
+from api.core.models import Conversation, ConversationAgent, ConversationOverview, Message, SharedConversation  # phải là SQLAlchemy Base model
+from api.core.pagination import Page, paginate, AFTER, DEFAULT_PAGE_SIZE
+from api.core.soft_delete import soft_delete
 
 
 class ConversationRepository:
@@ -21,14 +24,47 @@ class ConversationRepository:
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
     
-    async def get_conversation_by_user_id(self, db: AsyncSession, user_id: int, skip: int = 0, limit: int = 20) -> List[Conversation]:
+    @staticmethod
+    def _with_overview(stmt):
+        # Sidebar data in the same query: LEFT JOIN the read model, no extra round trips
+        return stmt.outerjoin(
+            ConversationOverview, ConversationOverview.conversation_id == Conversation.id
+        ).options(contains_eager(Conversation.overview))
+
+    async def get_conversation_by_user_id(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 20,
+        with_overview: bool = False
+    ) -> List[Conversation]:
         stmt = select(Conversation).where(
             Conversation.user_id == user_id,
             Conversation.status == 1  # Only active conversations
         ).order_by(Conversation.created_at.desc()).offset(skip).limit(limit)
+        if with_overview:
+            stmt = self._with_overview(stmt)
         result = await db.execute(stmt)
         return result.scalars().all()
 
+    async def get_conversation_page(
+        self,
+        db: AsyncSession,
+        user_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        direction: str = AFTER,
+        limit: int = DEFAULT_PAGE_SIZE,
+        with_overview: bool = False
+    ) -> Page:
+        """Keyset page of active conversations, newest first."""
+        stmt = select(Conversation).where(Conversation.status == 1)
+        if user_id is not None:
+            stmt = stmt.where(Conversation.user_id == user_id)
+        if with_overview:
+            stmt = self._with_overview(stmt)
+        return await paginate(db, stmt, Conversation, cursor=cursor, direction=direction, limit=limit, descending=True)
+
     async def list_conversations(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Conversation]:
         stmt = select(Conversation).where(
             Conversation.status == 1  # Only active conversations
@@ -49,6 +85,38 @@ class ConversationRepository:
         db.add(convo)
         await db.commit()
 
+    async def delete_conversation_cascade(self, db: AsyncSession, conversation_id: int) -> Optional[Dict[str, int]]:
+        """Soft delete a conversation with its messages, agents and shares.
+
+        One UPDATE per table, committed as a single transaction.
+
+        Returns:
+            Affected-row counts per table, or None if the conversation
+            does not exist or is already deleted
+        """
+        deleted = await soft_delete(db, Conversation, Conversation.id == conversation_id, commit=False)
+        if not deleted:
+            await db.rollback()
+            return None
+
+        share_ids = select(SharedConversation.id).where(SharedConversation.conversation_id == conversation_id)
+        counts = {
+            "conversation": deleted,
+            "messages": await soft_delete(
+                db, Message,
+                or_(Message.conversation_id == conversation_id, Message.shared_conversation_id.in_(share_ids)),
+                commit=False
+            ),
+            "agents": await soft_delete(
+                db, ConversationAgent, ConversationAgent.conversation_id == conversation_id, commit=False
+            ),
+            "shared_conversations": await soft_delete(
+                db, SharedConversation, SharedConversation.conversation_id == conversation_id, commit=False
+            ),
+        }
+        await db.commit()
+        return counts
+
     async def create_conversation_agent(self, db: AsyncSession, ca: ConversationAgent) -> ConversationAgent:
         db.add(ca)
         await db.commit()
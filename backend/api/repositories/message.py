@@ -1,18 +1,22 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_, insert, update
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 
-from api.core.models import Message, User, Agent
+from api.core.config import settings
+from api.core.models import Conversation, Message, MessageBody, MessageUsageRollup, SharedConversation, User, Agent
+from api.core.message_storage import decompress, load_content, set_content, split_content
+from api.core.pagination import Page, paginate, AFTER, DEFAULT_PAGE_SIZE
+from api.core.read_routing import note_row_write
+from api.core.soft_delete import soft_delete
+from api.repositories.message_archive import MessageArchiveRepository
 
 
 class MessageRepository:
-    
-    def __init__(self, db: Session):
-        self.db = db
-    
-    def create(
+
+    async def create(
             self,
+            db: AsyncSession,
             role: int,
             content: str,
             content_type: int,
@@ -25,7 +29,6 @@ class MessageRepository:
     ) -> Message:
         message = Message(
             role=role,
-            content=content,
             content_type=content_type,
             message_type=message_type,
             conversation_id=conversation_id,
@@ -36,152 +39,287 @@ class MessageRepository:
             created_at=datetime.now(),
             status=1
         )
-        self.db.add(message)
-        self.db.commit()
-        self.db.refresh(message)
+        db.add(message)
+        await set_content(db, message, content)
+        await db.commit()
+        await db.refresh(message)
         return message
-    
-    def get_by_id(self, id: int) -> Optional[Message]:
-        return self.db.query(Message).filter(
+
+    async def bulk_create(self, db: AsyncSession, rows: List[Dict], chunk_size: int = 1000) -> List[int]:
+        """Insert many messages with multi-row INSERT ... RETURNING id.
+
+        All chunks share one transaction; ``last_updated`` of the touched
+        conversations is bumped once at the end. Missing monthly partitions
+        for back-dated messages are created beforehand.
+
+        Returns:
+            New message ids, in input order
+        """
+        now = datetime.now()
+        # Imported history keeps its created_at: give its months a partition
+        # first (own short transaction), so it does not land in message_default
+        oldest = min((row["created_at"] for row in rows if row.get("created_at")), default=None)
+        if oldest is not None and (oldest.year, oldest.month) < (now.year, now.month):
+            await MessageArchiveRepository().ensure_partitions(
+                db, settings.MESSAGE_PARTITION_MONTHS_AHEAD, from_date=oldest.date()
+            )
+
+        ids: List[int] = []
+        try:
+            for start in range(0, len(rows), chunk_size):
+                chunk, bodies = [], []
+                for row in rows[start:start + chunk_size]:
+                    inline, length, body = split_content(row["content"])
+                    chunk.append({
+                        **row,
+                        "content": inline,
+                        "content_length": length,
+                        "created_at": row.get("created_at") or now,
+                        "status": 1
+                    })
+                    bodies.append(body)
+                # "insertmanyvalues": one multi-row INSERT per chunk, ids kept in parameter order
+                result = await db.execute(
+                    insert(Message).returning(Message.id, sort_by_parameter_order=True),
+                    chunk
+                )
+                chunk_ids = result.scalars().all()
+                ids.extend(chunk_ids)
+                for row in chunk:
+                    note_row_write(db, Message.__tablename__, row)
+
+                large = [
+                    {"message_id": id, "encoding": body[0], "data": body[1]}
+                    for id, body in zip(chunk_ids, bodies) if body is not None
+                ]
+                if large:
+                    await db.execute(insert(MessageBody), large)
+
+            conversation_ids = {row["conversation_id"] for row in rows if row.get("conversation_id")}
+            if conversation_ids:
+                await db.execute(
+                    update(Conversation)
+                    .where(Conversation.id.in_(conversation_ids))
+                    .values(last_updated=now)
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        return ids
+
+    async def find_missing_parents(
+            self,
+            db: AsyncSession,
+            conversation_ids: Iterable[int],
+            shared_conversation_ids: Iterable[int]
+    ) -> Dict[str, List[int]]:
+        """Ids among the given ones with no active conversation / shared conversation."""
+        missing = {}
+        for key, model, wanted in (
+            ("conversation_id", Conversation, set(conversation_ids)),
+            ("shared_conversation_id", SharedConversation, set(shared_conversation_ids)),
+        ):
+            if not wanted:
+                continue
+            result = await db.execute(select(model.id).where(model.id.in_(wanted), model.status == 1))
+            absent = wanted - set(result.scalars().all())
+            if absent:
+                missing[key] = sorted(absent)
+        return missing
+
+    async def get_by_id(self, db: AsyncSession, id: int) -> Optional[Message]:
+        stmt = select(Message).where(
             and_(
                 Message.id == id,
                 Message.status == 1
             )
-        ).first()
-    
-    def get_all(self, skip: int = 0, limit: int = 100) -> List[Message]:
-        return self.db.query(Message).filter(
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_all(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Message]:
+        stmt = select(Message).where(
             Message.status == 1
-        ).offset(skip).limit(limit).all()
-    
-    def get_by_conversation_id(
+        ).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_by_conversation_id(
             self,
+            db: AsyncSession,
             conversation_id: int,
             skip: int = 0,
-            limit: int = 100
+            limit: Optional[int] = 100
     ) -> List[Message]:
-        return self.db.query(Message).filter(
+        stmt = select(Message).where(
             and_(
                 Message.conversation_id == conversation_id,
                 Message.status == 1
             )
-        ).order_by(Message.created_at.asc()).offset(skip).limit(limit).all()
-    
-    def get_by_shared_conversation_id(
+        ).order_by(Message.created_at.asc()).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_by_shared_conversation_id(
             self,
+            db: AsyncSession,
             shared_conversation_id: int,
             skip: int = 0,
-            limit: int = 100
+            limit: Optional[int] = 100
     ) -> List[Message]:
-        return self.db.query(Message).filter(
+        stmt = select(Message).where(
             and_(
                 Message.shared_conversation_id == shared_conversation_id,
                 Message.status == 1
             )
-        ).order_by(Message.created_at.asc()).offset(skip).limit(limit).all()
-    
-    def get_by_user_id(self, user_id: int) -> List[Message]:
-        return self.db.query(Message).filter(
+        ).order_by(Message.created_at.asc()).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_page(
+            self,
+            db: AsyncSession,
+            cursor: Optional[str] = None,
+            direction: str = AFTER,
+            limit: int = DEFAULT_PAGE_SIZE,
+            conversation_id: Optional[int] = None,
+            shared_conversation_id: Optional[int] = None,
+            user_id: Optional[int] = None,
+            agent_id: Optional[int] = None
+    ) -> Page:
+        """Keyset page of active messages, oldest first, optionally filtered."""
+        stmt = select(Message).where(Message.status == 1)
+        if conversation_id is not None:
+            stmt = stmt.where(Message.conversation_id == conversation_id)
+        if shared_conversation_id is not None:
+            stmt = stmt.where(Message.shared_conversation_id == shared_conversation_id)
+        if user_id is not None:
+            stmt = stmt.where(Message.user_id == user_id)
+        if agent_id is not None:
+            stmt = stmt.where(Message.agent_id == agent_id)
+        return await paginate(db, stmt, Message, cursor=cursor, direction=direction, limit=limit)
+
+    async def stream(
+            self,
+            db: AsyncSession,
+            conversation_id: Optional[int] = None,
+            user_id: Optional[int] = None,
+            batch_size: int = 500
+    ) -> AsyncIterator[Tuple[Message, str]]:
+        """Yield ``(message, full_content)`` oldest first through a server-side cursor.
+
+        Only ``batch_size`` rows are buffered at a time; out-of-line bodies
+        come along through the outer join and are decompressed one by one.
+        """
+        stmt = select(Message, MessageBody.encoding, MessageBody.data).outerjoin(
+            MessageBody, MessageBody.message_id == Message.id
+        ).where(Message.status == 1)
+        if conversation_id is not None:
+            stmt = stmt.where(Message.conversation_id == conversation_id)
+        if user_id is not None:
+            stmt = stmt.where(Message.user_id == user_id)
+        stmt = stmt.order_by(Message.created_at.asc(), Message.id.asc()) \
+            .execution_options(yield_per=batch_size)
+
+        result = await db.stream(stmt)
+        async for message, encoding, data in result:
+            yield message, (decompress(encoding, data) if data is not None else message.content)
+
+    async def get_by_user_id(self, db: AsyncSession, user_id: int) -> List[Message]:
+        stmt = select(Message).where(
             and_(
                 Message.user_id == user_id,
                 Message.status == 1
             )
-        ).order_by(Message.created_at.asc()).all()
-    
-    def get_by_agent_id(self, agent_id: int) -> List[Message]:
-        return self.db.query(Message).filter(
+        ).order_by(Message.created_at.asc())
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_by_agent_id(self, db: AsyncSession, agent_id: int) -> List[Message]:
+        stmt = select(Message).where(
             and_(
                 Message.agent_id == agent_id,
                 Message.status == 1
             )
-        ).order_by(Message.created_at.asc()).all()
-    
-    def update(self, id: int, **kwargs) -> Optional[Message]:
-        message = self.get_by_id(id)
+        ).order_by(Message.created_at.asc())
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def update(self, db: AsyncSession, id: int, **kwargs) -> Optional[Message]:
+        message = await self.get_by_id(db, id)
         if not message:
             return None
-        
+
+        content = kwargs.pop("content", None)
+        if content is not None:
+            await set_content(db, message, content)
+
         for key, value in kwargs.items():
             if hasattr(message, key):
                 setattr(message, key, value)
-        
+
         message.last_updated = datetime.now()
-        self.db.commit()
-        self.db.refresh(message)
+        await db.commit()
+        await db.refresh(message)
         return message
-    
-    def update_reaction(self, id: int, reaction: str) -> Optional[Message]:
-        return self.update(id, reaction=reaction)
-    
-    def delete(self, id: int) -> bool:
-        message = self.get_by_id(id)
+
+    async def get_content(self, db: AsyncSession, id: int) -> Optional[str]:
+        """Full content of a message, decompressing it if stored out of line."""
+        message = await self.get_by_id(db, id)
         if not message:
-            return False
-        
-        message.status = 0
-        message.last_updated = datetime.now()
-        self.db.commit()
-        return True
-    
-    def delete_by_conversation_id(self, conversation_id: int) -> bool:
-        messages = self.get_by_conversation_id(conversation_id)
-        if not messages:
-            return False
-        
-        for message in messages:
-            message.status = 0
-            message.last_updated = datetime.now()
-        
-        self.db.commit()
-        return True
-    
-    def delete_by_shared_conversation_id(self, shared_conversation_id: int) -> bool:
-        messages = self.get_by_shared_conversation_id(shared_conversation_id)
-        if not messages:
-            return False
-        
-        for message in messages:
-            message.status = 0
-            message.last_updated = datetime.now()
-        
-        self.db.commit()
-        return True
-    
+            return None
+        return await load_content(db, message)
+
+    async def update_reaction(self, db: AsyncSession, id: int, reaction: str) -> Optional[Message]:
+        return await self.update(db, id, reaction=reaction)
+
+    async def delete(self, db: AsyncSession, id: int) -> bool:
+        return await soft_delete(db, Message, Message.id == id) > 0
+
+    async def delete_by_conversation_id(self, db: AsyncSession, conversation_id: int) -> int:
+        """Soft delete every active message of a conversation; returns the row count."""
+        return await soft_delete(db, Message, Message.conversation_id == conversation_id)
+
+    async def delete_by_shared_conversation_id(self, db: AsyncSession, shared_conversation_id: int) -> int:
+        """Soft delete every active message of a shared conversation; returns the row count."""
+        return await soft_delete(db, Message, Message.shared_conversation_id == shared_conversation_id)
+
     # Advanced queries
-    def get_with_relations(self, conversation_id: int) -> List[Message]:
-        return self.db.query(Message).join(User).join(Agent).filter(
+    async def get_with_relations(self, db: AsyncSession, conversation_id: int) -> List[Message]:
+        stmt = select(Message).join(User).join(Agent).where(
             and_(
                 Message.conversation_id == conversation_id,
                 Message.status == 1
             )
-        ).order_by(Message.created_at.asc()).all()
-    
-    def get_conversation_statistics(self, conversation_id: int) -> dict:
-        total_messages = self.db.query(Message).filter(
-            and_(
-                Message.conversation_id == conversation_id,
-                Message.status == 1
-            )
-        ).count()
-        
-        user_messages = self.db.query(Message).filter(
-            and_(
-                Message.conversation_id == conversation_id,
-                Message.user_id.isnot(None),
-                Message.status == 1
-            )
-        ).count()
-        
-        agent_messages = self.db.query(Message).filter(
+        ).order_by(Message.created_at.asc())
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_conversation_statistics(self, db: AsyncSession, conversation_id: int) -> dict:
+        # One pass over the conversation's messages: COUNT(*) FILTER (WHERE ...)
+        stmt = select(
+            func.count(Message.id).label("total_messages"),
+            func.count(Message.id).filter(Message.user_id.isnot(None)).label("user_messages"),
+            func.count(Message.id).filter(Message.agent_id.isnot(None)).label("agent_messages")
+        ).where(
             and_(
                 Message.conversation_id == conversation_id,
-                Message.agent_id.isnot(None),
                 Message.status == 1
             )
-        ).count()
-        
-        return {
-            "total_messages": total_messages,
-            "user_messages": user_messages,
-            "agent_messages": agent_messages
-        }
\ No newline at end of file
+        )
+        result = await db.execute(stmt)
+        return dict(result.one()._mapping)
+
+    async def get_usage(self, db: AsyncSession, scope: str, subject_id: int) -> Optional[MessageUsageRollup]:
+        """Rollup row for one user or agent (primary-key lookup)."""
+        return await db.get(MessageUsageRollup, (scope, subject_id))
+
+    async def get_top_usage(self, db: AsyncSession, scope: str, limit: int = 20) -> List[MessageUsageRollup]:
+        """Users or agents with the most messages."""
+        stmt = select(MessageUsageRollup).where(
+            MessageUsageRollup.scope == scope
+        ).order_by(MessageUsageRollup.message_count.desc()).limit(limit)
+        result = await db.execute(stmt)
+        return result.scalars().all()
@@ -0,0 +1,234 @@
+import json
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.core.message_storage import compress, decompress, load_contents, split_content
+from api.core.models import Conversation, ConversationOverview, Message, MessageArchive, MessageBody
+from api.core.read_routing import CONVERSATION, note_row_write, note_write
+
+# message_archive.kind
+ARCHIVED_CONVERSATION = "conversation"
+ARCHIVED_DELETED = "deleted"
+
+# Columns serialized per archived message (content is the full text)
+ARCHIVE_COLUMNS = (
+    "id", "role", "created_at", "status", "content_type", "message_type",
+    "shared_conversation_id", "conversation_id", "user_id", "agent_id", "reaction", "last_updated",
+)
+
+
+def _dump(message: Message, content: str) -> Dict:
+    item = {column: getattr(message, column) for column in ARCHIVE_COLUMNS}
+    item["created_at"] = message.created_at.isoformat()
+    item["last_updated"] = message.last_updated.isoformat() if message.last_updated else None
+    item["content"] = content
+    return item
+
+
+def _load(item: Dict) -> Dict:
+    row = dict(item)
+    row["created_at"] = datetime.fromisoformat(item["created_at"])
+    row["last_updated"] = datetime.fromisoformat(item["last_updated"]) if item["last_updated"] else None
+    return row
+
+
+class MessageArchiveRepository:
+
+    async def ensure_partitions(self, db: AsyncSession, months_ahead: int, from_date: Optional[date] = None) -> int:
+        """Create missing monthly ``message`` partitions; returns how many.
+
+        Args:
+            db: Async DB session (committed, so the partition locks are short)
+            months_ahead: Months after the current one to cover
+            from_date: First month to cover (default: the current month)
+        """
+        created = await db.scalar(
+            select(func.message_ensure_partitions(from_date or func.current_date(), months_ahead))
+        )
+        await db.commit()
+        return created or 0
+
+    async def find_inactive_conversations(self, db: AsyncSession, before: datetime, limit: int) -> List[int]:
+        """Unarchived conversations whose last message (or update) is older than ``before``."""
+        last_activity = func.coalesce(
+            ConversationOverview.last_message_at, Conversation.last_updated, Conversation.created_at
+        )
+        stmt = (
+            select(Conversation.id)
+            .outerjoin(ConversationOverview, ConversationOverview.conversation_id == Conversation.id)
+            .where(Conversation.archived_at.is_(None), last_activity < before)
+            .order_by(last_activity)
+            .limit(limit)
+        )
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+
+    async def find_archived_conversations(self, db: AsyncSession, user_id: int) -> List[int]:
+        """Archived conversations of a user."""
+        result = await db.execute(
+            select(Conversation.id)
+            .where(Conversation.user_id == user_id, Conversation.archived_at.isnot(None))
+            .order_by(Conversation.id)
+        )
+        return list(result.scalars().all())
+
+    async def _write_archive(self, db: AsyncSession, kind: str, conversation_id: Optional[int], messages: List[Message]):
+        """Compress ``messages`` into one archive row and delete them (and their bodies)."""
+        contents = await load_contents(db, messages)
+        payload = json.dumps([_dump(m, contents[m.id]) for m in messages], ensure_ascii=False)
+        encoding, data = compress(payload)
+        created = [m.created_at for m in messages]
+        db.add(MessageArchive(
+            kind=kind,
+            conversation_id=conversation_id,
+            message_count=len(messages),
+            first_message_at=min(created),
+            last_message_at=max(created),
+            encoding=encoding,
+            data=data,
+            archived_at=datetime.utcnow(),
+        ))
+        ids = [m.id for m in messages]
+        await db.execute(delete(MessageBody).where(MessageBody.message_id.in_(ids)))
+        # The created_at range lets the planner skip untouched partitions
+        await db.execute(
+            delete(Message)
+            .where(Message.id.in_(ids), Message.created_at.between(min(created), max(created)))
+            .execution_options(synchronize_session=False)
+        )
+
+    async def archive_conversation(self, db: AsyncSession, conversation_id: int, chunk_size: int = 1000) -> Optional[int]:
+        """Move a conversation's active messages into ``message_archive``.
+
+        The conversation row is locked (SKIP LOCKED), so concurrent archivers
+        and restores never work on the same conversation.
+
+        Returns:
+            Number of messages archived, or None if the conversation is
+            locked or already archived
+        """
+        locked = await db.scalar(
+            select(Conversation.id)
+            .where(Conversation.id == conversation_id, Conversation.archived_at.is_(None))
+            .with_for_update(skip_locked=True)
+        )
+        if locked is None:
+            await db.rollback()
+            return None
+
+        result = await db.execute(
+            select(Message)
+            .where(Message.conversation_id == conversation_id, Message.status == 1)
+            .order_by(Message.created_at, Message.id)
+        )
+        messages = list(result.scalars().all())
+        for start in range(0, len(messages), chunk_size):
+            await self._write_archive(
+                db, ARCHIVED_CONVERSATION, conversation_id, messages[start:start + chunk_size]
+            )
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(archived_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        note_write(db, CONVERSATION, conversation_id)
+        await db.commit()
+        return len(messages)
+
+    async def archive_deleted(self, db: AsyncSession, limit: int) -> int:
+        """Move up to ``limit`` soft-deleted messages into ``message_archive``; returns the count."""
+        result = await db.execute(
+            select(Message)
+            .where(Message.status == 0)
+            .order_by(Message.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        messages = list(result.scalars().all())
+        groups: Dict[Optional[int], List[Message]] = {}
+        for message in messages:
+            groups.setdefault(message.conversation_id, []).append(message)
+        for conversation_id, group in groups.items():
+            await self._write_archive(db, ARCHIVED_DELETED, conversation_id, group)
+        await db.commit()
+        return len(messages)
+
+    async def restore_conversation(self, db: AsyncSession, conversation_id: int) -> int:
+        """Move an archived conversation's messages back into ``message``.
+
+        Messages keep their ids and timestamps. The usage rollup and
+        overview triggers skip the re-inserts (``alphacode.archive_restore``),
+        since those messages were counted when first written.
+
+        Returns:
+            Number of messages restored (0 if the conversation is not archived)
+        """
+        # Cheap unlocked check first: called before every read of a conversation's messages
+        archived = await db.scalar(
+            select(Conversation.archived_at).where(Conversation.id == conversation_id)
+        )
+        if archived is None:
+            await db.rollback()
+            return 0
+        # Lock and re-check: a concurrent restore may have finished meanwhile
+        archived = await db.scalar(
+            select(Conversation.archived_at)
+            .where(Conversation.id == conversation_id)
+            .with_for_update()
+        )
+        if archived is None:
+            await db.rollback()
+            return 0
+
+        await db.execute(text("SELECT set_config('alphacode.archive_restore', 'on', true)"))
+        result = await db.execute(
+            select(MessageArchive)
+            .where(MessageArchive.conversation_id == conversation_id, MessageArchive.kind == ARCHIVED_CONVERSATION)
+            .order_by(MessageArchive.id)
+        )
+        restored = 0
+        for archive in result.scalars().all():
+            rows, bodies = [], []
+            for item in json.loads(decompress(archive.encoding, archive.data)):
+                row = _load(item)
+                inline, length, body = split_content(row.pop("content"))
+                rows.append({**row, "content": inline, "content_length": length})
+                if body is not None:
+                    bodies.append({"message_id": row["id"], "encoding": body[0], "data": body[1]})
+            if rows:
+                await db.execute(insert(Message), rows)
+                for row in rows:
+                    note_row_write(db, Message.__tablename__, row)
+            if bodies:
+                await db.execute(insert(MessageBody), bodies)
+            await db.delete(archive)
+            restored += len(rows)
+
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(archived_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        note_write(db, CONVERSATION, conversation_id)
+        await db.commit()
+        return restored
+
+    async def get_stats(self, db: AsyncSession) -> Dict[str, Dict[str, int]]:
+        """Archive rows, messages and compressed bytes per kind."""
+        result = await db.execute(
+            select(
+                MessageArchive.kind,
+                func.count(),
+                func.coalesce(func.sum(MessageArchive.message_count), 0),
+                func.coalesce(func.sum(func.octet_length(MessageArchive.data)), 0),
+            ).group_by(MessageArchive.kind)
+        )
+        return {
+            kind: {"archives": archives, "messages": messages, "bytes": size}
+            for kind, archives, messages, size in result.all()
+        }
@@ -1,95 +1,87 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
 from typing import List, Optional
 from datetime import datetime
 
 from api.core.models import SharedConversation
+from api.core.soft_delete import soft_delete
 
 
 class SharedConversationRepository:
-    
-    def __init__(self, db: Session):
-        self.db = db
-    
-    def create(
+
+    async def create(
             self,
+            db: AsyncSession,
             conversation_id: int,
             user_id: Optional[int] = None,
             column: Optional[int] = None
     ) -> SharedConversation:
+        # `column` has no matching DB column; accepted for API compatibility
         shared_conv = SharedConversation(
             conversation_id=conversation_id,
             user_id=user_id,
-            Column=column,
             created_at=datetime.now(),
             status=1
         )
-        self.db.add(shared_conv)
-        self.db.commit()
-        self.db.refresh(shared_conv)
+        db.add(shared_conv)
+        await db.commit()
+        await db.refresh(shared_conv)
         return shared_conv
-    
-    def get_by_id(self, id: int) -> Optional[SharedConversation]:
-        return self.db.query(SharedConversation).filter(
+
+    async def get_by_id(self, db: AsyncSession, id: int) -> Optional[SharedConversation]:
+        stmt = select(SharedConversation).where(
             and_(
                 SharedConversation.id == id,
                 SharedConversation.status == 1
             )
-        ).first()
-    
-    def get_all(self, skip: int = 0, limit: int = 100) -> List[SharedConversation]:
-        return self.db.query(SharedConversation).filter(
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_all(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[SharedConversation]:
+        stmt = select(SharedConversation).where(
             SharedConversation.status == 1
-        ).offset(skip).limit(limit).all()
-    
-    def get_by_conversation_id(self, conversation_id: int) -> List[SharedConversation]:
-        return self.db.query(SharedConversation).filter(
+        ).offset(skip).limit(limit)
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_by_conversation_id(self, db: AsyncSession, conversation_id: int) -> List[SharedConversation]:
+        stmt = select(SharedConversation).where(
             and_(
                 SharedConversation.conversation_id == conversation_id,
                 SharedConversation.status == 1
             )
-        ).all()
-    
-    def get_by_user_id(self, user_id: int) -> List[SharedConversation]:
-        return self.db.query(SharedConversation).filter(
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_by_user_id(self, db: AsyncSession, user_id: int) -> List[SharedConversation]:
+        stmt = select(SharedConversation).where(
             and_(
                 SharedConversation.user_id == user_id,
                 SharedConversation.status == 1
             )
-        ).all()
-    
-    def update(self, id: int, **kwargs) -> Optional[SharedConversation]:
-        shared_conv = self.get_by_id(id)
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def update(self, db: AsyncSession, id: int, **kwargs) -> Optional[SharedConversation]:
+        shared_conv = await self.get_by_id(db, id)
         if not shared_conv:
             return None
-        
+
         for key, value in kwargs.items():
             if hasattr(shared_conv, key):
                 setattr(shared_conv, key, value)
-        
+
         shared_conv.last_updated = datetime.now()
-        self.db.commit()
-        self.db.refresh(shared_conv)
+        await db.commit()
+        await db.refresh(shared_conv)
         return shared_conv
-    
-    def delete(self, id: int) -> bool:
-        shared_conv = self.get_by_id(id)
-        if not shared_conv:
-            return False
-        
-        shared_conv.status = 0
-        shared_conv.last_updated = datetime.now()
-        self.db.commit()
-        return True
-    
-    def delete_by_conversation_id(self, conversation_id: int) -> bool:
-        shared_convs = self.get_by_conversation_id(conversation_id)
-        if not shared_convs:
-            return False
-        
-        for shared_conv in shared_convs:
-            shared_conv.status = 0
-            shared_conv.last_updated = datetime.now()
-        
-        self.db.commit()
-        return True
\ No newline at end of file
+
+    async def delete(self, db: AsyncSession, id: int) -> bool:
+        return await soft_delete(db, SharedConversation, SharedConversation.id == id) > 0
+
+    async def delete_by_conversation_id(self, db: AsyncSession, conversation_id: int) -> int:
+        """Soft delete every active share of a conversation; returns the row count."""
+        return await soft_delete(db, SharedConversation, SharedConversation.conversation_id == conversation_id)
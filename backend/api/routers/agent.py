@@ -1,10 +1,11 @@
 # agent.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from api.services.agent import AgentService
 from api.core.db import get_session
+from api.core.http_cache import reference_cache
 from api.core import schemas
 
 service = AgentService()
@@ -30,18 +31,27 @@ async def create_agent(
 
 @router.get("/", response_model=List[schemas.Agent])
 async def list_agents(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_session)
-) -> List[schemas.Agent]:
-    return await service.list_agents(db, skip=skip, limit=limit)
+) -> Response:
+    # ETag / 304 + cached JSON; invalidated by AgentService writes
+    return await reference_cache.respond(
+        request, db, "agent",
+        lambda: service.list_agents(db, skip=skip, limit=limit),
+        List[schemas.Agent]
+    )
 
 @router.get("/{agent_id}", response_model=schemas.Agent)
-async def get_agent(agent_id: int, db: AsyncSession = Depends(get_session)) -> schemas.Agent:
-    agent = await service.get_agent(db, agent_id)
-    if not agent:
-        raise HTTPException(status_code=404, detail="Agent not found")
-    return agent
+async def get_agent(agent_id: int, request: Request, db: AsyncSession = Depends(get_session)) -> Response:
+    async def load():
+        agent = await service.get_agent(db, agent_id)
+        if not agent:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        return agent
+
+    return await reference_cache.respond(request, db, "agent", load, schemas.Agent)
 
 @router.put("/{agent_id}", response_model=schemas.Agent)
 async def update_agent(
@@ -1,28 +1,57 @@
 # conversation.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from api.services.conversation import ConversationService
-from api.core.db import get_session
+from api.core.db import get_session, get_read_session, get_read_session_for
+from api.core.read_routing import CONVERSATION, USER
+from api.core.http_cache import CONVERSATION_USER, get_version, is_not_modified, make_etag, \
+    not_modified_response, request_key, validator_headers
+from api.core.pagination import MAX_PAGE_SIZE, set_page_headers
 from api.core.schemas import Conversation, ConversationAgent, ConversationCreate, ConversationUpdate, \
-    ConversationAgentCreate, ConversationAgentUpdate
+    ConversationAgentCreate, ConversationAgentUpdate, ConversationWithOverview
 
 service = ConversationService()
 
+# Reads go to the replica unless the subject in the path was just written
+read_by_conversation = get_read_session_for(CONVERSATION, "conversation_id")
+read_by_user = get_read_session_for(USER, "user_id")
+
 router = APIRouter(
     prefix="/conversations",
     tags=["conversation"],
 )
 
-@router.get("/user/{user_id}", response_model=List[Conversation])
+@router.get("/user/{user_id}", response_model=List[ConversationWithOverview])
 async def get_conversations_by_user(
     user_id: int,
-    skip: int = 0,
-    limit: int = 20,
-    db: AsyncSession = Depends(get_session)
-) -> List[Conversation]:
-    return await service.get_conversations_by_user_id(db, user_id, skip=skip, limit=limit)
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    direction: Literal["after", "before"] = "after",
+    db: AsyncSession = Depends(read_by_user)
+) -> List[ConversationWithOverview]:
+    # Polled by the sidebar: 304 while none of the user's conversations
+    # (or their overview rows) changed, checked with one primary-key lookup
+    version, updated_at = await get_version(db, CONVERSATION_USER, user_id)
+    etag = make_etag(CONVERSATION_USER, user_id, version, request_key(request))
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+    response.headers.update(validator_headers(etag, updated_at))
+
+    # Sidebar: conversations + overview (counts, last message) in one indexed query
+    if skip and not cursor:
+        return await service.get_conversations_by_user_id(
+            db, user_id, skip=skip, limit=limit, with_overview=True
+        )
+    page = await service.get_conversation_page(
+        db, user_id=user_id, cursor=cursor, direction=direction, limit=limit, with_overview=True
+    )
+    set_page_headers(response, page)
+    return page.items
 
 @router.post("/", response_model=Conversation)
 async def create_conversation(
@@ -39,16 +68,23 @@ async def create_conversation(
 
 @router.get("/", response_model=List[Conversation])
 async def list_conversations(
-    skip: int = 0,
-    limit: int = 100,
-    db: AsyncSession = Depends(get_session)
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    direction: Literal["after", "before"] = "after",
+    db: AsyncSession = Depends(get_read_session)
 ) -> List[Conversation]:
-    return await service.list_conversations(db, skip=skip, limit=limit)
+    if skip and not cursor:
+        return await service.list_conversations(db, skip=skip, limit=limit)
+    page = await service.get_conversation_page(db, cursor=cursor, direction=direction, limit=limit)
+    set_page_headers(response, page)
+    return page.items
 
 @router.get("/{conversation_id}", response_model=Conversation)
 async def get_conversation(
     conversation_id: int,
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(get_session)  # point lookup: primary
 ) -> Conversation:
     convo = await service.get_conversation(db, conversation_id)
     if not convo:
@@ -97,7 +133,7 @@ async def add_agent_to_conversation(
 @router.get("/{conversation_id}/agents", response_model=List[ConversationAgent])
 async def list_conversation_agents(
     conversation_id: int,
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(read_by_conversation)
 ) -> List[ConversationAgent]:
     return await service.list_conversation_agents(db, conversation_id)
 
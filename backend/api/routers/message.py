@@ -1,9 +1,30 @@
 # message.py
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncGenerator, List, Literal, Optional, Dict, Any
 
 from api.services.message import MessageService
 from api.core import schemas
+from api.core.db import get_session, get_read_session, get_read_session_for
+from api.core.read_routing import SHARED_CONVERSATION, USER
+from api.core.models import Message
+from api.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, set_page_headers
+from api.services.archiver import conversation_read_session
+from api.services.export import MEDIA_TYPES, export_stream
+
+service = MessageService()
+
+# Reads go to the replica unless the subject in the path was just written
+read_by_shared_conversation = get_read_session_for(SHARED_CONVERSATION, "shared_conv_id")
+read_by_user = get_read_session_for(USER, "user_id")
+
+
+async def read_by_conversation(conversation_id: int) -> AsyncGenerator[AsyncSession, None]:
+    """Same routing for a conversation's messages, restored from the archive first."""
+    async with conversation_read_session(conversation_id) as session:
+        yield session
+
 
 router = APIRouter(
     prefix="/messages",
@@ -12,11 +33,14 @@ router = APIRouter(
 
 
 @router.post("/", response_model=schemas.Message, status_code=status.HTTP_201_CREATED)
-def create_message(message_data: schemas.MessageCreate):
+async def create_message(
+        message_data: schemas.MessageCreate,
+        db: AsyncSession = Depends(get_session)
+):
     """Tạo mới message"""
-    service = MessageService()
     try:
-        message = service.create_message(
+        message = await service.create_message(
+            db,
             role=message_data.role,
             content=message_data.content,
             content_type=message_data.content_type,
@@ -35,12 +59,33 @@ def create_message(message_data: schemas.MessageCreate):
         )
 
 
+@router.post("/bulk", response_model=schemas.MessageBulkResult, status_code=status.HTTP_201_CREATED)
+async def bulk_create_messages(
+        payload: schemas.MessageBulkCreate,
+        db: AsyncSession = Depends(get_session)
+):
+    """Tạo nhiều messages trong một request (import lịch sử chat, replay transcript)"""
+    try:
+        ids = await service.bulk_create_messages(db, [m.model_dump() for m in payload.messages])
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating messages: {str(e)}"
+        )
+    return {"count": len(ids), "ids": ids}
+
+
 @router.post("/user", response_model=schemas.Message, status_code=status.HTTP_201_CREATED)
-def create_user_message(message_data: schemas.UserMessageCreate):
+async def create_user_message(
+        message_data: schemas.UserMessageCreate,
+        db: AsyncSession = Depends(get_session)
+):
     """Tạo message từ user"""
-    service = MessageService()
     try:
-        message = service.create_user_message(
+        message = await service.create_user_message(
+            db,
             content=message_data.content,
             user_id=message_data.user_id,
             conversation_id=message_data.conversation_id,
@@ -56,11 +101,14 @@ def create_user_message(message_data: schemas.UserMessageCreate):
 
 
 @router.post("/agent", response_model=schemas.Message, status_code=status.HTTP_201_CREATED)
-def create_agent_message(message_data: schemas.AgentMessageCreate):
+async def create_agent_message(
+        message_data: schemas.AgentMessageCreate,
+        db: AsyncSession = Depends(get_session)
+):
     """Tạo message từ agent"""
-    service = MessageService()
     try:
-        message = service.create_agent_message(
+        message = await service.create_agent_message(
+            db,
             content=message_data.content,
             agent_id=message_data.agent_id,
             conversation_id=message_data.conversation_id,
@@ -76,10 +124,12 @@ def create_agent_message(message_data: schemas.AgentMessageCreate):
 
 
 @router.get("/{message_id}", response_model=schemas.Message)
-def get_message(message_id: int):
-    """Lấy message theo ID"""
-    service = MessageService()
-    message = service.get_message(message_id)
+async def get_message(
+        message_id: int,
+        db: AsyncSession = Depends(get_session)
+):
+    """Lấy message theo ID (luôn trả về full content)"""
+    message = await service.get_message(db, message_id)
     
     if not message:
         raise HTTPException(
@@ -87,30 +137,78 @@ def get_message(message_id: int):
             detail="Message not found"
         )
     
+    if message.content_external:
+        content = await service.get_message_content(db, message_id)
+        return schemas.Message.model_validate(message).model_copy(
+            update={"content": content, "content_external": False}
+        )
     return message
 
 
+@router.get("/{message_id}/content", response_model=schemas.MessageContent)
+async def get_message_content(
+        message_id: int,
+        db: AsyncSession = Depends(get_session)
+):
+    """Lấy full content của message (list endpoints chỉ trả preview cho message lớn)"""
+    content = await service.get_message_content(db, message_id)
+    
+    if content is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Message not found"
+        )
+    
+    return {"id": message_id, "content": content}
+
+
+async def _message_page(
+        db: AsyncSession,
+        response: Response,
+        cursor: Optional[str],
+        direction: str,
+        limit: int,
+        **filters
+) -> List[Message]:
+    """Keyset page of messages; cursors go in X-Next-Cursor / X-Prev-Cursor headers."""
+    page = await service.get_message_page(db, cursor=cursor, direction=direction, limit=limit, **filters)
+    set_page_headers(response, page)
+    return page.items
+
+
 @router.get("/", response_model=List[schemas.Message])
-def get_all_messages(
+async def get_all_messages(
+        response: Response,
         skip: int = Query(0, ge=0),
-        limit: int = Query(100, ge=1, le=1000)
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor / X-Prev-Cursor của trang trước"),
+        direction: Literal["after", "before"] = Query("after"),
+        db: AsyncSession = Depends(get_read_session)
 ):
     """Lấy tất cả messages (phân trang)"""
-    service = MessageService()
-    return service.get_all_messages(skip=skip, limit=limit)
+    if skip and not cursor:
+        # Legacy OFFSET paging for existing clients
+        return await service.get_all_messages(db, skip=skip, limit=limit)
+    return await _message_page(db, response, cursor, direction, limit)
 
 
 @router.get("/conversation/{conversation_id}", response_model=List[schemas.Message])
-def get_conversation_messages(
+async def get_conversation_messages(
         conversation_id: int,
+        response: Response,
         skip: int = Query(0, ge=0),
-        limit: int = Query(100, ge=1, le=1000)
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+        direction: Literal["after", "before"] = Query("after"),
+        db: AsyncSession = Depends(read_by_conversation)
 ):
-    """Lấy messages theo conversation_id"""
-    service = MessageService()
-    messages = service.get_conversation_messages(conversation_id, skip=skip, limit=limit)
+    """Lấy messages theo conversation_id (conversation đã archive sẽ được restore)"""
+    if skip and not cursor:
+        messages = await service.get_conversation_messages(db, conversation_id, skip=skip, limit=limit)
+    else:
+        messages = await _message_page(db, response, cursor, direction, limit, conversation_id=conversation_id)
     
-    if not messages:
+    if not messages and not cursor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No messages found for this conversation"
@@ -120,16 +218,24 @@ def get_conversation_messages(
 
 
 @router.get("/shared-conversation/{shared_conv_id}", response_model=List[schemas.Message])
-def get_shared_conversation_messages(
+async def get_shared_conversation_messages(
         shared_conv_id: int,
+        response: Response,
         skip: int = Query(0, ge=0),
-        limit: int = Query(100, ge=1, le=1000)
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+        direction: Literal["after", "before"] = Query("after"),
+        db: AsyncSession = Depends(read_by_shared_conversation)
 ):
     """Lấy messages theo shared_conversation_id"""
-    service = MessageService()
-    messages = service.get_shared_conversation_messages(shared_conv_id, skip=skip, limit=limit)
+    if skip and not cursor:
+        messages = await service.get_shared_conversation_messages(db, shared_conv_id, skip=skip, limit=limit)
+    else:
+        messages = await _message_page(
+            db, response, cursor, direction, limit, shared_conversation_id=shared_conv_id
+        )
     
-    if not messages:
+    if not messages and not cursor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No messages found for this shared conversation"
@@ -139,12 +245,18 @@ def get_shared_conversation_messages(
 
 
 @router.get("/user/{user_id}", response_model=List[schemas.Message])
-def get_user_messages(user_id: int):
+async def get_user_messages(
+        user_id: int,
+        response: Response,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+        direction: Literal["after", "before"] = Query("after"),
+        db: AsyncSession = Depends(read_by_user)
+):
     """Lấy messages theo user_id"""
-    service = MessageService()
-    messages = service.get_user_messages(user_id)
+    messages = await _message_page(db, response, cursor, direction, limit, user_id=user_id)
     
-    if not messages:
+    if not messages and not cursor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No messages found for this user"
@@ -154,12 +266,18 @@ def get_user_messages(user_id: int):
 
 
 @router.get("/agent/{agent_id}", response_model=List[schemas.Message])
-def get_agent_messages(agent_id: int):
+async def get_agent_messages(
+        agent_id: int,
+        response: Response,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None),
+        direction: Literal["after", "before"] = Query("after"),
+        db: AsyncSession = Depends(get_read_session)
+):
     """Lấy messages theo agent_id"""
-    service = MessageService()
-    messages = service.get_agent_messages(agent_id)
+    messages = await _message_page(db, response, cursor, direction, limit, agent_id=agent_id)
     
-    if not messages:
+    if not messages and not cursor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No messages found for this agent"
@@ -169,12 +287,12 @@ def get_agent_messages(agent_id: int):
 
 
 @router.put("/{message_id}", response_model=schemas.Message)
-def update_message(
+async def update_message(
         message_id: int,
-        message_data: schemas.MessageUpdate
+        message_data: schemas.MessageUpdate,
+        db: AsyncSession = Depends(get_session)
 ):
     """Cập nhật message"""
-    service = MessageService()
     
     update_data = {}
     if message_data.content is not None:
@@ -186,7 +304,7 @@ def update_message(
     if message_data.message_type is not None:
         update_data['message_type'] = message_data.message_type
     
-    message = service.update_message(message_id, **update_data)
+    message = await service.update_message(db, message_id, **update_data)
     
     if not message:
         raise HTTPException(
@@ -198,10 +316,12 @@ def update_message(
 
 
 @router.patch("/{message_id}/reaction", response_model=schemas.Message)
-def update_message_reaction(message_id: int, reaction_data: schemas.MessageReactionUpdate):
+async def update_message_reaction(
+        message_id: int, reaction_data: schemas.MessageReactionUpdate,
+        db: AsyncSession = Depends(get_session)
+):
     """Cập nhật reaction cho message"""
-    service = MessageService()
-    message = service.update_message_reaction(message_id, reaction_data.reaction)
+    message = await service.update_message_reaction(db, message_id, reaction_data.reaction)
     
     if not message:
         raise HTTPException(
@@ -213,10 +333,12 @@ def update_message_reaction(message_id: int, reaction_data: schemas.MessageReact
 
 
 @router.delete("/{message_id}", status_code=status.HTTP_200_OK)
-def delete_message(message_id: int):
+async def delete_message(
+        message_id: int,
+        db: AsyncSession = Depends(get_session)
+):
     """Xóa message (soft delete)"""
-    service = MessageService()
-    success = service.delete_message(message_id)
+    success = await service.delete_message(db, message_id)
     
     if not success:
         raise HTTPException(
@@ -228,40 +350,46 @@ def delete_message(message_id: int):
 
 
 @router.delete("/conversation/{conversation_id}", status_code=status.HTTP_200_OK)
-def delete_conversation_messages(conversation_id: int):
+async def delete_conversation_messages(
+        conversation_id: int,
+        db: AsyncSession = Depends(get_session)
+):
     """Xóa tất cả messages của conversation"""
-    service = MessageService()
-    success = service.delete_conversation_messages(conversation_id)
+    deleted = await service.delete_conversation_messages(db, conversation_id)
     
-    if not success:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No messages found for this conversation"
         )
     
-    return {"message": "All messages for this conversation deleted successfully"}
+    return {"message": "All messages for this conversation deleted successfully", "deleted": deleted}
 
 
 @router.delete("/shared-conversation/{shared_conv_id}", status_code=status.HTTP_200_OK)
-def delete_shared_conversation_messages(shared_conv_id: int):
+async def delete_shared_conversation_messages(
+        shared_conv_id: int,
+        db: AsyncSession = Depends(get_session)
+):
     """Xóa tất cả messages của shared conversation"""
-    service = MessageService()
-    success = service.delete_shared_conversation_messages(shared_conv_id)
+    deleted = await service.delete_shared_conversation_messages(db, shared_conv_id)
     
-    if not success:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No messages found for this shared conversation"
         )
     
-    return {"message": "All messages for this shared conversation deleted successfully"}
+    return {"message": "All messages for this shared conversation deleted successfully", "deleted": deleted}
 
 
 @router.get("/conversation/{conversation_id}/with-relations", response_model=List[schemas.Message])
-def get_conversation_with_relations(conversation_id: int):
+async def get_conversation_with_relations(
+        conversation_id: int,
+        db: AsyncSession = Depends(read_by_conversation)
+):
     """Lấy messages với thông tin user và agent"""
-    service = MessageService()
-    messages = service.get_conversation_with_relations(conversation_id)
+    messages = await service.get_conversation_with_relations(db, conversation_id)
     
     if not messages:
         raise HTTPException(
@@ -272,10 +400,66 @@ def get_conversation_with_relations(conversation_id: int):
     return messages
 
 
+def _export_response(fmt: str, filename: str, **filters) -> StreamingResponse:
+    return StreamingResponse(
+        export_stream(fmt, **filters),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+
+@router.get("/conversation/{conversation_id}/export")
+async def export_conversation_messages(
+        conversation_id: int,
+        format: Literal["ndjson", "json.gz"] = Query("ndjson")
+):
+    """Export toàn bộ messages của conversation (streaming NDJSON hoặc gzip JSON)"""
+    return _export_response(format, f"conversation-{conversation_id}", conversation_id=conversation_id)
+
+
+@router.get("/user/{user_id}/export")
+async def export_user_messages(
+        user_id: int,
+        format: Literal["ndjson", "json.gz"] = Query("ndjson")
+):
+    """Export toàn bộ messages của user (streaming NDJSON hoặc gzip JSON)"""
+    return _export_response(format, f"user-{user_id}", user_id=user_id)
+
+
+@router.get("/usage/{scope}", response_model=List[schemas.MessageUsage])
+async def get_top_usage(
+        scope: Literal["user", "agent"],
+        limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+        db: AsyncSession = Depends(get_read_session)
+):
+    """Top users / agents theo số lượng messages (từ bảng rollup)"""
+    return await service.get_top_usage(db, scope, limit=limit)
+
+
+@router.get("/user/{user_id}/usage", response_model=schemas.MessageUsage)
+async def get_user_usage(
+        user_id: int,
+        db: AsyncSession = Depends(read_by_user)
+):
+    """Thống kê sử dụng của user (từ bảng rollup)"""
+    return await service.get_usage(db, "user", user_id)
+
+
+@router.get("/agent/{agent_id}/usage", response_model=schemas.MessageUsage)
+async def get_agent_usage(
+        agent_id: int,
+        db: AsyncSession = Depends(get_read_session)
+):
+    """Thống kê sử dụng của agent (từ bảng rollup)"""
+    return await service.get_usage(db, "agent", agent_id)
+
+
 @router.get("/conversation/{conversation_id}/statistics", response_model=Dict[str, Any])
-def get_conversation_statistics(conversation_id: int):
+async def get_conversation_statistics(
+        conversation_id: int,
+        db: AsyncSession = Depends(read_by_conversation)
+):
     """Lấy thống kê messages trong conversation"""
-    service = MessageService()
-    statistics = service.get_conversation_statistics(conversation_id)
+    statistics = await service.get_conversation_statistics(db, conversation_id)
     
     return statistics
\ No newline at end of file
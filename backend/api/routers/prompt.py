@@ -1,10 +1,11 @@
 # prompt.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from api.services.prompt import PromptService
 from api.core.db import get_session
+from api.core.http_cache import reference_cache
 from api.core import schemas
 
 service = PromptService()
@@ -23,18 +24,27 @@ async def create_prompt(
 
 @router.get("/", response_model=List[schemas.Prompt])
 async def list_prompts(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_session)
-) -> List[schemas.Prompt]:
-    return await service.list_prompts(db, skip=skip, limit=limit)
+) -> Response:
+    # ETag / 304 + cached JSON; invalidated by PromptService writes
+    return await reference_cache.respond(
+        request, db, "prompt",
+        lambda: service.list_prompts(db, skip=skip, limit=limit),
+        List[schemas.Prompt]
+    )
 
 @router.get("/{prompt_id}", response_model=schemas.Prompt)
-async def get_prompt(prompt_id: int, db: AsyncSession = Depends(get_session)) -> schemas.Prompt:
-    prompt = await service.get_prompt(db, prompt_id)
-    if not prompt:
-        raise HTTPException(status_code=404, detail="Prompt not found")
-    return prompt
+async def get_prompt(prompt_id: int, request: Request, db: AsyncSession = Depends(get_session)) -> Response:
+    async def load():
+        prompt = await service.get_prompt(db, prompt_id)
+        if not prompt:
+            raise HTTPException(status_code=404, detail="Prompt not found")
+        return prompt
+
+    return await reference_cache.respond(request, db, "prompt", load, schemas.Prompt)
 
 @router.put("/{prompt_id}", response_model=schemas.Prompt)
 async def update_prompt(
@@ -1,10 +1,11 @@
 # role.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from api.services.role import RoleService
 from api.core.db import get_session
+from api.core.http_cache import reference_cache
 from api.core import schemas
 
 service = RoleService()
@@ -20,18 +21,27 @@ async def create_role(role_data: schemas.RoleCreate, db: AsyncSession = Depends(
 
 @router.get("/", response_model=List[schemas.Role])
 async def list_roles(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_session)
-) -> List[schemas.Role]:
-    return await service.list_roles(db, skip=skip, limit=limit)
+) -> Response:
+    # ETag / 304 + cached JSON; invalidated by RoleService writes
+    return await reference_cache.respond(
+        request, db, "role",
+        lambda: service.list_roles(db, skip=skip, limit=limit),
+        List[schemas.Role]
+    )
 
 @router.get("/{role_id}", response_model=schemas.Role)
-async def get_role(role_id: int, db: AsyncSession = Depends(get_session)) -> schemas.Role:
-    role = await service.get_role(db, role_id)
-    if not role:
-        raise HTTPException(status_code=404, detail="Role not found")
-    return role
+async def get_role(role_id: int, request: Request, db: AsyncSession = Depends(get_session)) -> Response:
+    async def load():
+        role = await service.get_role(db, role_id)
+        if not role:
+            raise HTTPException(status_code=404, detail="Role not found")
+        return role
+
+    return await reference_cache.respond(request, db, "role", load, schemas.Role)
 
 @router.put("/{role_id}", response_model=schemas.Role)
 async def update_role(role_id: int, role_data: schemas.RoleUpdate, db: AsyncSession = Depends(get_session)) -> schemas.Role:
@@ -1,9 +1,18 @@
 # shared_conversation.py
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from api.services.shared_conversation import SharedConversationService
 from api.core import schemas
+from api.core.db import get_session, get_read_session, get_read_session_for
+from api.core.read_routing import CONVERSATION, USER
+
+service = SharedConversationService()
+
+# Reads go to the replica unless the subject in the path was just written
+read_by_conversation = get_read_session_for(CONVERSATION, "conversation_id")
+read_by_user = get_read_session_for(USER, "user_id")
 
 router = APIRouter(
     prefix="/shared-conversations",
@@ -12,11 +21,14 @@ router = APIRouter(
 
 
 @router.post("/", response_model=schemas.SharedConversation, status_code=status.HTTP_201_CREATED)
-def create_shared_conversation(shared_conv_data: schemas.SharedConversationCreate):
+async def create_shared_conversation(
+        shared_conv_data: schemas.SharedConversationCreate,
+        db: AsyncSession = Depends(get_session)
+):
     """Tạo mới shared conversation"""
-    service = SharedConversationService()
     try:
-        shared_conv = service.create_shared_conversation(
+        shared_conv = await service.create_shared_conversation(
+            db,
             conversation_id=shared_conv_data.conversation_id,
             user_id=shared_conv_data.user_id,
             column=shared_conv_data.column
@@ -30,10 +42,12 @@ def create_shared_conversation(shared_conv_data: schemas.SharedConversationCreat
 
 
 @router.get("/{shared_conv_id}", response_model=schemas.SharedConversation)
-def get_shared_conversation(shared_conv_id: int):
-    """Lấy shared conversation theo ID"""
-    service = SharedConversationService()
-    shared_conv = service.get_shared_conversation(shared_conv_id)
+async def get_shared_conversation(
+        shared_conv_id: int,
+        db: AsyncSession = Depends(get_session)
+):
+    """Lấy shared conversation theo ID (point lookup: luôn đọc từ primary)"""
+    shared_conv = await service.get_shared_conversation(db, shared_conv_id)
     
     if not shared_conv:
         raise HTTPException(
@@ -45,20 +59,22 @@ def get_shared_conversation(shared_conv_id: int):
 
 
 @router.get("/", response_model=List[schemas.SharedConversation])
-def get_all_shared_conversations(
+async def get_all_shared_conversations(
         skip: int = Query(0, ge=0),
-        limit: int = Query(100, ge=1, le=1000)
+        limit: int = Query(100, ge=1, le=1000),
+        db: AsyncSession = Depends(get_read_session)
 ):
     """Lấy tất cả shared conversations (phân trang)"""
-    service = SharedConversationService()
-    return service.get_all_shared_conversations(skip=skip, limit=limit)
+    return await service.get_all_shared_conversations(db, skip=skip, limit=limit)
 
 
 @router.get("/conversation/{conversation_id}", response_model=List[schemas.SharedConversation])
-def get_shared_conversations_by_conversation(conversation_id: int):
+async def get_shared_conversations_by_conversation(
+        conversation_id: int,
+        db: AsyncSession = Depends(read_by_conversation)
+):
     """Lấy shared conversations theo conversation_id"""
-    service = SharedConversationService()
-    shared_convs = service.get_shared_conversations_by_conversation(conversation_id)
+    shared_convs = await service.get_shared_conversations_by_conversation(db, conversation_id)
     
     if not shared_convs:
         raise HTTPException(
@@ -70,10 +86,12 @@ def get_shared_conversations_by_conversation(conversation_id: int):
 
 
 @router.get("/user/{user_id}", response_model=List[schemas.SharedConversation])
-def get_shared_conversations_by_user(user_id: int):
+async def get_shared_conversations_by_user(
+        user_id: int,
+        db: AsyncSession = Depends(read_by_user)
+):
     """Lấy shared conversations theo user_id"""
-    service = SharedConversationService()
-    shared_convs = service.get_shared_conversations_by_user(user_id)
+    shared_convs = await service.get_shared_conversations_by_user(db, user_id)
     
     if not shared_convs:
         raise HTTPException(
@@ -85,12 +103,12 @@ def get_shared_conversations_by_user(user_id: int):
 
 
 @router.put("/{shared_conv_id}", response_model=schemas.SharedConversation)
-def update_shared_conversation(
+async def update_shared_conversation(
         shared_conv_id: int,
-        shared_conv_data: schemas.SharedConversationUpdate
+        shared_conv_data: schemas.SharedConversationUpdate,
+        db: AsyncSession = Depends(get_session)
 ):
     """Cập nhật shared conversation"""
-    service = SharedConversationService()
     
     update_data = {}
     if shared_conv_data.user_id is not None:
@@ -98,7 +116,7 @@ def update_shared_conversation(
     if shared_conv_data.column is not None:
         update_data['column'] = shared_conv_data.column
     
-    shared_conv = service.update_shared_conversation(shared_conv_id, **update_data)
+    shared_conv = await service.update_shared_conversation(db, shared_conv_id, **update_data)
     
     if not shared_conv:
         raise HTTPException(
@@ -110,10 +128,12 @@ def update_shared_conversation(
 
 
 @router.delete("/{shared_conv_id}", status_code=status.HTTP_200_OK)
-def delete_shared_conversation(shared_conv_id: int):
+async def delete_shared_conversation(
+        shared_conv_id: int,
+        db: AsyncSession = Depends(get_session)
+):
     """Xóa shared conversation (soft delete)"""
-    service = SharedConversationService()
-    success = service.delete_shared_conversation(shared_conv_id)
+    success = await service.delete_shared_conversation(db, shared_conv_id)
     
     if not success:
         raise HTTPException(
@@ -125,25 +145,29 @@ def delete_shared_conversation(shared_conv_id: int):
 
 
 @router.delete("/conversation/{conversation_id}", status_code=status.HTTP_200_OK)
-def delete_shared_conversations_by_conversation(conversation_id: int):
+async def delete_shared_conversations_by_conversation(
+        conversation_id: int,
+        db: AsyncSession = Depends(get_session)
+):
     """Xóa tất cả shared conversations của conversation"""
-    service = SharedConversationService()
-    success = service.delete_shared_conversations_by_conversation(conversation_id)
+    deleted = await service.delete_shared_conversations_by_conversation(db, conversation_id)
     
-    if not success:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No shared conversations found for this conversation"
         )
     
-    return {"message": "All shared conversations for this conversation deleted successfully"}
+    return {"message": "All shared conversations for this conversation deleted successfully", "deleted": deleted}
 
 
 @router.post("/share/{conversation_id}/to/{user_id}", response_model=schemas.SharedConversation)
-def share_conversation_to_user(conversation_id: int, user_id: int):
+async def share_conversation_to_user(
+        conversation_id: int, user_id: int,
+        db: AsyncSession = Depends(get_session)
+):
     """Chia sẻ conversation đến user cụ thể"""
-    service = SharedConversationService()
-    shared_conv = service.share_conversation_to_user(conversation_id, user_id)
+    shared_conv = await service.share_conversation_to_user(db, conversation_id, user_id)
     
     if not shared_conv:
         raise HTTPException(
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.repositories.agent import AgentRepository
 from api.core.models import Agent
+from api.core.http_cache import reference_cache
 
 
 class AgentService:
@@ -30,7 +31,9 @@ class AgentService:
             status=1,
             last_updated=None
         )
-        return await self.repository.create_agent(db, agent)
+        agent = await self.repository.create_agent(db, agent)
+        reference_cache.invalidate("agent")
+        return agent
 
     # READ (One)
     async def get_agent(self, db: AsyncSession, agent_id: int) -> Optional[Agent]:
@@ -70,7 +73,9 @@ class AgentService:
             agent.status = status
         
         agent.last_updated = datetime.utcnow()
-        return await self.repository.update_agent(db, agent)
+        agent = await self.repository.update_agent(db, agent)
+        reference_cache.invalidate("agent")
+        return agent
 
     # DELETE
     async def delete_agent(self, db: AsyncSession, agent_id: int) -> bool:
@@ -78,4 +83,5 @@ class AgentService:
         if not agent:
             return False
         await self.repository.delete_agent(db, agent)
+        reference_cache.invalidate("agent")
         return True
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""Background archiver for the ``message`` table.
+
+Every ``ARCHIVE_INTERVAL_SECONDS`` one pass:
+
+1. creates the monthly ``message`` partitions for the coming months,
+2. moves the active messages of conversations inactive for
+   ``ARCHIVE_INACTIVE_DAYS`` into ``message_archive`` (compressed JSON
+   batches) and marks the conversations ``archived_at``,
+3. moves soft-deleted messages (``status=0``) into ``message_archive``.
+
+The sidebar keeps working for archived conversations (``conversation_overview``
+is not touched). Every read of a conversation's messages (WebSocket reopen,
+message pages, export, statistics) goes through ``conversation_read_session``,
+which restores it with ``restore_conversation`` first.
+
+Each conversation is archived in its own short transaction under a row lock
+taken with SKIP LOCKED, so the archiver can run in every worker.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.core.config import settings
+from api.core.db import async_session, read_session_factory
+from api.core.read_routing import CONVERSATION
+from api.repositories.message_archive import MessageArchiveRepository
+
+logger = logging.getLogger(__name__)
+
+
+class MessageArchiver:
+    """Periodic archive pass plus on-demand restore."""
+
+    def __init__(
+        self,
+        inactive_days: int = 90,
+        interval: float = 3600,
+        batch_size: int = 100,
+        deleted_batch_size: int = 5000,
+        months_ahead: int = 2
+    ):
+        """Initialize the archiver.
+
+        Args:
+            inactive_days: Archive conversations without activity for this
+                many days (0 = never archive conversations)
+            interval: Seconds between passes
+            batch_size: Conversations archived per pass
+            deleted_batch_size: Soft-deleted messages archived per pass
+                (0 = keep them in ``message``)
+            months_ahead: Monthly partitions created ahead of time
+        """
+        self.inactive_days = inactive_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.deleted_batch_size = deleted_batch_size
+        self.months_ahead = months_ahead
+        self.repository = MessageArchiveRepository()
+        self._task: Optional[asyncio.Task] = None
+        self.passes = 0
+        self.partitions_created = 0
+        self.conversations_archived = 0
+        self.messages_archived = 0
+        self.deleted_archived = 0
+        self.conversations_restored = 0
+        self.messages_restored = 0
+        self.last_pass_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    async def run_once(self) -> Dict[str, int]:
+        """One archive pass; returns what it did."""
+        done = {"partitions": 0, "conversations": 0, "messages": 0, "deleted": 0}
+        async with async_session() as db:
+            done["partitions"] = await self.repository.ensure_partitions(db, self.months_ahead)
+
+            if self.inactive_days:
+                before = datetime.utcnow() - timedelta(days=self.inactive_days)
+                for conversation_id in await self.repository.find_inactive_conversations(db, before, self.batch_size):
+                    archived = await self.repository.archive_conversation(db, conversation_id)
+                    if archived is not None:
+                        done["conversations"] += 1
+                        done["messages"] += archived
+
+            if self.deleted_batch_size:
+                done["deleted"] = await self.repository.archive_deleted(db, self.deleted_batch_size)
+
+        self.passes += 1
+        self.partitions_created += done["partitions"]
+        self.conversations_archived += done["conversations"]
+        self.messages_archived += done["messages"]
+        self.deleted_archived += done["deleted"]
+        self.last_pass_at = datetime.utcnow()
+        if any(done.values()):
+            logger.info(f"Archive pass: {done}")
+        return done
+
+    async def restore_conversation(self, conversation_id: int) -> int:
+        """Restore an archived conversation's messages; returns how many (0 if not archived)."""
+        async with async_session() as db:
+            restored = await self.repository.restore_conversation(db, conversation_id)
+        if restored:
+            self.conversations_restored += 1
+            self.messages_restored += restored
+            logger.info(f"Restored conversation {conversation_id} from archive ({restored} messages)")
+        return restored
+
+    async def restore_user_conversations(self, user_id: int) -> int:
+        """Restore every archived conversation of a user; returns messages restored."""
+        async with async_session() as db:
+            conversation_ids = await self.repository.find_archived_conversations(db, user_id)
+        restored = 0
+        for conversation_id in conversation_ids:
+            restored += await self.restore_conversation(conversation_id)
+        return restored
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Archive pass failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the periodic archive task (call from the event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        """Stop the periodic archive task."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Counters of this process plus archive totals from the database."""
+        async with async_session() as db:
+            archive = await self.repository.get_stats(db)
+        return {
+            "inactive_days": self.inactive_days,
+            "interval": self.interval,
+            "passes": self.passes,
+            "last_pass_at": self.last_pass_at.isoformat() if self.last_pass_at else None,
+            "last_error": self.last_error,
+            "partitions_created": self.partitions_created,
+            "conversations_archived": self.conversations_archived,
+            "messages_archived": self.messages_archived,
+            "deleted_archived": self.deleted_archived,
+            "conversations_restored": self.conversations_restored,
+            "messages_restored": self.messages_restored,
+            "archive": archive,
+        }
+
+
+# Process-wide archiver, started in api/main.py
+message_archiver = MessageArchiver(
+    inactive_days=settings.ARCHIVE_INACTIVE_DAYS,
+    interval=settings.ARCHIVE_INTERVAL_SECONDS,
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    deleted_batch_size=settings.ARCHIVE_DELETED_BATCH_SIZE,
+    months_ahead=settings.MESSAGE_PARTITION_MONTHS_AHEAD
+)
+
+
+@asynccontextmanager
+async def conversation_read_session(conversation_id: int) -> AsyncIterator[AsyncSession]:
+    """Read session for a conversation's messages, restored from the archive first.
+
+    The restore is one unlocked primary-key lookup when the conversation is
+    not archived. A restore records a write of the conversation, so the
+    session then reads from the primary and sees the restored rows.
+    """
+    await message_archiver.restore_conversation(conversation_id)
+    async with read_session_factory(CONVERSATION, conversation_id)() as session:
+        yield session
@@ -1,9 +1,10 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.repositories.conversation import ConversationRepository
 from api.core.models import Conversation, ConversationAgent
+from api.core.pagination import Page, AFTER, DEFAULT_PAGE_SIZE
 
 
 class ConversationService:
@@ -47,9 +48,26 @@ class ConversationService:
         db: AsyncSession,
         user_id: int,
         skip: int = 0,
-        limit: int = 20
+        limit: int = 20,
+        with_overview: bool = False
     ) -> List[Conversation]:
-        return await self.repository.get_conversation_by_user_id(db, user_id, skip=skip, limit=limit)
+        return await self.repository.get_conversation_by_user_id(
+            db, user_id, skip=skip, limit=limit, with_overview=with_overview
+        )
+
+    async def get_conversation_page(
+        self,
+        db: AsyncSession,
+        user_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        direction: str = AFTER,
+        limit: int = DEFAULT_PAGE_SIZE,
+        with_overview: bool = False
+    ) -> Page:
+        return await self.repository.get_conversation_page(
+            db, user_id=user_id, cursor=cursor, direction=direction, limit=limit,
+            with_overview=with_overview
+        )
 
     async def update_conversation(
         self,
@@ -74,12 +92,13 @@ class ConversationService:
         convo.last_updated = datetime.utcnow()
         return await self.repository.update_conversation(db, convo)
 
-    async def delete_conversation(self, db: AsyncSession, conversation_id: int) -> bool:
-        convo = await self.repository.get_conversation(db, conversation_id)
-        if not convo:
-            return False
-        await self.repository.delete_conversation(db, convo)
-        return True
+    async def delete_conversation(self, db: AsyncSession, conversation_id: int) -> Optional[Dict[str, int]]:
+        """Soft delete a conversation and cascade to its messages, agents and shares.
+
+        Returns:
+            Affected-row counts, or None if the conversation was not found
+        """
+        return await self.repository.delete_conversation_cascade(db, conversation_id)
 
     async def create_conversation_agent(
         self,
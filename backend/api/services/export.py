@@ -0,0 +1,87 @@
+"""Streaming message export (NDJSON or gzipped JSON).
+
+Rows come from a server-side cursor in batches and are serialized one at a
+time, so memory use does not depend on how many messages are exported.
+"""
+
+import json
+import zlib
+from typing import AsyncIterator
+
+from api.core.db import read_session_factory
+from api.core.read_routing import USER
+from api.core.models import Message
+from api.repositories.message import MessageRepository
+from api.services.archiver import conversation_read_session, message_archiver
+
+NDJSON = "ndjson"
+JSON_GZ = "json.gz"
+
+MEDIA_TYPES = {
+    NDJSON: "application/x-ndjson",
+    JSON_GZ: "application/gzip",
+}
+
+# Flush compressed output roughly every this many bytes of JSON
+GZIP_FLUSH_BYTES = 64 * 1024
+
+
+def message_to_dict(message: Message, content: str) -> dict:
+    return {
+        "id": message.id,
+        "role": message.role,
+        "content": content,
+        "content_type": message.content_type,
+        "message_type": message.message_type,
+        "conversation_id": message.conversation_id,
+        "shared_conversation_id": message.shared_conversation_id,
+        "user_id": message.user_id,
+        "agent_id": message.agent_id,
+        "reaction": message.reaction,
+        "created_at": message.created_at.isoformat() if message.created_at else None,
+    }
+
+
+async def _stream_messages(batch_size: int, **filters) -> AsyncIterator[dict]:
+    # Own session: the request-scoped one is closed before the body streams.
+    # Archived conversations are restored first; replica unless the exported
+    # conversation / user was just written (a restore counts as a write).
+    if filters.get("conversation_id") is not None:
+        session = conversation_read_session(filters["conversation_id"])
+    else:
+        await message_archiver.restore_user_conversations(filters["user_id"])
+        session = read_session_factory(USER, filters["user_id"])()
+    async with session as db:
+        async for message, content in MessageRepository().stream(db, batch_size=batch_size, **filters):
+            yield message_to_dict(message, content)
+
+
+async def ndjson_lines(batch_size: int = 500, **filters) -> AsyncIterator[bytes]:
+    """One JSON object per line."""
+    async for item in _stream_messages(batch_size, **filters):
+        yield (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def gzip_json_array(batch_size: int = 500, **filters) -> AsyncIterator[bytes]:
+    """A single JSON array, gzip-compressed on the fly."""
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    pending = 0
+    separator = b"["
+    async for item in _stream_messages(batch_size, **filters):
+        chunk = separator + json.dumps(item, ensure_ascii=False).encode("utf-8")
+        separator = b","
+        out = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= GZIP_FLUSH_BYTES:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.compress(b"[]" if separator == b"[" else b"]") + compressor.flush()
+
+
+def export_stream(fmt: str, batch_size: int = 500, **filters) -> AsyncIterator[bytes]:
+    """Body iterator for ``StreamingResponse`` in the requested format."""
+    if fmt == JSON_GZ:
+        return gzip_json_array(batch_size, **filters)
+    return ndjson_lines(batch_size, **filters)
@@ -0,0 +1,277 @@
+"""Process-wide LLM scheduler: concurrency cap, rate limits and priorities.
+
+All blocking LLM calls from WebSocket sessions go through ``llm_scheduler.run``
+instead of ``asyncio.to_thread``. Calls run on a dedicated thread pool sized to
+``LLM_MAX_IN_FLIGHT`` so a spike of users cannot exhaust the default executor
+(used by MCP calls), and waiting calls are served by priority class.
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from api.core.config import settings
+from api.services.timings import timings
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Priority classes, lower value is served first."""
+    INTERACTIVE = 0  # chat turns and tool-chain follow-ups
+    NAMING = 1       # conversation auto-naming
+    SUMMARY = 2      # summaries and background embeddings
+
+
+class LLMBusyError(Exception):
+    """Raised when the scheduler queue is full or the queue wait timed out."""
+
+
+class TokenBucket:
+    """Async token bucket. ``rate_per_minute`` <= 0 disables the limit."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0 if rate_per_minute > 0 else 0.0
+        self.capacity = capacity if capacity is not None else max(rate_per_minute, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float = 1.0) -> float:
+        """Seconds until ``amount`` tokens are available (0 if they are now).
+
+        Args:
+            amount: Tokens wanted (clamped to the bucket capacity)
+        """
+        if not self.rate:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float = 1.0):
+        """Take ``amount`` tokens; callers check ``delay`` first."""
+        if self.rate:
+            self.tokens -= min(amount, self.capacity)
+
+
+class LLMScheduler:
+    """Limits in-flight LLM calls and orders waiting calls by priority."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        max_queue: int = 100,
+        queue_timeout: float = 30.0,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            max_in_flight: Maximum concurrent LLM calls
+            max_queue: Maximum waiting calls before rejecting with LLMBusyError
+            queue_timeout: Maximum seconds a call may wait for a slot and its
+                rate tokens
+            requests_per_minute: Request rate limit (0 = unlimited)
+            tokens_per_minute: Estimated token rate limit (0 = unlimited)
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight,
+            thread_name_prefix="llm"
+        )
+        self._in_flight = 0
+        # (priority, seq, tokens, future); a waiter is dispatched only when a
+        # slot is free and both buckets can pay for it, so rate waits follow
+        # the priority order and count against the queue timeout
+        self._waiters: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._retry: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self._submitted: Dict[str, int] = {p.name.lower(): 0 for p in Priority}
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._queue_waits: Deque[float] = deque(maxlen=1000)
+        self._max_queue_wait = 0.0
+
+    def _queued_count(self) -> int:
+        return sum(1 for _, _, _, fut in self._waiters if not fut.done())
+
+    def _rate_delay(self, tokens: int) -> float:
+        return max(self.request_bucket.delay(1), self.token_bucket.delay(tokens) if tokens else 0.0)
+
+    def _take(self, tokens: int):
+        self._in_flight += 1
+        self.request_bucket.take(1)
+        if tokens:
+            self.token_bucket.take(tokens)
+
+    def _dispatch(self):
+        """Hand slots to waiters in priority order while slots and tokens last."""
+        if self._retry is not None:
+            self._retry.cancel()
+            self._retry = None
+        while self._waiters and self._in_flight < self.max_in_flight:
+            _, _, tokens, fut = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._rate_delay(tokens)
+            if delay > 0:
+                # Head waiter is rate limited; lower priorities wait behind it
+                self._retry = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._take(tokens)
+            fut.set_result(None)
+
+    async def _acquire_slot(self, priority: Priority, tokens: int = 0):
+        if (
+            self._in_flight < self.max_in_flight
+            and not self._queued_count()
+            and not self._rate_delay(tokens)
+        ):
+            self._take(tokens)
+            return
+
+        if self._queued_count() >= self.max_queue:
+            self._rejected += 1
+            logger.warning(f"LLM queue full ({self.max_queue}), rejecting {priority.name} call")
+            raise LLMBusyError("LLM queue is full")
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), tokens, fut))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # Slot was handed over right as we timed out; keep it
+                return
+            fut.cancel()
+            self._rejected += 1
+            logger.warning(
+                f"{priority.name} call waited {self.queue_timeout}s for an LLM slot or rate limit, giving up"
+            )
+            # The head waiter may have been the one holding up the rest
+            self._dispatch()
+            raise LLMBusyError("Timed out waiting for an LLM slot")
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self._release_slot()
+            else:
+                fut.cancel()
+                self._dispatch()
+            raise
+
+    def _release_slot(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        priority: Priority = Priority.INTERACTIVE,
+        tokens: int = 0,
+        **kwargs
+    ) -> Any:
+        """Run a blocking LLM call under the scheduler.
+
+        Args:
+            fn: Blocking callable (e.g. ``chat.send_message``)
+            *args: Positional arguments for ``fn``
+            priority: Priority class of the call
+            tokens: Estimated tokens used by the call, for the token bucket
+            **kwargs: Keyword arguments for ``fn``
+
+        Returns:
+            Result of ``fn``
+
+        Raises:
+            LLMBusyError: If the queue is full or the wait for a slot and rate
+                tokens timed out
+        """
+        self._submitted[priority.name.lower()] += 1
+        started = time.monotonic()
+        await self._acquire_slot(priority, tokens)
+        try:
+            wait = time.monotonic() - started
+            self._queue_waits.append(wait)
+            self._max_queue_wait = max(self._max_queue_wait, wait)
+
+            loop = asyncio.get_running_loop()
+            with timings.measure("llm"):
+                result = await loop.run_in_executor(
+                    self._executor,
+                    functools.partial(fn, *args, **kwargs)
+                )
+            self._completed += 1
+            return result
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._release_slot()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return scheduler metrics for the stats endpoint."""
+        queued_by_priority = {p.name.lower(): 0 for p in Priority}
+        for prio, _, _, fut in self._waiters:
+            if not fut.done():
+                queued_by_priority[Priority(prio).name.lower()] += 1
+
+        waits = sorted(self._queue_waits)
+
+        def pct(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1)
+
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queued": sum(queued_by_priority.values()),
+            "queued_by_priority": queued_by_priority,
+            "max_queue": self.max_queue,
+            "submitted": dict(self._submitted),
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "queue_wait_ms": {
+                "p50": pct(0.50),
+                "p95": pct(0.95),
+                "p99": pct(0.99),
+                "max": round(self._max_queue_wait * 1000, 1),
+            },
+        }
+
+
+# Process-wide scheduler shared by all WebSocket sessions
+llm_scheduler = LLMScheduler(
+    max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE
+)
@@ -6,6 +6,7 @@ from pathlib import Path
 from typing import Any, Dict, Optional
 import threading
 import queue
+from uuid import uuid4
 
 ROOT = Path(__file__).resolve().parents[2]  # should point to backend/ directory
 
@@ -15,90 +16,117 @@ def _mcp_server_path(name: str) -> Path:
     return ROOT / "services" / name / "src" / "server.py"
 
 
-def call_mcp(agent: str, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10.0) -> Dict[str, Any]:
+class PersistentProcess:
+    """A running MCP server; responses are routed to callers by request id."""
+
+    def __init__(self, cmd):
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        self._q = queue.Queue()  # messages without a pending request id (startup, legacy)
+        self._pending: Dict[str, "queue.Queue"] = {}
+        self._lock = threading.Lock()
+        self._t = threading.Thread(target=self._reader, daemon=True)
+        self._t.start()
+
+    def _reader(self):
+        for line in self.proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except Exception:
+                obj = {"raw": line}
+            waiter = None
+            if isinstance(obj, dict) and obj.get("id") is not None:
+                with self._lock:
+                    waiter = self._pending.get(str(obj.get("id")))
+            (waiter or self._q).put(obj)
+
+    def register(self, req_id: str) -> "queue.Queue":
+        waiter = queue.Queue(maxsize=1)
+        with self._lock:
+            self._pending[req_id] = waiter
+        return waiter
+
+    def unregister(self, req_id: str):
+        with self._lock:
+            self._pending.pop(req_id, None)
+
+    def send(self, msg: Dict[str, Any]):
+        with self._lock:
+            self.proc.stdin.write(json.dumps(msg) + "\n")
+            self.proc.stdin.flush()
+
+    def recv(self, timeout: float = 5.0):
+        try:
+            return self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def terminate(self):
+        try:
+            self.proc.terminate()
+        except Exception:
+            pass
+
+
+_procs: Dict[str, PersistentProcess] = {}
+_procs_lock = threading.Lock()
+
+
+def _get_process(agent: str, server_path: Path) -> PersistentProcess:
+    with _procs_lock:
+        p = _procs.get(agent)
+        if p is None or p.proc.poll() is not None:
+            cmd = [sys.executable, str(server_path)]
+            p = PersistentProcess(cmd)
+            _procs[agent] = p
+            # give the process a moment to start and emit capabilities
+            time.sleep(0.05)
+        return p
+
+
+def call_mcp(
+    agent: str,
+    method: str,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: float = 10.0,
+    cancel_event: Optional[threading.Event] = None
+) -> Dict[str, Any]:
     """Call a local MCP STDIO server using a persistent process per agent.
 
-    This keeps the MCP process running and communicates over its stdin/stdout queues.
+    This keeps the MCP process running and communicates over its stdin/stdout.
+    Responses are matched to the request id, so concurrent callers (one per
+    WebSocket session) do not consume each other's replies. Setting
+    `cancel_event` aborts the wait and returns {"error": "cancelled"}.
     """
     params = params or {}
     server_path = _mcp_server_path(agent)
     if not server_path.exists():
         return {"error": f"MCP server not found: {server_path}"}
 
-    class PersistentProcess:
-        def __init__(self, cmd):
-            self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            self._q = queue.Queue()
-            self._t = threading.Thread(target=self._reader, daemon=True)
-            self._t.start()
-
-        def _reader(self):
-            for line in self.proc.stdout:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    obj = {"raw": line}
-                self._q.put(obj)
-
-        def send(self, msg: Dict[str, Any]):
-            self.proc.stdin.write(json.dumps(msg) + "\n")
-            self.proc.stdin.flush()
+    p = _get_process(agent, server_path)
 
-        def recv(self, timeout: float = 5.0):
-            try:
-                return self._q.get(timeout=timeout)
-            except queue.Empty:
-                return None
+    # use a unique id per request to avoid collisions
+    req_id = str(uuid4())
+    msg = {"id": req_id, "method": method, "params": params}
+    waiter = p.register(req_id)
+    try:
+        p.send(msg)
 
-        def terminate(self):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if cancel_event is not None and cancel_event.is_set():
+                return {"error": "cancelled"}
             try:
-                self.proc.terminate()
-            except Exception:
+                return waiter.get(timeout=0.1)
+            except queue.Empty:
                 pass
-
-    # cache persistent processes on the function object
-    if not hasattr(call_mcp, "_procs"):
-        call_mcp._procs = {}
-
-    procs = call_mcp._procs
-    if agent not in procs or procs[agent] is None:
-        cmd = [sys.executable, str(server_path)]
-        procs[agent] = PersistentProcess(cmd)
-        # give the process a moment to start and emit capabilities
-        time.sleep(0.05)
-
-    p = procs[agent]
-    # drain any immediate startup messages
-    try:
-        while True:
-            init = p.recv(timeout=0.01)
-            if init is None:
-                break
-    except Exception:
-        pass
-
-    # use a unique id per request to avoid collisions
-    try:
-        from uuid import uuid4
-        req_id = str(uuid4())
-    except Exception:
-        req_id = str(time.time())
-    msg = {"id": req_id, "method": method, "params": params}
-    p.send(msg)
-
-    deadline = time.time() + timeout
-    while time.time() < deadline:
-        out = p.recv(timeout=0.1)
-        if out is None:
-            continue
-        if isinstance(out, dict) and out.get("id") == msg["id"]:
-            return out
-        # some servers may return response directly
-        if isinstance(out, dict) and "response" in out and not out.get("id"):
-            return out
+            # some servers may return response directly (without id)
+            out = p.recv(timeout=0)
+            if isinstance(out, dict) and "response" in out and not out.get("id"):
+                return out
+    finally:
+        p.unregister(req_id)
 
     return {"error": "timeout waiting for mcp response"}
-
@@ -1,19 +1,20 @@
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.repositories.message import MessageRepository
-from api.core.models import Message
-from services.mcp_vector.src.models.db import session
+from api.core.models import Message, MessageUsageRollup
+from api.core.pagination import Page, AFTER, DEFAULT_PAGE_SIZE
+from api.core.config import settings
 
 
 class MessageService:
     
     def __init__(self):
-        self.db = session
-        self.repository = MessageRepository(self.db)
+        self.repository = MessageRepository()
     
-    def create_message(
+    async def create_message(
             self,
+            db: AsyncSession,
             role: int,
             content: str,
             content_type: int,
@@ -24,7 +25,8 @@ class MessageService:
             agent_id: Optional[int] = None,
             reaction: Optional[str] = None
     ) -> Message:
-        return self.repository.create(
+        return await self.repository.create(
+            db,
             role=role,
             content=content,
             content_type=content_type,
@@ -36,72 +38,135 @@ class MessageService:
             reaction=reaction
         )
     
-    def get_message(self, id: int) -> Optional[Message]:
-        return self.repository.get_by_id(id)
+    async def bulk_create_messages(self, db: AsyncSession, items: List[Dict[str, Any]]) -> List[int]:
+        """Validate a batch in one pass and insert it.
+        
+        Raises:
+            ValueError: the batch is empty or too large, or some messages have
+                no conversation or reference unknown conversations (nothing
+                is inserted)
+        """
+        if not items:
+            raise ValueError("No messages to insert")
+        if len(items) > settings.MESSAGE_BULK_MAX:
+            raise ValueError(f"At most {settings.MESSAGE_BULK_MAX} messages per request")
+        
+        orphans = [
+            i for i, item in enumerate(items)
+            if not item.get("conversation_id") and not item.get("shared_conversation_id")
+        ]
+        if orphans:
+            raise ValueError(f"Messages without conversation_id or shared_conversation_id at index {orphans[:20]}")
+        
+        missing = await self.repository.find_missing_parents(
+            db,
+            conversation_ids=(i["conversation_id"] for i in items if i.get("conversation_id")),
+            shared_conversation_ids=(i["shared_conversation_id"] for i in items if i.get("shared_conversation_id"))
+        )
+        if missing:
+            raise ValueError(f"Unknown or deleted parents: {missing}")
+        
+        return await self.repository.bulk_create(db, items, chunk_size=settings.MESSAGE_BULK_CHUNK_SIZE)
+    
+    async def get_message(self, db: AsyncSession, id: int) -> Optional[Message]:
+        return await self.repository.get_by_id(db, id)
     
-    def get_all_messages(self, skip: int = 0, limit: int = 100) -> List[Message]:
-        return self.repository.get_all(skip=skip, limit=limit)
+    async def get_all_messages(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Message]:
+        return await self.repository.get_all(db, skip=skip, limit=limit)
     
-    def get_conversation_messages(
+    async def get_conversation_messages(
             self,
+            db: AsyncSession,
             conversation_id: int,
             skip: int = 0,
             limit: int = 100
     ) -> List[Message]:
-        return self.repository.get_by_conversation_id(
+        return await self.repository.get_by_conversation_id(
+            db,
             conversation_id,
             skip=skip,
             limit=limit
         )
     
-    def get_shared_conversation_messages(
+    async def get_shared_conversation_messages(
             self,
+            db: AsyncSession,
             shared_conversation_id: int,
             skip: int = 0,
             limit: int = 100
     ) -> List[Message]:
-        return self.repository.get_by_shared_conversation_id(
+        return await self.repository.get_by_shared_conversation_id(
+            db,
             shared_conversation_id,
             skip=skip,
             limit=limit
         )
     
-    def get_user_messages(self, user_id: int) -> List[Message]:
-        return self.repository.get_by_user_id(user_id)
+    async def get_message_page(
+            self,
+            db: AsyncSession,
+            cursor: Optional[str] = None,
+            direction: str = AFTER,
+            limit: int = DEFAULT_PAGE_SIZE,
+            **filters
+    ) -> Page:
+        return await self.repository.get_page(
+            db,
+            cursor=cursor,
+            direction=direction,
+            limit=limit,
+            **filters
+        )
+    
+    async def get_message_content(self, db: AsyncSession, id: int) -> Optional[str]:
+        return await self.repository.get_content(db, id)
+    
+    async def get_user_messages(self, db: AsyncSession, user_id: int) -> List[Message]:
+        return await self.repository.get_by_user_id(db, user_id)
+    
+    async def get_agent_messages(self, db: AsyncSession, agent_id: int) -> List[Message]:
+        return await self.repository.get_by_agent_id(db, agent_id)
+    
+    async def update_message(self, db: AsyncSession, id: int, **kwargs) -> Optional[Message]:
+        return await self.repository.update(db, id, **kwargs)
     
-    def get_agent_messages(self, agent_id: int) -> List[Message]:
-        return self.repository.get_by_agent_id(agent_id)
+    async def update_message_reaction(self, db: AsyncSession, id: int, reaction: str) -> Optional[Message]:
+        return await self.repository.update_reaction(db, id, reaction)
     
-    def update_message(self, id: int, **kwargs) -> Optional[Message]:
-        return self.repository.update(id, **kwargs)
+    async def delete_message(self, db: AsyncSession, id: int) -> bool:
+        return await self.repository.delete(db, id)
     
-    def update_message_reaction(self, id: int, reaction: str) -> Optional[Message]:
-        return self.repository.update_reaction(id, reaction)
+    async def delete_conversation_messages(self, db: AsyncSession, conversation_id: int) -> int:
+        return await self.repository.delete_by_conversation_id(db, conversation_id)
     
-    def delete_message(self, id: int) -> bool:
-        return self.repository.delete(id)
+    async def delete_shared_conversation_messages(self, db: AsyncSession, shared_conversation_id: int) -> int:
+        return await self.repository.delete_by_shared_conversation_id(db, shared_conversation_id)
     
-    def delete_conversation_messages(self, conversation_id: int) -> bool:
-        return self.repository.delete_by_conversation_id(conversation_id)
+    async def get_conversation_with_relations(self, db: AsyncSession, conversation_id: int) -> List[Message]:
+        return await self.repository.get_with_relations(db, conversation_id)
     
-    def delete_shared_conversation_messages(self, shared_conversation_id: int) -> bool:
-        return self.repository.delete_by_shared_conversation_id(shared_conversation_id)
+    async def get_conversation_statistics(self, db: AsyncSession, conversation_id: int) -> Dict[str, Any]:
+        return await self.repository.get_conversation_statistics(db, conversation_id)
     
-    def get_conversation_with_relations(self, conversation_id: int) -> List[Message]:
-        return self.repository.get_with_relations(conversation_id)
+    async def get_usage(self, db: AsyncSession, scope: str, subject_id: int) -> MessageUsageRollup:
+        usage = await self.repository.get_usage(db, scope, subject_id)
+        # No rollup row yet means no messages
+        return usage or MessageUsageRollup(scope=scope, subject_id=subject_id, message_count=0, content_chars=0)
     
-    def get_conversation_statistics(self, conversation_id: int) -> Dict[str, Any]:
-        return self.repository.get_conversation_statistics(conversation_id)
+    async def get_top_usage(self, db: AsyncSession, scope: str, limit: int = 20) -> List[MessageUsageRollup]:
+        return await self.repository.get_top_usage(db, scope, limit=limit)
     
-    def create_user_message(
+    async def create_user_message(
             self,
+            db: AsyncSession,
             content: str,
             user_id: int,
             conversation_id: int,
             content_type: int = 1,
             message_type: int = 1
     ) -> Message:
-        return self.create_message(
+        return await self.create_message(
+            db,
             role=1,
             content=content,
             content_type=content_type,
@@ -110,15 +175,17 @@ class MessageService:
             user_id=user_id
         )
     
-    def create_agent_message(
+    async def create_agent_message(
             self,
+            db: AsyncSession,
             content: str,
             agent_id: int,
             conversation_id: int,
             content_type: int = 1,
             message_type: int = 1
     ) -> Message:
-        return self.create_message(
+        return await self.create_message(
+            db,
             role=2,
             content=content,
             content_type=content_type,
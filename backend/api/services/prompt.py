@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.repositories.prompt import PromptRepository
 from api.core.models import Prompt
+from api.core.http_cache import reference_cache
 
 
 class PromptService:
@@ -19,7 +20,9 @@ class PromptService:
             status=1,
             last_updated=None
         )
-        return await self.repository.create_prompt(db, prompt)
+        prompt = await self.repository.create_prompt(db, prompt)
+        reference_cache.invalidate("prompt")
+        return prompt
 
     # READ (One)
     async def get_prompt(self, db: AsyncSession, prompt_id: int) -> Optional[Prompt]:
@@ -47,7 +50,9 @@ class PromptService:
             prompt.content = content
         
         prompt.last_updated = datetime.utcnow()
-        return await self.repository.update_prompt(db, prompt)
+        prompt = await self.repository.update_prompt(db, prompt)
+        reference_cache.invalidate("prompt")
+        return prompt
 
     # DELETE
     async def delete_prompt(self, db: AsyncSession, prompt_id: int) -> bool:
@@ -55,4 +60,5 @@ class PromptService:
         if not prompt:
             return False
         await self.repository.delete_prompt(db, prompt)
+        reference_cache.invalidate("prompt")
         return True
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""Opt-in semantic cache for context-free chat replies.
+
+Replies are looked up first by exact normalised message text, then by
+embedding similarity (cosine >= threshold). Only prompts that carry no
+conversation-specific context (no summary, no prior turns) and whose reply
+did not involve tool calls are stored, so a cached answer never leaks one
+conversation's content into another.
+"""
+
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from api.core.config import settings
+
+
+def normalize_text(text: str) -> str:
+    """Normalise a message for exact-match lookup (case, spacing, punctuation)."""
+    text = (text or "").lower().strip()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ?!.,;:")
+
+
+def _unit(vec: List[float]) -> Optional[List[float]]:
+    norm = math.sqrt(sum(v * v for v in vec))
+    if not norm:
+        return None
+    return [v / norm for v in vec]
+
+
+class _Entry:
+    __slots__ = ("response", "embedding", "expires_at")
+
+    def __init__(self, response: str, embedding: Optional[List[float]], expires_at: float):
+        self.response = response
+        self.embedding = embedding
+        self.expires_at = expires_at
+
+
+class SemanticResponseCache:
+    """LRU + TTL cache of replies with exact and embedding-similarity lookup."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.92
+    ):
+        """Initialize the cache.
+
+        Args:
+            enabled: Whether lookups and stores are performed
+            max_entries: Maximum cached replies (least recently used evicted first)
+            ttl_seconds: Lifetime of a cached reply
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+        """
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._matrix = None  # (keys, vectors) snapshot for semantic lookup
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now: float):
+        expired = [k for k, e in self._entries.items() if e.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self.expirations += len(expired)
+            self._matrix = None
+
+    def get_exact(self, text: str) -> Optional[str]:
+        """Return a cached reply for the exact normalised text, if any."""
+        if not self.enabled:
+            return None
+        key = normalize_text(text)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self._matrix = None
+            return None
+        self._entries.move_to_end(key)
+        self.exact_hits += 1
+        return entry.response
+
+    def get_similar(self, embedding: Optional[List[float]]) -> Optional[str]:
+        """Return the most similar cached reply above the threshold, if any.
+
+        Records a miss when nothing matches; call after ``get_exact``.
+        """
+        if not self.enabled:
+            return None
+        query = _unit(embedding) if embedding else None
+        if query is None:
+            self.misses += 1
+            return None
+
+        self._expire(time.monotonic())
+        best_key, best_score = None, -1.0
+        if np is not None:
+            if self._matrix is None:
+                keys = [k for k, e in self._entries.items() if e.embedding is not None]
+                vectors = np.array([self._entries[k].embedding for k in keys]) if keys else None
+                self._matrix = (keys, vectors)
+            keys, vectors = self._matrix
+            if keys and vectors.shape[1] == len(query):
+                scores = vectors @ np.array(query)
+                idx = int(np.argmax(scores))
+                best_key, best_score = keys[idx], float(scores[idx])
+        else:
+            for key, entry in self._entries.items():
+                if entry.embedding is None or len(entry.embedding) != len(query):
+                    continue
+                score = sum(a * b for a, b in zip(entry.embedding, query))
+                if score > best_score:
+                    best_key, best_score = key, score
+
+        if best_key is not None and best_score >= self.similarity_threshold:
+            self._entries.move_to_end(best_key)
+            self.semantic_hits += 1
+            return self._entries[best_key].response
+
+        self.misses += 1
+        return None
+
+    def put(self, text: str, response: str, embedding: Optional[List[float]] = None):
+        """Store a reply for a context-free prompt."""
+        if not self.enabled or not response:
+            return
+        key = normalize_text(text)
+        self._entries[key] = _Entry(
+            response=response,
+            embedding=_unit(embedding) if embedding else None,
+            expires_at=time.monotonic() + self.ttl_seconds
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._matrix = None
+
+    def clear(self):
+        self._entries.clear()
+        self._matrix = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit-rate metrics for the stats endpoint."""
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Process-wide cache shared by all WebSocket sessions
+response_cache = SemanticResponseCache(
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY
+)
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.repositories.role import RoleRepository
 from api.core.models import Role
+from api.core.http_cache import reference_cache
 
 
 class RoleService:
@@ -18,7 +19,9 @@ class RoleService:
             status=1,
             last_updated=None
         )
-        return await self.repository.create_role(db, role)
+        role = await self.repository.create_role(db, role)
+        reference_cache.invalidate("role")
+        return role
 
     # READ (One)
     async def get_role(self, db: AsyncSession, role_id: int) -> Optional[Role]:
@@ -38,7 +41,9 @@ class RoleService:
             role.name = name
         
         role.last_updated = datetime.utcnow()
-        return await self.repository.update_role(db, role)
+        role = await self.repository.update_role(db, role)
+        reference_cache.invalidate("role")
+        return role
 
     # DELETE
     async def delete_role(self, db: AsyncSession, role_id: int) -> bool:
@@ -46,4 +51,5 @@ class RoleService:
         if not role:
             return False
         await self.repository.delete_role(db, role)
+        reference_cache.invalidate("role")
         return True
\ No newline at end of file
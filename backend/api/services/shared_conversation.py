@@ -1,62 +1,72 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.repositories.shared_conversation import SharedConversationRepository
 from api.core.models import SharedConversation
-from services.mcp_vector.src.models.db import session
 
-from typing import List, Optional
 
 class SharedConversationService:
     
     def __init__(self):
-        self.db = session
-        self.repository = SharedConversationRepository(self.db)
+        self.repository = SharedConversationRepository()
     
-    def create_shared_conversation(
+    async def create_shared_conversation(
             self,
+            db: AsyncSession,
             conversation_id: int,
             user_id: Optional[int] = None,
             column: Optional[int] = None
     ) -> SharedConversation:
-        return self.repository.create(
+        return await self.repository.create(
+            db,
             conversation_id=conversation_id,
             user_id=user_id,
             column=column
         )
     
-    def get_shared_conversation(self, id: int) -> Optional[SharedConversation]:
-        return self.repository.get_by_id(id)
+    async def get_shared_conversation(self, db: AsyncSession, id: int) -> Optional[SharedConversation]:
+        return await self.repository.get_by_id(db, id)
     
-    def get_all_shared_conversations(self, skip: int = 0, limit: int = 100) -> List[SharedConversation]:
-        return self.repository.get_all(skip=skip, limit=limit)
+    async def get_all_shared_conversations(
+            self,
+            db: AsyncSession,
+            skip: int = 0,
+            limit: int = 100
+    ) -> List[SharedConversation]:
+        return await self.repository.get_all(db, skip=skip, limit=limit)
     
-    def get_shared_conversations_by_conversation(self, conversation_id: int) -> List[SharedConversation]:
-        return self.repository.get_by_conversation_id(conversation_id)
+    async def get_shared_conversations_by_conversation(
+            self,
+            db: AsyncSession,
+            conversation_id: int
+    ) -> List[SharedConversation]:
+        return await self.repository.get_by_conversation_id(db, conversation_id)
     
-    def get_shared_conversations_by_user(self, user_id: int) -> List[SharedConversation]:
-        return self.repository.get_by_user_id(user_id)
+    async def get_shared_conversations_by_user(self, db: AsyncSession, user_id: int) -> List[SharedConversation]:
+        return await self.repository.get_by_user_id(db, user_id)
     
-    def update_shared_conversation(self, id: int, **kwargs) -> Optional[SharedConversation]:
-        return self.repository.update(id, **kwargs)
+    async def update_shared_conversation(self, db: AsyncSession, id: int, **kwargs) -> Optional[SharedConversation]:
+        return await self.repository.update(db, id, **kwargs)
     
-    def delete_shared_conversation(self, id: int) -> bool:
-        return self.repository.delete(id)
+    async def delete_shared_conversation(self, db: AsyncSession, id: int) -> bool:
+        return await self.repository.delete(db, id)
     
-    def delete_shared_conversations_by_conversation(self, conversation_id: int) -> bool:
-        return self.repository.delete_by_conversation_id(conversation_id)
+    async def delete_shared_conversations_by_conversation(self, db: AsyncSession, conversation_id: int) -> int:
+        return await self.repository.delete_by_conversation_id(db, conversation_id)
     
-    def share_conversation_to_user(
+    async def share_conversation_to_user(
             self,
+            db: AsyncSession,
             conversation_id: int,
             target_user_id: int
     ) -> Optional[SharedConversation]:
-        existing = self.repository.get_by_conversation_id(conversation_id)
+        existing = await self.repository.get_by_conversation_id(db, conversation_id)
         for shared_conv in existing:
             if shared_conv.user_id == target_user_id:
                 return shared_conv
         
-        return self.repository.create(
+        return await self.repository.create(
+            db,
             conversation_id=conversation_id,
             user_id=target_user_id
-        )
\ No newline at end of file
+        )
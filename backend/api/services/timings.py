@@ -0,0 +1,90 @@
+"""Lightweight in-process timing metrics (turn, DB, MCP, LLM breakdowns).
+
+Used by ``/ws/stats`` and the WebSocket load test to see where a chat turn
+spends its time.
+"""
+
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict
+
+
+class TimingStats:
+    """Rolling latency samples per category (e.g. "turn", "db", "mcp")."""
+
+    def __init__(self, window: int = 5000):
+        """Initialize the stats.
+
+        Args:
+            window: Number of recent samples kept per category for percentiles
+        """
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._totals: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float):
+        """Record one duration for a category."""
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+        self._counts[name] = self._counts.get(name, 0) + 1
+        self._totals[name] = self._totals.get(name, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, name: str):
+        """Time the enclosed block (awaits inside the block are included)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def reset(self):
+        self._samples.clear()
+        self._counts.clear()
+        self._totals.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return count, total and p50/p95/p99 (ms) per category."""
+        stats = {}
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+
+            def pct(p: float) -> float:
+                return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+            stats[name] = {
+                "count": self._counts[name],
+                "total_ms": round(self._totals[name] * 1000, 1),
+                "p50_ms": pct(0.50),
+                "p95_ms": pct(0.95),
+                "p99_ms": pct(0.99),
+            }
+        return stats
+
+
+def process_memory() -> Dict[str, int]:
+    """Return resident memory of this process in bytes (current and peak)."""
+    current = peak = 0
+    try:
+        with open(f"/proc/{os.getpid()}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except Exception:
+            pass
+    return {"rss_bytes": current, "peak_rss_bytes": peak}
+
+
+# Process-wide timings shared by all WebSocket sessions
+timings = TimingStats()
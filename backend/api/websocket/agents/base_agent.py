@@ -30,6 +30,26 @@ class BaseAgent:
         """
         raise NotImplementedError("Subclasses must implement handle_message")
 
+    def cancel(self):
+        """Abort the message currently being processed (optional).
+        
+        Called when the client cancels a turn; the endpoint also cancels
+        the task running handle_message.
+        """
+        pass
+
+    def estimate_memory(self) -> int:
+        """Approximate bytes held by this agent's caches (default: 0)."""
+        return 0
+
+    def release_caches(self) -> int:
+        """Drop caches that can be rebuilt or reloaded from the database.
+        
+        Returns:
+            Approximate bytes released
+        """
+        return 0
+
     async def stream_response(self, message: str):
         """Stream response chunks (for future streaming support).
         
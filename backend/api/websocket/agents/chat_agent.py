@@ -2,30 +2,193 @@
 
 import asyncio
 import json
+import threading
 import traceback
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional, List
 
 from api.websocket.agents.base_agent import BaseAgent
 from api.core.models import Message
+from api.core.message_storage import load_contents, set_content
 from api.services.conversation import ConversationService
-from api.core.db import async_session
+from api.core.db import async_session, replica_session
+from api.core.config import settings as app_settings
+from api.websocket.utils.context import ContextAssembler, estimate_tokens
+from api.services.llm_scheduler import llm_scheduler, Priority, LLMBusyError
+from api.services.response_cache import response_cache
+from api.services.timings import timings
 
-# Import Google Gemini API
+# LLM provider (Gemini by default, offline stub for load testing)
 try:
-    import google.generativeai as genai
-    from api.core.config import settings
+    from services.common.llm_provider import get_provider
     
-    GENAI_API_KEY = settings.GENAI_API_KEY
-    MODEL = settings.LLM_MODEL
-    
-    if GENAI_API_KEY:
-        genai.configure(api_key=GENAI_API_KEY)
+    LLM_PROVIDER = (app_settings.LLM_PROVIDER or "gemini").lower()
+    if LLM_PROVIDER == "gemini":
+        llm = get_provider(
+            "gemini",
+            api_key=app_settings.GENAI_API_KEY,
+            model=app_settings.LLM_MODEL,
+            embed_model=app_settings.EMBED_MODEL
+        )
+    else:
+        llm = get_provider(LLM_PROVIDER)
 except Exception as e:
-    genai = None
-    GENAI_API_KEY = None
-    MODEL = None
-    print(f"Warning: Could not load Gemini API: {e}")
+    llm = None
+    print(f"Warning: Could not load LLM provider: {e}")
+
+
+# Function declarations matching MCP servers capabilities (provider-neutral schema)
+ORCHESTRATOR_TOOLS = [
+    # Collector MCP functions
+    {
+        "name": "ingest_raw_requirements",
+        "description": "Thu thập và chuẩn hóa raw requirements từ user input. Tự động gọi khi user nhập requirements.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Raw requirement text items"
+                }
+            },
+            "required": ["items"]
+        }
+    },
+    # Analyzer MCP functions
+    {
+        "name": "analyze_stories",
+        "description": "Phân tích stories để tìm issues, conflicts, suggestions. Gọi sau khi có stories từ collector.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "stories": {
+                    "type": "array",
+                    "items": {"type": "object"},
+                    "description": "User stories cần phân tích"
+                }
+            },
+            "required": ["stories"]
+        }
+    },
+    # Requirement MCP functions
+    {
+        "name": "identify_requirements",
+        "description": "Xác định và tổng hợp core requirements từ analyzed stories.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "stories": {
+                    "type": "array",
+                    "items": {"type": "object"},
+                    "description": "Stories đã được analyze"
+                }
+            },
+            "required": ["stories"]
+        }
+    },
+    {
+        "name": "prioritize_requirements",
+        "description": "Ưu tiên các requirements theo độ quan trọng và urgency.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "requirements": {
+                    "type": "array",
+                    "items": {"type": "object"},
+                    "description": "Requirements cần prioritize"
+                }
+            },
+            "required": ["requirements"]
+        }
+    },
+    # Validator MCP functions
+    {
+        "name": "validate_requirements",
+        "description": "Validate requirements structure và completeness. Gọi sau khi prioritize để đảm bảo quality.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "requirements": {
+                    "type": "array",
+                    "items": {"type": "object"},
+                    "description": "Requirements cần validate"
+                }
+            },
+            "required": ["requirements"]
+        }
+    },
+    # Reporter MCP function
+    {
+        "name": "generate_context_diagram",
+        "description": "Tạo context diagram (Mermaid) từ prioritized requirements. Gọi cuối cùng để tạo visualization.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "requirements": {
+                    "type": "array",
+                    "items": {"type": "object"},
+                    "description": "Prioritized requirements"
+                }
+            },
+            "required": ["requirements"]
+        }
+    },
+    # Vector MCP functions - for conversation context storage
+    {
+        "name": "store_conversation_context",
+        "description": "Lưu conversation context vào vector store để có thể retrieve sau này. Tự động gọi sau khi hoàn thành pipeline.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "summary": {
+                    "type": "string",
+                    "description": "Summary của conversation"
+                },
+                "requirements": {
+                    "type": "array",
+                    "items": {"type": "object"},
+                    "description": "Requirements đã xử lý"
+                },
+                "diagram": {
+                    "type": "string",
+                    "description": "Context diagram đã tạo"
+                }
+            },
+            "required": ["summary"]
+        }
+    },
+    {
+        "name": "search_previous_context",
+        "description": "Tìm kiếm previous conversation context từ vector store khi user hỏi về requirements trước đó.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query"
+                },
+                "top_k": {
+                    "type": "integer",
+                    "description": "Number of results"
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    # Utility functions
+    {
+        "name": "show_help",
+        "description": "Hiển thị hướng dẫn sử dụng chi tiết",
+        "parameters": {"type": "object", "properties": {}}
+    },
+    {
+        "name": "clear_requirements",
+        "description": "Xóa tất cả requirements đã lưu",
+        "parameters": {"type": "object", "properties": {}}
+    },
+]
 
 
 class ChatAgent(BaseAgent):
@@ -76,19 +239,33 @@ class ChatAgent(BaseAgent):
         # State - NO memory cache for messages, all from DB
         self.is_first_message = True  # Track first user message for auto-naming
         
-        # Temporary cache for current tool execution (within single request)
-        self.last_pipeline_result = {
-            "stories": [],
-            "analysis": {},
-            "requirements": [],
-            "validation_issues": [],
-            "diagram": "",
-            "report": {}
-        }
+        # Conversation summary kept warm across turns and reconnects
+        # (None = not loaded yet, "" = conversation has no summary)
+        self._summary_cache: Optional[str] = None
+        
+        # Temporary cache for current tool execution (within single request);
+        # update it through _cache_pipeline so its size stays current
+        self.last_pipeline_result = self._empty_pipeline_result()
+        self._pipeline_sizes = {}
+        
+        # Snippets from a search_previous_context call, best first; sent as
+        # the "related context" tier of the next turn only, then dropped
+        self._retrieved_context: List[str] = []
+        
+        # Set to abort in-flight MCP waits when the current turn is cancelled
+        self._cancel_event = threading.Event()
+        
+        # Token-budgeted history builder (caches per-message token counts)
+        self.context_assembler = ContextAssembler(
+            max_tokens=app_settings.CONTEXT_TOKEN_BUDGET,
+            summary_max_tokens=app_settings.CONTEXT_SUMMARY_TOKENS,
+            retrieved_max_tokens=app_settings.CONTEXT_RETRIEVED_TOKENS,
+            max_turns=app_settings.CONTEXT_MAX_TURNS
+        )
 
     async def initialize_conversation(self, conversation_name: Optional[str] = None):
         """Initialize conversation in database and load existing context."""
-        async with async_session() as db:
+        async with self._db_session() as db:
             if not self.conversation_id:
                 # Create conversation with temporary name (will be updated after first message)
                 conversation = await self.conversation_service.create_conversation(
@@ -108,10 +285,57 @@ class ChatAgent(BaseAgent):
             else:
                 # Load existing conversation context
                 self.is_first_message = False  # Existing conversation, not first message
-                await self._load_conversation_context(db)
+                self._summary_cache = await self._load_conversation_context(db) or ""
+        
+        # Hits of another conversation's search never carry over
+        self._retrieved_context = []
+
+    def cancel(self):
+        """Abort the turn in progress (pending MCP calls return "cancelled")."""
+        self._cancel_event.set()
+
+    @staticmethod
+    def _empty_pipeline_result() -> dict:
+        return {
+            "stories": [],
+            "analysis": {},
+            "requirements": [],
+            "validation_issues": [],
+            "diagram": "",
+            "report": {}
+        }
+
+    @staticmethod
+    def _serialized_size(value) -> int:
+        try:
+            return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+        except (TypeError, ValueError):
+            return 0
+
+    def _cache_pipeline(self, **parts):
+        """Store pipeline parts in the cache, measuring each part once."""
+        for key, value in parts.items():
+            self.last_pipeline_result[key] = value
+            self._pipeline_sizes[key] = self._serialized_size(value)
+
+    def estimate_memory(self) -> int:
+        """Approximate bytes held by the pipeline cache (serialized size, measured on assignment)."""
+        return sum(self._pipeline_sizes.values())
+
+    def release_caches(self) -> int:
+        """Drop the cached pipeline result; results stay available in the DB."""
+        released = self.estimate_memory()
+        self.last_pipeline_result = self._empty_pipeline_result()
+        self._pipeline_sizes = {}
+        self._retrieved_context = []
+        self.context_assembler.clear_cache()
+        return released
 
     async def handle_message(self, message: str) -> str:
         """Handle incoming message - Load context from DB, process, save back to DB."""
+        # Fresh event per turn: threads of a cancelled turn keep seeing theirs set
+        self._cancel_event = threading.Event()
+        
         if not self.conversation_id:
             await self.initialize_conversation()
         
@@ -127,8 +351,11 @@ class ChatAgent(BaseAgent):
         conversation_summary = await self._load_conversation_summary()
         recent_messages = await self._load_recent_messages(limit=10)
         
+        # Search hits of the previous turn are used once, then reset
+        retrieved, self._retrieved_context = self._retrieved_context, []
+        
         # 4. Generate response with loaded context (summary + recent messages)
-        response = await self._generate_response(message, conversation_summary, recent_messages)
+        response = await self._generate_response(message, conversation_summary, recent_messages, retrieved)
         
         # 5. Save response
         await self._save_message(role=2, content=response, agent_id=self.agent_id)
@@ -138,6 +365,26 @@ class ChatAgent(BaseAgent):
         
         return response
 
+    @asynccontextmanager
+    async def _db_session(self):
+        """Async DB session whose lifetime is recorded in the "db" timing."""
+        with timings.measure("db"):
+            async with async_session() as db:
+                yield db
+
+    async def _call_mcp(self, agent: str, method: str, params: dict) -> dict:
+        """Call an MCP server off the event loop; aborted by cancel()."""
+        from api.services import mcp_adapter
+        
+        with timings.measure("mcp"):
+            return await asyncio.to_thread(
+                mcp_adapter.call_mcp,
+                agent,
+                method,
+                params,
+                cancel_event=self._cancel_event
+            )
+
     async def _save_message(
         self, 
         role: int, 
@@ -146,10 +393,9 @@ class ChatAgent(BaseAgent):
         agent_id: Optional[int] = None
     ):
         """Save message to database."""
-        async with async_session() as db:
+        async with self._db_session() as db:
             message = Message(
                 role=role,
-                content=content,
                 content_type=1,
                 message_type=1,
                 conversation_id=self.conversation_id,
@@ -159,12 +405,14 @@ class ChatAgent(BaseAgent):
                 status=1
             )
             db.add(message)
+            # Large pipeline results / reports go to message_body, compressed
+            await set_content(db, message, content)
             await db.commit()
     
     async def _auto_name_conversation(self, first_message: str):
         """Auto-generate conversation name from first user message using Gemini."""
         try:
-            if not genai or not GENAI_API_KEY:
+            if not llm or not llm.available:
                 return
             
             # Use Gemini to generate a short, descriptive name (max 50 chars)
@@ -180,14 +428,15 @@ Ví dụ:
 
 Tên cuộc hội thoại:"""
 
-            model = genai.GenerativeModel(MODEL)
-            response = await asyncio.to_thread(
-                model.generate_content,
+            response = await llm_scheduler.run(
+                llm.generate,
                 prompt,
                 generation_config={
                     "temperature": 0.3,
                     "max_output_tokens": 50,
-                }
+                },
+                priority=Priority.NAMING,
+                tokens=estimate_tokens(prompt) + 50
             )
             
             if response and response.text:
@@ -199,7 +448,7 @@ Tên cuộc hội thoại:"""
                     conversation_name = conversation_name[:47] + "..."
                 
                 # Update conversation name in DB
-                async with async_session() as db:
+                async with self._db_session() as db:
                     await self.conversation_service.update_conversation(
                         db=db,
                         conversation_id=self.conversation_id,
@@ -219,15 +468,22 @@ Tên cuộc hội thoại:"""
     
     async def _load_conversation_summary(self) -> Optional[str]:
         """Load conversation summary for context."""
-        async with async_session() as db:
+        if self._summary_cache is not None:
+            return self._summary_cache or None
+        async with self._db_session() as db:
             conversation = await self.conversation_service.get_conversation(db, self.conversation_id)
-            if conversation and conversation.summary:
-                return conversation.summary
-            return None
+            self._summary_cache = (conversation.summary if conversation else None) or ""
+            return self._summary_cache or None
     
-    async def _load_recent_messages(self, limit: int = 10) -> List[dict]:
-        """Load recent messages from DB for context."""
-        async with async_session() as db:
+    async def _load_recent_messages(self, limit: int = 10, full_content: bool = True) -> List[dict]:
+        """Load recent messages from DB for context.
+        
+        Args:
+            limit: Number of most recent messages
+            full_content: Fetch the full text of messages stored out of line
+                (one extra query); False keeps their preview
+        """
+        async with self._db_session() as db:
             from sqlalchemy import select
             
             stmt = select(Message).where(
@@ -241,13 +497,21 @@ Tên cuộc hội thoại:"""
             # Reverse to get chronological order
             messages = list(reversed(messages))
             
+            # Large pipeline results / reports: full text, so role=3 payloads
+            # still collapse and long replies are not cut to the preview
+            if full_content:
+                contents = await load_contents(db, messages)
+            else:
+                contents = {msg.id: msg.content for msg in messages}
+            
             # Format for context
             context = []
             for msg in messages:
                 role_name = "user" if msg.role == 1 else "assistant" if msg.role == 2 else "system"
                 context.append({
+                    "id": msg.id,
                     "role": role_name,
-                    "content": msg.content,
+                    "content": contents[msg.id],
                     "timestamp": msg.created_at.isoformat() if msg.created_at else None
                 })
             
@@ -268,8 +532,8 @@ Tên cuộc hội thoại:"""
             
             # Update summary every 5 messages
             if count % 5 == 0:
-                # Load all messages
-                all_messages = await self._load_recent_messages(limit=100)
+                # Load all messages (previews are enough, content is cut to 200 chars)
+                all_messages = await self._load_recent_messages(limit=100, full_content=False)
                 
                 # Generate summary text
                 summary_text = f"""# Conversation Summary
@@ -291,7 +555,7 @@ Total Messages: {count}
     
     async def _save_conversation_summary(self, summary: str, embedding: Optional[List[float]] = None):
         """Save conversation summary and embedding to DB."""
-        async with async_session() as db:
+        async with self._db_session() as db:
             conversation = await self.conversation_service.get_conversation(db, self.conversation_id)
             if conversation:
                 conversation.summary = summary
@@ -300,22 +564,26 @@ Total Messages: {count}
                 conversation.last_updated = datetime.utcnow()
                 db.add(conversation)
                 await db.commit()
+                self._summary_cache = summary
     
-    async def _generate_embedding(self, text: str) -> List[float]:
+    async def _generate_embedding(
+        self,
+        text: str,
+        priority: Priority = Priority.SUMMARY
+    ) -> List[float]:
         """Generate embedding using Gemini API."""
         try:
-            if not genai or not GENAI_API_KEY:
+            if not llm or not llm.available:
                 return []
             
-            # Use Gemini embedding API
-            result = await asyncio.to_thread(
-                genai.embed_content,
-                model="models/text-embedding-004",
-                content=text,
-                task_type="retrieval_document"
+            # Use provider embedding API
+            return await llm_scheduler.run(
+                llm.embed,
+                text,
+                task_type="retrieval_document",
+                priority=priority,
+                tokens=estimate_tokens(text)
             )
-            
-            return result['embedding']
         except Exception as e:
             print(f"Error generating embedding: {e}")
             return []
@@ -324,7 +592,7 @@ Total Messages: {count}
         """Search similar conversations using embeddings."""
         try:
             # Generate query embedding
-            query_embedding = await self._generate_embedding(query)
+            query_embedding = await self._generate_embedding(query, priority=Priority.INTERACTIVE)
             if not query_embedding:
                 return []
             
@@ -340,7 +608,8 @@ Total Messages: {count}
         self, 
         message: str, 
         summary: Optional[str], 
-        recent_messages: List[dict]
+        recent_messages: List[dict],
+        retrieved: Optional[List[str]] = None
     ) -> str:
         """Generate response using Gemini with loaded context from DB."""
         text = message.strip()
@@ -351,8 +620,8 @@ Total Messages: {count}
             return "pong"
         
         # Use Gemini to understand intent and route to appropriate action
-        if genai and GENAI_API_KEY:
-            return await self._call_gemini_orchestrator(text, summary, recent_messages)
+        if llm and llm.available:
+            return await self._call_gemini_orchestrator(text, summary, recent_messages, retrieved)
         
         return "Xin lỗi, tôi đang gặp vấn đề kết nối với AI. Vui lòng thử lại."
 
@@ -375,12 +644,8 @@ Total Messages: {count}
             raw_text = "\n\n".join([m['content'] for m in recent_messages if m['role'] == 'user'])
             reqs_count = len(recent_messages)
             
-            # Import MCP adapter
-            from api.services import mcp_adapter
-            
             # Step 1: Collector - ingest raw text
-            ing_resp = await asyncio.to_thread(
-                mcp_adapter.call_mcp,
+            ing_resp = await self._call_mcp(
                 "mcp_collector",
                 "ingest_raw",
                 {"items": [raw_text]}
@@ -392,8 +657,7 @@ Total Messages: {count}
             chunks = ing_resp.get("response", {}).get("chunks") or ing_resp.get("chunks") or []
             
             # Step 2: Collector - normalize chunks
-            norm_resp = await asyncio.to_thread(
-                mcp_adapter.call_mcp,
+            norm_resp = await self._call_mcp(
                 "mcp_collector",
                 "normalize",
                 {"chunks": chunks}
@@ -405,8 +669,7 @@ Total Messages: {count}
             norm_chunks = norm_resp.get("response", {}).get("chunks") or norm_resp.get("chunks") or []
             
             # Step 3: Collector - extract stories
-            ext_resp = await asyncio.to_thread(
-                mcp_adapter.call_mcp,
+            ext_resp = await self._call_mcp(
                 "mcp_collector",
                 "extract_stories",
                 {"chunks": norm_chunks}
@@ -418,8 +681,7 @@ Total Messages: {count}
             stories = ext_resp.get("response", {}).get("stories") or ext_resp.get("stories") or []
             
             # Step 4: Analyzer - analyze stories
-            anl_resp = await asyncio.to_thread(
-                mcp_adapter.call_mcp,
+            anl_resp = await self._call_mcp(
                 "mcp_analyzer",
                 "analyze_stories",
                 {"stories": stories}
@@ -431,8 +693,7 @@ Total Messages: {count}
             analysis = anl_resp.get("response", {}) or anl_resp
             
             # Step 5: Requirement - identify requirements
-            idr_resp = await asyncio.to_thread(
-                mcp_adapter.call_mcp,
+            idr_resp = await self._call_mcp(
                 "mcp_requirement",
                 "identify_requirements",
                 {"stories": stories, "analysis": analysis}
@@ -444,8 +705,7 @@ Total Messages: {count}
             requirements = idr_resp.get("response", {}).get("requirements") or idr_resp.get("requirements") or []
             
             # Step 6: Requirement - prioritize
-            pri_resp = await asyncio.to_thread(
-                mcp_adapter.call_mcp,
+            pri_resp = await self._call_mcp(
                 "mcp_requirement",
                 "prioritize",
                 {"requirements": requirements}
@@ -457,8 +717,7 @@ Total Messages: {count}
             prioritized = pri_resp.get("response", {}) or pri_resp
             
             # Step 7: Reporter - build final report with context diagram
-            rep_resp = await asyncio.to_thread(
-                mcp_adapter.call_mcp,
+            rep_resp = await self._call_mcp(
                 "mcp_reporter",
                 "build_final_report",
                 {
@@ -482,14 +741,14 @@ Total Messages: {count}
             markdown_report = report.get("final_report_markdown", "")
             
             # Cache pipeline results for future reference
-            self.last_pipeline_result = {
-                "stories": stories,
-                "analysis": analysis,
-                "requirements": requirements,
-                "validation_issues": [],
-                "diagram": mermaid_diagram,
-                "report": report
-            }
+            self._cache_pipeline(
+                stories=stories,
+                analysis=analysis,
+                requirements=requirements,
+                validation_issues=[],
+                diagram=mermaid_diagram,
+                report=report
+            )
             
             # Create conversation summary for DB storage
             summary_text = f"""# Requirements Analysis Summary
@@ -573,183 +832,11 @@ Total Messages: {count}
         self, 
         message: str, 
         summary: Optional[str],
-        recent_messages: List[dict]
+        recent_messages: List[dict],
+        retrieved: Optional[List[str]] = None
     ) -> str:
         """Call Gemini as orchestrator with function calling for MCP routing."""
         try:
-            # Define function declarations matching MCP servers capabilities
-            
-            # Collector MCP functions
-            ingest_raw_declaration = genai.protos.FunctionDeclaration(
-                name="ingest_raw_requirements",
-                description="Thu thập và chuẩn hóa raw requirements từ user input. Tự động gọi khi user nhập requirements.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "items": genai.protos.Schema(
-                            type=genai.protos.Type.ARRAY,
-                            items=genai.protos.Schema(type=genai.protos.Type.STRING),
-                            description="Raw requirement text items"
-                        )
-                    },
-                    required=["items"]
-                )
-            )
-            
-            # Analyzer MCP functions
-            analyze_declaration = genai.protos.FunctionDeclaration(
-                name="analyze_stories",
-                description="Phân tích stories để tìm issues, conflicts, suggestions. Gọi sau khi có stories từ collector.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "stories": genai.protos.Schema(
-                            type=genai.protos.Type.ARRAY,
-                            items=genai.protos.Schema(type=genai.protos.Type.OBJECT),
-                            description="User stories cần phân tích"
-                        )
-                    },
-                    required=["stories"]
-                )
-            )
-            
-            # Requirement MCP functions
-            identify_declaration = genai.protos.FunctionDeclaration(
-                name="identify_requirements",
-                description="Xác định và tổng hợp core requirements từ analyzed stories.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "stories": genai.protos.Schema(
-                            type=genai.protos.Type.ARRAY,
-                            items=genai.protos.Schema(type=genai.protos.Type.OBJECT),
-                            description="Stories đã được analyze"
-                        )
-                    },
-                    required=["stories"]
-                )
-            )
-            
-            prioritize_declaration = genai.protos.FunctionDeclaration(
-                name="prioritize_requirements",
-                description="Ưu tiên các requirements theo độ quan trọng và urgency.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "requirements": genai.protos.Schema(
-                            type=genai.protos.Type.ARRAY,
-                            items=genai.protos.Schema(type=genai.protos.Type.OBJECT),
-                            description="Requirements cần prioritize"
-                        )
-                    },
-                    required=["requirements"]
-                )
-            )
-            
-            # Reporter MCP function
-            generate_report_declaration = genai.protos.FunctionDeclaration(
-                name="generate_context_diagram",
-                description="Tạo context diagram (Mermaid) từ prioritized requirements. Gọi cuối cùng để tạo visualization.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "requirements": genai.protos.Schema(
-                            type=genai.protos.Type.ARRAY,
-                            items=genai.protos.Schema(type=genai.protos.Type.OBJECT),
-                            description="Prioritized requirements"
-                        )
-                    },
-                    required=["requirements"]
-                )
-            )
-            
-            # Validator MCP functions
-            validate_req_declaration = genai.protos.FunctionDeclaration(
-                name="validate_requirements",
-                description="Validate requirements structure và completeness. Gọi sau khi prioritize để đảm bảo quality.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "requirements": genai.protos.Schema(
-                            type=genai.protos.Type.ARRAY,
-                            items=genai.protos.Schema(type=genai.protos.Type.OBJECT),
-                            description="Requirements cần validate"
-                        )
-                    },
-                    required=["requirements"]
-                )
-            )
-            
-            # Vector MCP functions - for conversation context storage
-            store_context_declaration = genai.protos.FunctionDeclaration(
-                name="store_conversation_context",
-                description="Lưu conversation context vào vector store để có thể retrieve sau này. Tự động gọi sau khi hoàn thành pipeline.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "summary": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Summary của conversation"
-                        ),
-                        "requirements": genai.protos.Schema(
-                            type=genai.protos.Type.ARRAY,
-                            items=genai.protos.Schema(type=genai.protos.Type.OBJECT),
-                            description="Requirements đã xử lý"
-                        ),
-                        "diagram": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Context diagram đã tạo"
-                        )
-                    },
-                    required=["summary"]
-                )
-            )
-            
-            search_context_declaration = genai.protos.FunctionDeclaration(
-                name="search_previous_context",
-                description="Tìm kiếm previous conversation context từ vector store khi user hỏi về requirements trước đó.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "query": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Search query"
-                        ),
-                        "top_k": genai.protos.Schema(
-                            type=genai.protos.Type.INTEGER,
-                            description="Number of results"
-                        )
-                    },
-                    required=["query"]
-                )
-            )
-            
-            # Utility functions
-            help_declaration = genai.protos.FunctionDeclaration(
-                name="show_help",
-                description="Hiển thị hướng dẫn sử dụng chi tiết",
-                parameters=genai.protos.Schema(type=genai.protos.Type.OBJECT, properties={})
-            )
-            
-            clear_declaration = genai.protos.FunctionDeclaration(
-                name="clear_requirements",
-                description="Xóa tất cả requirements đã lưu",
-                parameters=genai.protos.Schema(type=genai.protos.Type.OBJECT, properties={})
-            )
-            
-            tools = genai.protos.Tool(function_declarations=[
-                ingest_raw_declaration,
-                analyze_declaration,
-                identify_declaration,
-                prioritize_declaration,
-                validate_req_declaration,
-                generate_report_declaration,
-                store_context_declaration,
-                search_context_declaration,
-                help_declaration,
-                clear_declaration
-            ])
-            
             system_instruction = f"""Bạn là Business Analysis Assistant - Chuyên gia phân tích nghiệp vụ và Use Case.
 
 🎯 SCOPE NGHIÊM NGẶT - CHỈ hỗ trợ Business Analysis & Use Case Analysis:
@@ -815,10 +902,31 @@ Total Messages: {count}
 - Load existing context khi reconnect to conversation
 - Present kết quả với insights và recommendations"""
             
-            model = genai.GenerativeModel(
-                MODEL,
+            # Build conversation history from loaded context (from DB),
+            # fitted to the token budget: summary > recent turns > retrieved
+            history_messages = recent_messages
+            if history_messages and history_messages[-1]["role"] == "user" \
+                    and history_messages[-1]["content"].strip() == message:
+                # Current message is already saved; it is sent separately below
+                history_messages = history_messages[:-1]
+            history = self.context_assembler.assemble(summary, history_messages, retrieved)
+            
+            # Context-free prompts (no summary, no prior turns) may be served from cache
+            cache_embedding = None
+            cacheable = response_cache.enabled and not summary and not history_messages \
+                and not retrieved
+            if cacheable:
+                cached = response_cache.get_exact(message)
+                if cached is None:
+                    cache_embedding = await self._generate_embedding(message, priority=Priority.INTERACTIVE)
+                    cached = response_cache.get_similar(cache_embedding)
+                if cached is not None:
+                    return cached
+            
+            chat = llm.start_chat(
                 system_instruction=system_instruction,
-                tools=[tools],
+                tools=ORCHESTRATOR_TOOLS,
+                history=history,
                 generation_config={
                     "temperature": 0.8,
                     "top_p": 0.95,
@@ -826,92 +934,70 @@ Total Messages: {count}
                     "max_output_tokens": 2048,
                 }
             )
-            
-            # Build conversation history from loaded context (from DB)
-            # Include summary as first context if available
-            history = []
-            
-            if summary:
-                # Add summary as system context
-                history.append({
-                    "role": "user",
-                    "parts": [f"[Previous conversation summary]\n{summary[:1000]}..."]
-                })
-                history.append({
-                    "role": "model",
-                    "parts": ["I have the context from our previous conversation."]
-                })
-            
-            # Add recent messages for immediate context
-            for msg in recent_messages[-8:]:  # Last 8 messages
-                role = "user" if msg["role"] == "user" else "model"
-                history.append({"role": role, "parts": [msg["content"]]})
-            
-            chat = model.start_chat(history=history)
-            response = await asyncio.to_thread(chat.send_message, message)
+            prompt_tokens = estimate_tokens(system_instruction) + estimate_tokens(message) + sum(
+                estimate_tokens(part) for turn in history for part in turn["parts"]
+            )
+            response = await llm_scheduler.run(
+                chat.send_message,
+                message,
+                priority=Priority.INTERACTIVE,
+                tokens=prompt_tokens + 2048
+            )
             
             # Handle function calls (may chain multiple tools)
             max_iterations = 10  # Prevent infinite loops
             iteration = 0
+            used_tools = False
             
             while iteration < max_iterations:
                 iteration += 1
                 
-                if not (response.candidates and response.candidates[0].content.parts):
-                    break
-                
-                function_calls = []
-                for part in response.candidates[0].content.parts:
-                    if hasattr(part, 'function_call') and part.function_call:
-                        function_calls.append(part.function_call)
-                
+                function_calls = response.function_calls
                 if not function_calls:
                     break
+                used_tools = True
                 
                 # Execute all function calls
                 function_responses = []
                 for fc in function_calls:
                     tool_result = await self._execute_tool(fc.name, dict(fc.args))
-                    function_responses.append(
-                        genai.protos.Part(
-                            function_response=genai.protos.FunctionResponse(
-                                name=fc.name,
-                                response=tool_result
-                            )
-                        )
-                    )
+                    function_responses.append({"name": fc.name, "response": tool_result})
                 
-                # Send all results back to Gemini
-                response = await asyncio.to_thread(
-                    chat.send_message,
-                    genai.protos.Content(parts=function_responses)
+                # Send all results back to the LLM
+                response = await llm_scheduler.run(
+                    chat.send_function_responses,
+                    function_responses,
+                    priority=Priority.INTERACTIVE,
+                    tokens=estimate_tokens(json.dumps(function_responses, default=str)) + 2048
                 )
                 
-                # If Gemini has final text response, break
-                if hasattr(response, 'text') and response.text:
+                # If the LLM has final text response, break
+                if response.text and not response.function_calls:
                     break
             
+            # Tool-driven replies depend on user input, never cache them
+            if cacheable and not used_tools:
+                response_cache.put(message, response.text, cache_embedding)
+            
             # Return response text
-            if hasattr(response, 'text'):
-                return response.text
-            return str(response)
+            return response.text
             
+        except LLMBusyError:
+            # Surface to the endpoint as a graceful "busy" reply
+            raise
         except Exception as e:
             return f"❌ Lỗi: {str(e)}"
     
     async def _execute_tool(self, tool_name: str, args: dict) -> dict:
         """Execute MCP tool based on Gemini's function call."""
         try:
-            from api.services import mcp_adapter
-            
             if tool_name == "ingest_raw_requirements":
                 items = args.get("items", [])
                 if not items:
                     return {"error": "No items provided"}
                 
                 # Call MCP Collector: ingest_raw
-                result = await asyncio.to_thread(
-                    mcp_adapter.call_mcp,
+                result = await self._call_mcp(
                     "mcp_collector",
                     "ingest_raw",
                     {"items": items}
@@ -923,8 +1009,7 @@ Total Messages: {count}
                 chunks = result.get("response", {}).get("chunks", [])
                 
                 # Call MCP Collector: extract_stories
-                stories_result = await asyncio.to_thread(
-                    mcp_adapter.call_mcp,
+                stories_result = await self._call_mcp(
                     "mcp_collector",
                     "extract_stories",
                     {"chunks": chunks}
@@ -936,7 +1021,7 @@ Total Messages: {count}
                 stories = stories_result.get("response", {}).get("stories", [])
                 
                 # Cache for summary
-                self.last_pipeline_result["stories"] = stories
+                self._cache_pipeline(stories=stories)
                 
                 return {
                     "success": True,
@@ -951,8 +1036,7 @@ Total Messages: {count}
                     return {"error": "No stories to analyze"}
                 
                 # Call MCP Analyzer
-                result = await asyncio.to_thread(
-                    mcp_adapter.call_mcp,
+                result = await self._call_mcp(
                     "mcp_analyzer",
                     "analyze_stories",
                     {"stories": stories, "options": {"use_llm": True}}
@@ -965,8 +1049,7 @@ Total Messages: {count}
                 enriched_stories = result.get("response", {}).get("stories", stories)
                 
                 # Cache for summary
-                self.last_pipeline_result["analysis"] = analysis
-                self.last_pipeline_result["stories"] = enriched_stories
+                self._cache_pipeline(analysis=analysis, stories=enriched_stories)
                 
                 return {
                     "success": True,
@@ -981,8 +1064,7 @@ Total Messages: {count}
                     return {"error": "No stories provided"}
                 
                 # Call MCP Requirement: identify
-                result = await asyncio.to_thread(
-                    mcp_adapter.call_mcp,
+                result = await self._call_mcp(
                     "mcp_requirement",
                     "identify_requirements",
                     {"stories": stories, "options": {"use_llm": True}}
@@ -994,7 +1076,7 @@ Total Messages: {count}
                 requirements = result.get("response", {}).get("requirements", [])
                 
                 # Cache for summary
-                self.last_pipeline_result["requirements"] = requirements
+                self._cache_pipeline(requirements=requirements)
                 
                 return {
                     "success": True,
@@ -1008,8 +1090,7 @@ Total Messages: {count}
                     return {"error": "No requirements to prioritize"}
                 
                 # Call MCP Requirement: prioritize
-                result = await asyncio.to_thread(
-                    mcp_adapter.call_mcp,
+                result = await self._call_mcp(
                     "mcp_requirement",
                     "prioritize",
                     {"requirements": requirements}
@@ -1032,8 +1113,7 @@ Total Messages: {count}
                     return {"error": "No requirements to validate"}
                 
                 # Call MCP Validator
-                result = await asyncio.to_thread(
-                    mcp_adapter.call_mcp,
+                result = await self._call_mcp(
                     "mcp_validator",
                     "validate_requirements",
                     {"requirements": requirements}
@@ -1045,7 +1125,7 @@ Total Messages: {count}
                 issues = result.get("response", {}).get("issues", [])
                 
                 # Cache for summary
-                self.last_pipeline_result["validation_issues"] = issues
+                self._cache_pipeline(validation_issues=issues)
                 
                 return {
                     "success": True,
@@ -1060,8 +1140,7 @@ Total Messages: {count}
                     return {"error": "No requirements for diagram"}
                 
                 # Call MCP Reporter
-                result = await asyncio.to_thread(
-                    mcp_adapter.call_mcp,
+                result = await self._call_mcp(
                     "mcp_reporter",
                     "generate_report",
                     {"requirements": requirements}
@@ -1074,8 +1153,7 @@ Total Messages: {count}
                 diagram = report.get("context_diagram", "")
                 
                 # Cache for summary
-                self.last_pipeline_result["diagram"] = diagram
-                self.last_pipeline_result["report"] = report
+                self._cache_pipeline(diagram=diagram, report=report)
                 
                 return {
                     "success": True,
@@ -1113,7 +1191,7 @@ Context Diagram:
 """
                 
                 # Generate embedding for semantic search
-                embedding = await self._generate_embedding(context_text)
+                embedding = await self._generate_embedding(context_text, priority=Priority.INTERACTIVE)
                 
                 # Save to conversation DB (primary storage)
                 await self._save_conversation_summary(context_text, embedding)
@@ -1121,8 +1199,7 @@ Context Diagram:
                 # Also store in vector MCP for additional search capabilities
                 try:
                     context_id = f"conv_{self.conversation_id}_{int(datetime.utcnow().timestamp())}"
-                    await asyncio.to_thread(
-                        mcp_adapter.call_mcp,
+                    await self._call_mcp(
                         "mcp_vector",
                         "ingest",
                         {
@@ -1155,13 +1232,14 @@ Context Diagram:
                     return {"error": "No query provided"}
                 
                 # Generate query embedding
-                query_embedding = await self._generate_embedding(query)
+                query_embedding = await self._generate_embedding(query, priority=Priority.INTERACTIVE)
                 
                 # Search in conversation DB using embeddings
                 formatted_results = []
                 
                 try:
-                    async with async_session() as db:
+                    # Read-only scan over past conversations: replica (lag is harmless here)
+                    async with replica_session() as db:
                         from sqlalchemy import select, func
                         from api.core.models import Conversation
                         
@@ -1210,8 +1288,7 @@ Context Diagram:
                     # Fallback to vector MCP search
                     print(f"DB search failed, using vector MCP: {e}")
                     try:
-                        result = await asyncio.to_thread(
-                            mcp_adapter.call_mcp,
+                        result = await self._call_mcp(
                             "mcp_vector",
                             "search",
                             {"query": query, "top_k": top_k}
@@ -1233,6 +1310,12 @@ Context Diagram:
                     except Exception as e2:
                         print(f"Vector MCP search also failed: {e2}")
                 
+                # Keep the hits as retrieved context for the next turn
+                self._retrieved_context = [
+                    f"{r.get('conversation_name') or 'Previous context'}: {r['content']}"
+                    for r in formatted_results if r.get("content")
+                ]
+                
                 return {
                     "success": True,
                     "message": f"🔍 Found {len(formatted_results)} previous contexts from DB",
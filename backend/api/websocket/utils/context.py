@@ -0,0 +1,237 @@
+"""Token-budgeted context assembly for Gemini chat prompts."""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Rough heuristic: ~4 characters per token for mixed English/Vietnamese text.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimate the number of tokens in a text.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate token count (0 for empty text)
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text so that it fits in roughly ``max_tokens`` tokens.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget for the text
+
+    Returns:
+        The original text, or a truncated copy ending with "..."
+    """
+    if max_tokens <= 0:
+        return ""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 3)] + "..."
+
+
+def collapse_pipeline_payload(content: str, message_id: Optional[int] = None) -> Optional[str]:
+    """Collapse a stored role=3 ``pipeline_result`` JSON message into a compact reference.
+
+    Args:
+        content: Raw message content
+        message_id: Optional DB id of the message, used in the reference
+
+    Returns:
+        Short reference text, or None if the content is not a pipeline payload
+    """
+    if not content or not content.lstrip().startswith("{"):
+        return None
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("type") != "pipeline_result":
+        return None
+
+    collector = data.get("collector") or {}
+    analyzer = data.get("analyzer") or {}
+    requirements = data.get("requirements") or []
+    report = data.get("report") or {}
+
+    stories = collector.get("stories") or []
+    total_issues = (analyzer.get("summary") or {}).get("total_issues") if isinstance(analyzer, dict) else None
+    titles = [
+        r.get("title") for r in requirements[:5]
+        if isinstance(r, dict) and r.get("title")
+    ]
+
+    ref = f"message #{message_id}" if message_id else "stored message"
+    parts = [
+        f"project={data.get('project_id', 'unknown')}",
+        f"stories={len(stories)}",
+        f"requirements={len(requirements)}",
+    ]
+    if total_issues is not None:
+        parts.append(f"issues={total_issues}")
+    if isinstance(report, dict) and report.get("final_report_mermaid"):
+        parts.append("diagram=yes")
+
+    text = f"[Pipeline result ({ref}): {', '.join(parts)}]"
+    if titles:
+        text += "\nKey requirements: " + "; ".join(titles)
+    return text
+
+
+class ContextAssembler:
+    """Builds Gemini chat history that fits in a token budget.
+
+    The budget is filled by priority:
+    1. Conversation summary (capped at ``summary_max_tokens``)
+    2. Recent turns, newest first (at most ``max_turns``)
+    3. Retrieved context snippets (capped at ``retrieved_max_tokens``)
+
+    Token counts for individual messages are cached, so a message that stays
+    in the recent window is only measured once.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 6000,
+        summary_max_tokens: int = 512,
+        retrieved_max_tokens: int = 1024,
+        max_turns: int = 8,
+        cache_size: int = 1024
+    ):
+        """Initialize the assembler.
+
+        Args:
+            max_tokens: Total token budget for the history
+            summary_max_tokens: Maximum tokens spent on the summary
+            retrieved_max_tokens: Maximum tokens spent on retrieved context
+            max_turns: Maximum number of recent messages to include
+            cache_size: Number of per-message token counts to keep
+        """
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.retrieved_max_tokens = retrieved_max_tokens
+        self.max_turns = max_turns
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[Any, int], Tuple[str, int]]" = OrderedDict()
+
+    def _cache_key(self, msg: Dict[str, Any]) -> Tuple[Any, int]:
+        content = msg.get("content") or ""
+        msg_id = msg.get("id")
+        if msg_id is None:
+            msg_id = hashlib.sha1(content.encode("utf-8", "ignore")).hexdigest()
+        return (msg_id, len(content))
+
+    def render_message(self, msg: Dict[str, Any]) -> Tuple[str, int]:
+        """Return the prompt text of a message and its token count (cached).
+
+        Args:
+            msg: Message dict with ``role``, ``content`` and optional ``id``
+
+        Returns:
+            Tuple of (rendered text, token count)
+        """
+        key = self._cache_key(msg)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        content = msg.get("content") or ""
+        if msg.get("role") not in ("user", "assistant"):
+            content = collapse_pipeline_payload(content, msg.get("id")) or content
+
+        entry = (content, estimate_tokens(content))
+        self._cache[key] = entry
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return entry
+
+    def clear_cache(self):
+        """Forget cached per-message token counts."""
+        self._cache.clear()
+
+    def assemble(
+        self,
+        summary: Optional[str],
+        recent_messages: List[Dict[str, Any]],
+        retrieved: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Build chat history in Gemini ``start_chat`` format.
+
+        Args:
+            summary: Conversation summary, if any
+            recent_messages: Recent messages in chronological order
+            retrieved: Optional retrieved context snippets, best first
+
+        Returns:
+            List of ``{"role": ..., "parts": [...]}`` dicts
+        """
+        remaining = self.max_tokens
+
+        summary_text = ""
+        if summary:
+            summary_text = truncate_to_tokens(summary, min(self.summary_max_tokens, remaining))
+            remaining -= estimate_tokens(summary_text)
+
+        # Newest messages first until the budget or turn limit is reached
+        turns: List[Dict[str, Any]] = []
+        for msg in reversed(recent_messages[-self.max_turns:] if self.max_turns else recent_messages):
+            text, tokens = self.render_message(msg)
+            if tokens > remaining:
+                if not turns and remaining > 0:
+                    # Always keep (part of) the newest turn
+                    text = truncate_to_tokens(text, remaining)
+                    tokens = estimate_tokens(text)
+                else:
+                    break
+            turns.append({
+                "role": "user" if msg.get("role") == "user" else "model",
+                "parts": [text]
+            })
+            remaining -= tokens
+        turns.reverse()
+
+        retrieved_text = ""
+        if retrieved:
+            budget = min(self.retrieved_max_tokens, remaining)
+            chunks = []
+            for snippet in retrieved:
+                snippet_tokens = estimate_tokens(snippet)
+                if snippet_tokens > budget:
+                    break
+                chunks.append(snippet)
+                budget -= snippet_tokens
+            retrieved_text = "\n\n".join(chunks)
+
+        history: List[Dict[str, Any]] = []
+        if summary_text:
+            history.append({
+                "role": "user",
+                "parts": [f"[Previous conversation summary]\n{summary_text}"]
+            })
+            history.append({
+                "role": "model",
+                "parts": ["I have the context from our previous conversation."]
+            })
+        if retrieved_text:
+            history.append({
+                "role": "user",
+                "parts": [f"[Related context]\n{retrieved_text}"]
+            })
+            history.append({
+                "role": "model",
+                "parts": ["I will use this related context if relevant."]
+            })
+        history.extend(turns)
+        return history
@@ -1,7 +1,9 @@
 """Message utilities for formatting and parsing WebSocket messages."""
 
+import gzip
 import json
-from typing import Dict, Any, Optional
+import uuid
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 from enum import Enum
 
@@ -47,7 +49,44 @@ class Message:
             "content": self.content,
             "metadata": self.metadata,
             "timestamp": self.timestamp
-        })
+        }, ensure_ascii=False)
+
+    def to_frames(self, chunk_size: int = 0, binary_threshold: int = 0) -> List[Union[str, bytes]]:
+        """Encode message as one or more WebSocket frames.
+        
+        - If ``binary_threshold`` is set and the JSON is larger, a single
+          binary frame with the gzip-compressed JSON is returned.
+        - Else if ``chunk_size`` is set and the content is longer, the content
+          is split into text frames. Each frame carries
+          ``metadata.chunk = {"id", "index", "total"}``; the client joins the
+          ``content`` of all frames with the same id in index order. The
+          original metadata is only on the first chunk.
+        
+        Args:
+            chunk_size: Maximum content characters per text frame (0 = no chunking)
+            binary_threshold: JSON size in bytes above which a binary frame is used (0 = never)
+            
+        Returns:
+            List of text (str) and/or binary (bytes) frames
+        """
+        payload = self.to_json()
+        if binary_threshold:
+            encoded = payload.encode("utf-8")
+            if len(encoded) > binary_threshold:
+                return [gzip.compress(encoded, compresslevel=6)]
+        if not chunk_size or len(self.content) <= chunk_size:
+            return [payload]
+        
+        pieces = [self.content[i:i + chunk_size] for i in range(0, len(self.content), chunk_size)]
+        chunk_id = uuid.uuid4().hex
+        frames: List[Union[str, bytes]] = []
+        for index, piece in enumerate(pieces):
+            metadata = dict(self.metadata) if index == 0 else {}
+            metadata["chunk"] = {"id": chunk_id, "index": index, "total": len(pieces)}
+            chunk = Message(content=piece, message_type=self.message_type, metadata=metadata)
+            chunk.timestamp = self.timestamp
+            frames.append(chunk.to_json())
+        return frames
 
     @classmethod
     def from_json(cls, json_str: str) -> "Message":
@@ -97,16 +136,17 @@ class Message:
         return cls(content=content, message_type=MessageType.ERROR, metadata=metadata)
 
     @classmethod
-    def system(cls, content: str) -> "Message":
+    def system(cls, content: str, metadata: Optional[Dict[str, Any]] = None) -> "Message":
         """Create a system message.
         
         Args:
             content: System message
+            metadata: Optional metadata dict
             
         Returns:
             Message instance
         """
-        return cls(content=content, message_type=MessageType.SYSTEM)
+        return cls(content=content, message_type=MessageType.SYSTEM, metadata=metadata)
 
     @classmethod
     def typing(cls, is_typing: bool = True) -> "Message":
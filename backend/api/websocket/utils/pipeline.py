@@ -0,0 +1,131 @@
+"""Per-session turn pipeline: bounded inbound queue and a sequential worker."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from api.core.query_stats import query_stats
+from api.services.llm_scheduler import LLMBusyError
+from api.services.timings import timings
+from api.websocket.utils.message import Message
+
+logger = logging.getLogger(__name__)
+
+
+class TurnPipeline:
+    """Runs an agent's turns one at a time, in arrival order.
+
+    The pipeline outlives a single socket: when a client reconnects with its
+    resume token, the new connection keeps feeding the same pipeline, and a
+    turn that was running during the disconnect still delivers its reply.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        agent,
+        send: Callable[[Message], Awaitable[None]],
+        queue_size: int = 16,
+        on_busy: Optional[Callable[[bool], None]] = None
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            session_id: Session identifier (for logging)
+            agent: Agent handling the messages
+            send: Coroutine function delivering a message to the session
+            queue_size: Maximum queued client messages
+            on_busy: Optional callback told when a turn starts/ends
+        """
+        self.session_id = session_id
+        self.agent = agent
+        self.send = send
+        self.on_busy = on_busy
+        self.inbound: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.current_turn: Optional[asyncio.Task] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the worker task (call from the event loop)."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def submit(self, message: Message) -> bool:
+        """Queue a client message.
+
+        Returns:
+            False if the queue is full
+        """
+        try:
+            self.inbound.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def cancel_turn(self, clear_queue: bool = False):
+        """Abort the running turn, optionally dropping queued messages."""
+        if clear_queue:
+            while not self.inbound.empty():
+                self.inbound.get_nowait()
+        self.agent.cancel()
+        turn = self.current_turn
+        if turn and not turn.done():
+            turn.cancel()
+
+    def close(self):
+        """Cancel all pending work and stop the worker."""
+        self.cancel_turn(clear_queue=True)
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
+
+    def _set_busy(self, busy: bool):
+        if self.on_busy:
+            self.on_busy(busy)
+
+    async def _process_turn(self, message: Message):
+        # Send typing indicator (optional)
+        await self.send(Message.typing(True))
+
+        # Process message with agent
+        with timings.measure("turn"), query_stats.scope("ws_turn"):
+            response_text = await self.agent.handle_message(message.content)
+
+        # Send response
+        await self.send(Message.text(response_text))
+        logger.info(f"[{self.session_id[:8]}] Sent response: {response_text[:100]}")
+
+    async def _run(self):
+        """Process queued messages one at a time, in arrival order."""
+        while True:
+            message = await self.inbound.get()
+            turn = asyncio.create_task(self._process_turn(message))
+            self.current_turn = turn
+            self._set_busy(True)
+            try:
+                await asyncio.wait({turn})
+            except asyncio.CancelledError:
+                turn.cancel()
+                raise
+            finally:
+                self.current_turn = None
+                self._set_busy(False)
+
+            if turn.cancelled():
+                logger.info(f"[{self.session_id[:8]}] Turn cancelled by client")
+                await self.send(Message.system("Đã hủy yêu cầu.", metadata={"cancelled": True}))
+                continue
+
+            e = turn.exception()
+            if isinstance(e, LLMBusyError):
+                logger.warning(f"[{self.session_id[:8]}] LLM busy: {e}")
+                await self.send(Message.error(
+                    "⏳ Hệ thống đang bận, vui lòng thử lại sau giây lát.",
+                    error_code="LLM_BUSY"
+                ))
+            elif e is not None:
+                logger.error(f"Error processing message for {self.session_id}: {e}", exc_info=e)
+                await self.send(Message.error(
+                    f"Failed to process message: {str(e)}",
+                    error_code="PROCESSING_ERROR"
+                ))
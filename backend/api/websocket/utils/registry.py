@@ -0,0 +1,298 @@
+"""Session registry and pub/sub backends for multi-worker WebSocket servers.
+
+``SessionManager`` keeps the sockets of its own worker; the registry records
+which worker owns each session and carries cross-worker sends and broadcasts.
+
+- ``InMemoryRegistry``: single process (default, no extra setup)
+- ``SQLiteRegistry``: several uvicorn workers on one host, sharing a SQLite
+  file (WAL mode) as session table and polled outbox
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Called with each payload delivered to this worker
+DeliveryHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class SessionRegistry(ABC):
+    """Base registry: session ownership plus worker-to-worker messaging."""
+
+    def __init__(self, worker_id: Optional[str] = None):
+        """Initialize the registry.
+
+        Args:
+            worker_id: Unique ID of this worker (default: pid + random suffix)
+        """
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._handler: Optional[DeliveryHandler] = None
+
+    async def start(self, handler: DeliveryHandler):
+        """Start receiving payloads addressed to this worker."""
+        self._handler = handler
+
+    async def stop(self):
+        """Stop receiving and forget this worker's sessions."""
+        self._handler = None
+
+    @abstractmethod
+    async def add(self, session_id: str, info: Optional[Dict[str, Any]] = None):
+        """Record that this worker owns a session."""
+
+    @abstractmethod
+    async def remove(self, session_id: str):
+        """Forget a session owned by this worker."""
+
+    @abstractmethod
+    async def locate(self, session_id: str) -> Optional[str]:
+        """Return the worker ID owning a session, or None."""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Return the number of sessions across all live workers."""
+
+    @abstractmethod
+    async def publish(self, payload: Dict[str, Any], target_worker: Optional[str] = None):
+        """Send a payload to one worker, or to all other workers when ``target_worker`` is None."""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "worker_id": self.worker_id}
+
+
+class InMemoryRegistry(SessionRegistry):
+    """Registry for a single process; there are no other workers to reach."""
+
+    def __init__(self, worker_id: Optional[str] = None):
+        super().__init__(worker_id)
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+
+    async def add(self, session_id: str, info: Optional[Dict[str, Any]] = None):
+        self._sessions[session_id] = info or {}
+
+    async def remove(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    async def locate(self, session_id: str) -> Optional[str]:
+        return self.worker_id if session_id in self._sessions else None
+
+    async def count(self) -> int:
+        return len(self._sessions)
+
+    async def publish(self, payload: Dict[str, Any], target_worker: Optional[str] = None):
+        # Only deliver to ourselves when explicitly addressed
+        if target_worker == self.worker_id and self._handler:
+            await self._handler(payload)
+
+
+class SQLiteRegistry(SessionRegistry):
+    """Registry shared by worker processes on one host through a SQLite file.
+
+    Sessions live in ``ws_session``; workers refresh a heartbeat row in
+    ``ws_worker`` and poll ``ws_outbox`` for payloads addressed to them or
+    broadcast by others. Sessions of workers whose heartbeat is older than
+    ``worker_ttl`` are ignored and purged.
+    """
+
+    def __init__(
+        self,
+        path: str = "ws_registry.db",
+        worker_id: Optional[str] = None,
+        poll_interval: float = 0.2,
+        worker_ttl: float = 30.0,
+        outbox_ttl: float = 60.0
+    ):
+        """Initialize the registry.
+
+        Args:
+            path: SQLite file shared by all workers
+            worker_id: Unique ID of this worker
+            poll_interval: Seconds between outbox polls
+            worker_ttl: Seconds without heartbeat before a worker is considered dead
+            outbox_ttl: Seconds before delivered outbox rows are deleted
+        """
+        super().__init__(worker_id)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.worker_ttl = worker_ttl
+        self.outbox_ttl = outbox_ttl
+        self._last_id = 0
+        self._poller: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS ws_worker (
+                    worker_id TEXT PRIMARY KEY,
+                    heartbeat_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS ws_session (
+                    session_id TEXT PRIMARY KEY,
+                    worker_id TEXT NOT NULL,
+                    info TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_ws_session_worker ON ws_session (worker_id);
+                CREATE TABLE IF NOT EXISTS ws_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    origin TEXT NOT NULL,
+                    target TEXT,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+            """)
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ws_outbox").fetchone()
+            self._last_id = row[0]
+        finally:
+            conn.close()
+
+    async def start(self, handler: DeliveryHandler):
+        await super().start(handler)
+        await asyncio.to_thread(self._init_schema)
+        await self._heartbeat()
+        self._poller = asyncio.create_task(self._poll_loop())
+        logger.info(f"SQLite session registry started: worker={self.worker_id}, path={self.path}")
+
+    async def stop(self):
+        if self._poller:
+            self._poller.cancel()
+            self._poller = None
+        await asyncio.to_thread(self._execute, "DELETE FROM ws_session WHERE worker_id = ?", (self.worker_id,))
+        await asyncio.to_thread(self._execute, "DELETE FROM ws_worker WHERE worker_id = ?", (self.worker_id,))
+        await super().stop()
+
+    async def _heartbeat(self):
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO ws_worker (worker_id, heartbeat_at) VALUES (?, ?) "
+            "ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+            (self.worker_id, time.time())
+        )
+
+    def _purge(self):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM ws_session WHERE worker_id IN "
+                "(SELECT worker_id FROM ws_worker WHERE heartbeat_at < ?)",
+                (now - self.worker_ttl,)
+            )
+            conn.execute("DELETE FROM ws_worker WHERE heartbeat_at < ?", (now - self.worker_ttl,))
+            conn.execute("DELETE FROM ws_outbox WHERE created_at < ?", (now - self.outbox_ttl,))
+        finally:
+            conn.close()
+
+    def _fetch(self) -> list:
+        return self._execute(
+            "SELECT id, payload FROM ws_outbox WHERE id > ? AND origin != ? "
+            "AND (target IS NULL OR target = ?) ORDER BY id",
+            (self._last_id, self.worker_id, self.worker_id)
+        )
+
+    async def _poll_loop(self):
+        last_heartbeat = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if time.monotonic() - last_heartbeat > self.worker_ttl / 3:
+                    await self._heartbeat()
+                    await asyncio.to_thread(self._purge)
+                    last_heartbeat = time.monotonic()
+
+                for row_id, payload in await asyncio.to_thread(self._fetch):
+                    self._last_id = max(self._last_id, row_id)
+                    if self._handler:
+                        self.delivered += 1
+                        await self._handler(json.loads(payload))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Session registry poll failed: {e}", exc_info=True)
+
+    async def add(self, session_id: str, info: Optional[Dict[str, Any]] = None):
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO ws_session (session_id, worker_id, info, created_at) VALUES (?, ?, ?, ?)",
+            (session_id, self.worker_id, json.dumps(info or {}), time.time())
+        )
+
+    async def remove(self, session_id: str):
+        await asyncio.to_thread(
+            self._execute,
+            "DELETE FROM ws_session WHERE session_id = ? AND worker_id = ?",
+            (session_id, self.worker_id)
+        )
+
+    async def locate(self, session_id: str) -> Optional[str]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT s.worker_id FROM ws_session s JOIN ws_worker w ON w.worker_id = s.worker_id "
+            "WHERE s.session_id = ? AND w.heartbeat_at >= ?",
+            (session_id, time.time() - self.worker_ttl)
+        )
+        return rows[0][0] if rows else None
+
+    async def count(self) -> int:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT COUNT(*) FROM ws_session s JOIN ws_worker w ON w.worker_id = s.worker_id "
+            "WHERE w.heartbeat_at >= ?",
+            (time.time() - self.worker_ttl,)
+        )
+        return rows[0][0]
+
+    async def publish(self, payload: Dict[str, Any], target_worker: Optional[str] = None):
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO ws_outbox (origin, target, payload, created_at) VALUES (?, ?, ?, ?)",
+            (self.worker_id, target_worker, json.dumps(payload, ensure_ascii=False), time.time())
+        )
+        self.published += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats.update({"path": self.path, "published": self.published, "delivered": self.delivered})
+        return stats
+
+
+def create_registry(backend: str = "memory", path: Optional[str] = None) -> SessionRegistry:
+    """Create a session registry by backend name.
+
+    Args:
+        backend: ``memory`` (single worker) or ``sqlite`` (multi-worker, one host)
+        path: SQLite file for the ``sqlite`` backend
+
+    Returns:
+        SessionRegistry instance
+    """
+    backend = (backend or "memory").lower()
+    if backend == "memory":
+        return InMemoryRegistry()
+    if backend == "sqlite":
+        return SQLiteRegistry(path or "ws_registry.db")
+    raise ValueError(f"Unknown session registry backend: {backend}")
@@ -1,12 +1,26 @@
 """Session manager for tracking WebSocket connections and agent instances."""
 
-from typing import Dict, Optional
+from typing import Any, Dict, Optional, Tuple, Union
 from fastapi import WebSocket
+import asyncio
 import logging
+import secrets
+import time
+
+from api.websocket.utils.message import Message
+from api.websocket.utils.registry import InMemoryRegistry, SessionRegistry
 
 logger = logging.getLogger(__name__)
 
 
+# Slow-consumer policies for a full outbound queue
+DROP_OLDEST = "drop_oldest"  # discard the oldest queued message, keep the client
+DISCONNECT = "disconnect"    # close the socket, the client must reconnect
+
+# Queue item: one frame, or all frames of a chunked message
+Outbound = Union[str, bytes, Tuple[Union[str, bytes], ...]]
+
+
 class SessionManager:
     """Manages active WebSocket sessions and their associated agents.
     
@@ -15,26 +29,121 @@ class SessionManager:
     - Unregister closed sessions
     - Broadcast messages to all or specific sessions
     - Retrieve session information
+    
+    Each session owns a bounded outbound queue drained by its own writer task,
+    so a slow client never blocks delivery to other sessions. When a queue is
+    full the slow-consumer policy decides whether to drop the oldest frame or
+    disconnect the client.
+    
+    A janitor task (``start_janitor``) pings quiet clients, closes sessions
+    idle longer than ``idle_timeout`` (half-open connections, forgotten tabs)
+    and, above ``memory_limit`` bytes in total, releases the largest agent
+    caches of idle sessions first.
+    
+    Sockets always live on the worker that accepted them. A ``SessionRegistry``
+    records which worker owns each session, so ``send_to_session`` and
+    ``broadcast`` reach sessions on other workers and ``get_global_count``
+    covers the whole deployment.
+    
+    Every session gets a resume token. When its socket drops, the session is
+    detached rather than removed: the agent, its pipeline and its outbound
+    queue stay alive for ``resume_grace`` seconds, and a reconnect carrying the
+    token reattaches to them and receives the frames queued in the meantime.
     """
 
-    def __init__(self):
-        """Initialize empty session storage."""
+    def __init__(
+        self,
+        outbound_queue_size: int = 64,
+        slow_consumer_policy: str = DROP_OLDEST,
+        idle_timeout: float = 1800,
+        ping_interval: float = 30,
+        memory_limit: int = 0,
+        registry: Optional[SessionRegistry] = None,
+        resume_grace: float = 120,
+        chunk_size: int = 0,
+        binary_threshold: int = 0
+    ):
+        """Initialize empty session storage.
+        
+        Args:
+            outbound_queue_size: Maximum queued outgoing frames per session
+            slow_consumer_policy: ``drop_oldest`` or ``disconnect``
+            idle_timeout: Seconds without client frames before a session is closed (0 = never)
+            ping_interval: Seconds of silence before the server sends a heartbeat ping
+            memory_limit: Total agent cache bytes before idle caches are released (0 = unlimited)
+            registry: Cross-worker session registry (default: in-memory, single worker)
+            resume_grace: Seconds a disconnected session stays resumable (0 = no resume)
+            chunk_size: Content characters per frame for clients that accept chunks (0 = off)
+            binary_threshold: JSON bytes above which clients that accept binary frames
+                get a gzip-compressed binary frame (0 = off)
+        """
+        if slow_consumer_policy not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.outbound_queue_size = outbound_queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.memory_limit = memory_limit
         self.active_sessions: Dict[str, Dict] = {}
+        self.registry = registry or InMemoryRegistry()
+        self.resume_grace = resume_grace
+        self.chunk_size = chunk_size
+        self.binary_threshold = binary_threshold
+        self._tokens: Dict[str, str] = {}  # resume token -> session_id
+        self._registry_tail: Optional[asyncio.Task] = None
+        self._janitor: Optional[asyncio.Task] = None
+        self.idle_evictions = 0
+        self.cache_releases = 0
+        self.released_bytes = 0
+        self.resumes = 0
+        self.expired_detached = 0
 
-    def register(self, session_id: str, websocket: WebSocket, agent):
+    def register(
+        self,
+        session_id: str,
+        websocket: WebSocket,
+        agent,
+        on_close=None,
+        capabilities: Optional[Dict[str, bool]] = None
+    ) -> str:
         """Register a new WebSocket session with its agent.
         
+        Must be called from the event loop; starts the session's writer task.
+        
         Args:
             session_id: Unique session identifier
             websocket: WebSocket connection instance
             agent: Agent instance for this session
+            on_close: Optional callable run when the session is finally removed
+            capabilities: Frame formats the client accepts (``chunked``, ``binary``)
+            
+        Returns:
+            Resume token for reattaching after a disconnect
         """
+        outbound: asyncio.Queue = asyncio.Queue(maxsize=self.outbound_queue_size)
+        resume_token = secrets.token_urlsafe(24)
+        self._tokens[resume_token] = session_id
         self.active_sessions[session_id] = {
             "websocket": websocket,
             "agent": agent,
-            "connected": True
+            "connected": True,
+            "resume_token": resume_token,
+            "detached_at": None,
+            "unsent": None,
+            "on_close": on_close,
+            "capabilities": capabilities or {},
+            "outbound": outbound,
+            "writer": asyncio.create_task(self._writer(session_id, websocket, outbound)),
+            "sent": 0,
+            "bytes_sent": 0,
+            "dropped": 0,
+            "last_activity": time.monotonic(),
+            "last_ping": 0.0,
+            "busy": False
         }
+        self._registry_call(self.registry.add, session_id)
         logger.info(f"Session registered: {session_id}. Total active: {len(self.active_sessions)}")
+        return resume_token
 
     def unregister(self, session_id: str):
         """Unregister a session when connection closes.
@@ -42,10 +151,95 @@ class SessionManager:
         Args:
             session_id: Session identifier to remove
         """
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
+        session = self.active_sessions.pop(session_id, None)
+        if session is not None:
+            writer = session.get("writer")
+            if writer and writer is not asyncio.current_task():
+                writer.cancel()
+            self._tokens.pop(session.get("resume_token"), None)
+            if session.get("on_close"):
+                try:
+                    session["on_close"]()
+                except Exception as e:
+                    logger.error(f"Session close hook failed for {session_id}: {e}")
+            self._registry_call(self.registry.remove, session_id)
             logger.info(f"Session unregistered: {session_id}. Total active: {len(self.active_sessions)}")
 
+    def detach(self, session_id: str, websocket: Optional[WebSocket] = None) -> bool:
+        """Keep a disconnected session resumable for ``resume_grace`` seconds.
+        
+        Args:
+            session_id: Session whose socket closed
+            websocket: The socket that closed; ignored if the session has
+                already been reattached to a newer socket
+            
+        Returns:
+            True if the session is parked, False if it was removed or unknown
+        """
+        session = self.active_sessions.get(session_id)
+        if session is None:
+            return False
+        if websocket is not None and session["websocket"] is not websocket:
+            return False
+        if not self.resume_grace:
+            self.unregister(session_id)
+            return False
+
+        writer = session.get("writer")
+        if writer and writer is not asyncio.current_task():
+            writer.cancel()
+        session["writer"] = None
+        session["connected"] = False
+        session["detached_at"] = time.monotonic()
+        logger.info(f"Session detached: {session_id} (resumable for {self.resume_grace}s)")
+        return True
+
+    def resume(
+        self,
+        resume_token: str,
+        websocket: WebSocket,
+        user_id: Optional[int] = None,
+        capabilities: Optional[Dict[str, bool]] = None
+    ) -> Optional[str]:
+        """Reattach a socket to a detached (or half-open) session.
+        
+        Frames queued while the client was away are delivered first.
+        
+        Args:
+            resume_token: Token returned by ``register``
+            websocket: New WebSocket connection
+            user_id: Optional user ID that must match the session's agent
+            capabilities: Frame formats the new connection accepts
+            
+        Returns:
+            Session ID, or None if the token is unknown or expired
+        """
+        session_id = self._tokens.get(resume_token)
+        session = self.active_sessions.get(session_id) if session_id else None
+        if session is None:
+            return None
+        agent = session.get("agent")
+        if user_id is not None and getattr(agent, "user_id", user_id) != user_id:
+            return None
+
+        if session["connected"]:
+            # Client reconnected before we noticed the old socket was gone
+            old_writer = session.get("writer")
+            if old_writer:
+                old_writer.cancel()
+            asyncio.create_task(self._close(session["websocket"], code=1000))
+
+        session["websocket"] = websocket
+        if capabilities is not None:
+            session["capabilities"] = capabilities
+        session["connected"] = True
+        session["detached_at"] = None
+        session["last_activity"] = time.monotonic()
+        session["writer"] = asyncio.create_task(self._writer(session_id, websocket, session["outbound"]))
+        self.resumes += 1
+        logger.info(f"Session resumed: {session_id} ({session['outbound'].qsize()} queued frames)")
+        return session_id
+
     def get_session(self, session_id: str) -> Optional[Dict]:
         """Get session data by ID.
         
@@ -57,27 +251,136 @@ class SessionManager:
         """
         return self.active_sessions.get(session_id)
 
+    def _registry_call(self, fn, *args):
+        """Run a registry update in the background, in call order."""
+        previous = self._registry_tail
+
+        async def run():
+            if previous is not None:
+                await asyncio.wait({previous})
+            try:
+                await fn(*args)
+            except Exception as e:
+                logger.error(f"Session registry update failed: {e}")
+
+        self._registry_tail = asyncio.create_task(run())
+
+    async def start_registry(self):
+        """Start receiving cross-worker sends and broadcasts."""
+        await self.registry.start(self._deliver)
+
+    async def stop_registry(self):
+        """Stop the registry and drop this worker's sessions from it."""
+        if self._registry_tail is not None:
+            await asyncio.wait({self._registry_tail})
+        await self.registry.stop()
+
+    async def _deliver(self, payload: Dict[str, Any]):
+        """Handle a payload published by another worker."""
+        kind = payload.get("kind")
+        if kind == "broadcast":
+            self._broadcast_local(payload["message"], payload.get("exclude"))
+        elif kind == "send":
+            session = self.get_session(payload["session_id"])
+            if session:
+                self._enqueue(payload["session_id"], session, payload["message"])
+
+    def touch(self, session_id: str):
+        """Record client activity (any received frame) for a session."""
+        session = self.active_sessions.get(session_id)
+        if session is not None:
+            session["last_activity"] = time.monotonic()
+
+    def set_busy(self, session_id: str, busy: bool):
+        """Mark whether a session has a turn in progress (busy sessions are never evicted)."""
+        session = self.active_sessions.get(session_id)
+        if session is not None:
+            session["busy"] = busy
+            session["last_activity"] = time.monotonic()
+
+    async def _writer(self, session_id: str, websocket: WebSocket, outbound: asyncio.Queue):
+        """Drain a session's outbound queue onto its socket."""
+        session = self.active_sessions.get(session_id)
+        if session is not None and session.get("unsent") is not None:
+            # Frame that failed on the previous socket goes first
+            pending, session["unsent"] = session["unsent"], None
+        else:
+            pending = None
+        while True:
+            message = pending if pending is not None else await outbound.get()
+            pending = None
+            # A chunked message is queued as one tuple and sent back to back
+            frames = message if isinstance(message, tuple) else (message,)
+            for frame in frames:
+                try:
+                    if isinstance(frame, bytes):
+                        await websocket.send_bytes(frame)
+                    else:
+                        await websocket.send_text(frame)
+                except Exception as e:
+                    logger.error(f"Failed to send to {session_id}: {e}")
+                    session = self.active_sessions.get(session_id)
+                    if session is not None and session["websocket"] is websocket:
+                        # Resend the whole message: the new socket has no earlier chunks
+                        session["unsent"] = message
+                    self.detach(session_id, websocket)
+                    return
+                session = self.active_sessions.get(session_id)
+                if session is not None:
+                    session["sent"] += 1
+                    session["bytes_sent"] += len(frame)
+
+    def _enqueue(self, session_id: str, session: Dict, message: Outbound) -> bool:
+        """Put a frame on a session's outbound queue, applying the slow-consumer policy.
+
+        A tuple of frames (chunked message) takes one slot, so the policy
+        drops or refuses it whole and never separates its chunks.
+        """
+        outbound: asyncio.Queue = session["outbound"]
+        try:
+            outbound.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        session["dropped"] += 1
+        if self.slow_consumer_policy == DISCONNECT and session["connected"]:
+            logger.warning(f"Outbound queue full for {session_id}, disconnecting slow client")
+            session["connected"] = False
+            asyncio.create_task(self._close(session["websocket"]))
+            self.unregister(session_id)
+            return False
+
+        logger.warning(f"Outbound queue full for {session_id}, dropping oldest frame")
+        outbound.get_nowait()
+        outbound.put_nowait(message)
+        return True
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int = 1013):
+        try:
+            await websocket.close(code=code)  # 1013 = try again later, 1001 = going away
+        except Exception:
+            pass
+
     async def broadcast(self, message: str, exclude_session: Optional[str] = None):
         """Broadcast a message to all active sessions.
         
+        The message is enqueued for every session at once; delivery happens
+        in each session's writer task.
+        
         Args:
             message: Message to broadcast
             exclude_session: Optional session ID to exclude from broadcast
         """
-        disconnected = []
-        for session_id, session_data in self.active_sessions.items():
+        self._broadcast_local(message, exclude_session)
+        await self.registry.publish({"kind": "broadcast", "message": message, "exclude": exclude_session})
+
+    def _broadcast_local(self, message: str, exclude_session: Optional[str] = None):
+        for session_id, session_data in list(self.active_sessions.items()):
             if exclude_session and session_id == exclude_session:
                 continue
-            
-            try:
-                await session_data["websocket"].send_text(message)
-            except Exception as e:
-                logger.error(f"Failed to send to {session_id}: {e}")
-                disconnected.append(session_id)
-        
-        # Clean up disconnected sessions
-        for session_id in disconnected:
-            self.unregister(session_id)
+            self._enqueue(session_id, session_data, message)
 
     async def send_to_session(self, session_id: str, message: str) -> bool:
         """Send a message to a specific session.
@@ -87,19 +390,48 @@ class SessionManager:
             message: Message to send
             
         Returns:
-            True if sent successfully, False otherwise
+            True if queued for delivery (locally or on the owning worker), False otherwise
         """
         session = self.get_session(session_id)
-        if not session:
+        if session:
+            return self._enqueue(session_id, session, message)
+
+        worker_id = await self.registry.locate(session_id)
+        if not worker_id or worker_id == self.registry.worker_id:
             return False
+        await self.registry.publish(
+            {"kind": "send", "session_id": session_id, "message": message},
+            target_worker=worker_id
+        )
+        return True
+
+    async def send_message(self, session_id: str, message: Message) -> bool:
+        """Send a Message, encoded for the client's frame capabilities.
         
-        try:
-            await session["websocket"].send_text(message)
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send to {session_id}: {e}")
-            self.unregister(session_id)
-            return False
+        Large payloads go out as chunked text frames or one compressed binary
+        frame when the client accepts them; otherwise as a single JSON frame.
+        
+        Args:
+            session_id: Target session ID
+            message: Message to send
+            
+        Returns:
+            True if the message was queued for delivery, False otherwise
+        """
+        session = self.get_session(session_id)
+        if not session:
+            return await self.send_to_session(session_id, message.to_json())
+        
+        capabilities = session["capabilities"]
+        frames = message.to_frames(
+            chunk_size=self.chunk_size if capabilities.get("chunked") else 0,
+            binary_threshold=self.binary_threshold if capabilities.get("binary") else 0
+        )
+        if len(frames) == 1:
+            return self._enqueue(session_id, session, frames[0])
+        # One queue item: chunk 0 carries the reassembly metadata and must
+        # never be dropped apart from the rest
+        return self._enqueue(session_id, session, tuple(frames))
 
     def get_active_count(self) -> int:
         """Get count of active sessions.
@@ -108,3 +440,131 @@ class SessionManager:
             Number of active sessions
         """
         return len(self.active_sessions)
+
+    async def get_global_count(self) -> int:
+        """Get count of active sessions across all workers.
+        
+        Returns:
+            Number of active sessions known to the registry
+        """
+        return await self.registry.count()
+
+    def _memory_by_session(self) -> Dict[str, int]:
+        sizes = {}
+        for session_id, session in self.active_sessions.items():
+            agent = session.get("agent")
+            try:
+                sizes[session_id] = agent.estimate_memory() if agent is not None else 0
+            except Exception as e:
+                logger.debug(f"Memory estimate failed for {session_id}: {e}")
+                sizes[session_id] = 0
+        return sizes
+
+    async def sweep(self):
+        """Run one janitor pass: heartbeat pings, idle eviction, memory ceiling."""
+        now = time.monotonic()
+
+        for session_id, session in list(self.active_sessions.items()):
+            if not session["connected"]:
+                if now - session["detached_at"] > self.resume_grace:
+                    logger.info(f"Resume window expired for {session_id}")
+                    self.expired_detached += 1
+                    self.unregister(session_id)
+                continue
+            if session["busy"]:
+                continue
+            idle = now - session["last_activity"]
+            if self.idle_timeout and idle > self.idle_timeout:
+                logger.info(f"Closing idle session {session_id} (idle {idle:.0f}s)")
+                self.idle_evictions += 1
+                self.unregister(session_id)
+                await self._close(session["websocket"], code=1001)
+                continue
+            if self.ping_interval and idle > self.ping_interval and now - session["last_ping"] > self.ping_interval:
+                session["last_ping"] = now
+                self._enqueue(session_id, session, Message.system(
+                    "ping", metadata={"heartbeat": True}
+                ).to_json())
+
+        if not self.memory_limit:
+            return
+        sizes = self._memory_by_session()
+        total = sum(sizes.values())
+        if total <= self.memory_limit:
+            return
+        # Largest idle caches first
+        for session_id in sorted(sizes, key=sizes.get, reverse=True):
+            if total <= self.memory_limit:
+                break
+            session = self.active_sessions.get(session_id)
+            if session is None or session["busy"] or not sizes[session_id]:
+                continue
+            released = session["agent"].release_caches()
+            total -= released
+            self.cache_releases += 1
+            self.released_bytes += released
+            logger.info(f"Released {released} bytes of cache from idle session {session_id}")
+
+    async def _janitor_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}", exc_info=True)
+
+    def start_janitor(self, interval: float = 10):
+        """Start the periodic sweep task (call from the event loop)."""
+        if self._janitor is None or self._janitor.done():
+            self._janitor = asyncio.create_task(self._janitor_loop(interval))
+
+    def stop_janitor(self):
+        """Stop the periodic sweep task."""
+        if self._janitor is not None:
+            self._janitor.cancel()
+            self._janitor = None
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """Get approximate memory held by agents and eviction counters.
+        
+        Returns:
+            Dict with totals, the limit and per-session size/idle time
+        """
+        now = time.monotonic()
+        sizes = self._memory_by_session()
+        return {
+            "total_bytes": sum(sizes.values()),
+            "limit_bytes": self.memory_limit,
+            "idle_timeout": self.idle_timeout,
+            "idle_evictions": self.idle_evictions,
+            "cache_releases": self.cache_releases,
+            "detached_sessions": sum(1 for s in self.active_sessions.values() if not s["connected"]),
+            "resumes": self.resumes,
+            "expired_detached": self.expired_detached,
+            "released_bytes": self.released_bytes,
+            "sessions": {
+                session_id: {
+                    "bytes": sizes.get(session_id, 0),
+                    "idle_seconds": round(now - session["last_activity"], 1),
+                    "busy": session["busy"]
+                }
+                for session_id, session in self.active_sessions.items()
+            }
+        }
+
+    def get_queue_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get outbound queue depth and counters per session.
+        
+        Returns:
+            Mapping of session ID to ``{"depth", "connected", "sent", "bytes_sent", "dropped"}``
+        """
+        return {
+            session_id: {
+                "depth": session["outbound"].qsize(),
+                "connected": session["connected"],
+                "sent": session["sent"],
+                "bytes_sent": session["bytes_sent"],
+                "dropped": session["dropped"]
+            }
+            for session_id, session in self.active_sessions.items()
+        }
@@ -0,0 +1,235 @@
+"""WebSocket load test for /ws/chat with simulated BA clients.
+
+Opens many concurrent WebSocket sessions, replays scripted business-analysis
+conversations (including requirement messages that trigger the MCP pipeline)
+and reports turn latency, throughput and the server-side breakdown from
+GET /ws/stats (DB, MCP and LLM time, scheduler queue, memory).
+
+Run the server with the offline LLM so no Gemini quota is used, e.g.:
+
+    LLM_PROVIDER=stub LLM_STUB_LATENCY_MS=300 uvicorn api.main:app --port 8000
+    python load_test.py --clients 500 --ramp 30
+
+or let the script start it (``--spawn``). PostgreSQL must be reachable
+because every turn is persisted.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import websockets
+except ImportError:
+    print("❌ The 'websockets' package is required: pip install websockets")
+    sys.exit(1)
+
+# Scripted conversations; messages containing user-story patterns make the
+# orchestrator run the collector → analyzer → requirement → reporter chain.
+SCRIPTS: List[List[str]] = [
+    [
+        "Xin chào, tôi cần phân tích yêu cầu cho hệ thống quản lý thư viện",
+        "As a librarian, I want to register new books so that members can borrow them. "
+        "As a member, I want to search books by title so that I can find what I need.",
+        "Use case diagram là gì?",
+        "Tóm tắt lại các requirement chính giúp tôi",
+    ],
+    [
+        "Tôi muốn làm app bán hàng online",
+        "Story: As a customer, I want to add products to a cart so that I can check out later. "
+        "Acceptance criteria: Given a product page, when I click add, then the cart count increases.",
+        "Có vấn đề gì với các user story trên không?",
+    ],
+    [
+        "Hello, what can you help me with?",
+        "The system shall allow users to reset their password via email. "
+        "The user can change the notification settings.",
+        "Generate the report again please",
+        "/history",
+    ],
+]
+
+REPLY_TYPES = ("text", "error")
+
+
+class ClientResult:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.connect_failed = False
+        self.messages_sent = 0
+        self.frames_received = 0
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def run_client(
+    index: int,
+    url: str,
+    turns: int,
+    think_time: float,
+    reply_timeout: float,
+    rng: random.Random
+) -> ClientResult:
+    """Simulate one user: connect, replay a script, measure each turn."""
+    result = ClientResult()
+    script = SCRIPTS[index % len(SCRIPTS)]
+    try:
+        async with websockets.connect(f"{url}?user_id=1&agent_id=1", max_size=None) as ws:
+            # Welcome message
+            await asyncio.wait_for(ws.recv(), timeout=reply_timeout)
+            for turn in range(turns):
+                content = script[turn % len(script)]
+                started = time.perf_counter()
+                await ws.send(json.dumps({"type": "text", "content": content}))
+                result.messages_sent += 1
+                # Wait for the reply, skipping typing / heartbeat / system frames
+                while True:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=reply_timeout)
+                    result.frames_received += 1
+                    frame = json.loads(raw) if isinstance(raw, str) else {}
+                    if frame.get("metadata", {}).get("heartbeat"):
+                        await ws.send(json.dumps({"type": "command", "content": "pong"}))
+                        continue
+                    if frame.get("type") in REPLY_TYPES:
+                        break
+                result.latencies.append(time.perf_counter() - started)
+                if frame.get("type") == "error":
+                    code = frame.get("metadata", {}).get("error_code") or "ERROR"
+                    result.errors[code] = result.errors.get(code, 0) + 1
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * think_time)
+    except asyncio.TimeoutError:
+        result.errors["TIMEOUT"] = result.errors.get("TIMEOUT", 0) + 1
+    except Exception as e:
+        if not result.messages_sent:
+            result.connect_failed = True
+        key = type(e).__name__
+        result.errors[key] = result.errors.get(key, 0) + 1
+    return result
+
+
+def fetch_stats(http_url: str) -> Optional[dict]:
+    try:
+        with urllib.request.urlopen(f"{http_url}/ws/stats", timeout=10) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except Exception as e:
+        print(f"⚠️  Could not fetch /ws/stats: {e}")
+        return None
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """Start uvicorn with the stub LLM provider."""
+    env = dict(os.environ)
+    env.setdefault("LLM_PROVIDER", "stub")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=str(Path(__file__).parent),
+        env=env
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return proc
+        except Exception:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("Server did not start within 30s")
+
+
+def print_report(results: List[ClientResult], elapsed: float, stats: Optional[dict]):
+    latencies = [l for r in results for l in r.latencies]
+    sent = sum(r.messages_sent for r in results)
+    frames = sum(r.frames_received for r in results)
+    errors: Dict[str, int] = {}
+    for r in results:
+        for k, v in r.errors.items():
+            errors[k] = errors.get(k, 0) + v
+
+    print(f"\n{'='*60}")
+    print(f"📊 Clients: {len(results)} (connect failures: {sum(r.connect_failed for r in results)})")
+    print(f"   Duration: {elapsed:.1f}s")
+    print(f"   Turns completed: {len(latencies)} / sent: {sent}")
+    print(f"   Throughput: {sent / elapsed:.1f} msg/s sent, {frames / elapsed:.1f} frames/s received")
+    if latencies:
+        print(f"\n⏱️  Turn latency (client-side):")
+        print(f"   p50: {percentile(latencies, 0.50) * 1000:.0f} ms")
+        print(f"   p95: {percentile(latencies, 0.95) * 1000:.0f} ms")
+        print(f"   p99: {percentile(latencies, 0.99) * 1000:.0f} ms")
+        print(f"   mean: {statistics.mean(latencies) * 1000:.0f} ms, max: {max(latencies) * 1000:.0f} ms")
+    if errors:
+        print(f"\n❌ Errors: {errors}")
+
+    if stats:
+        print(f"\n🖥️  Server breakdown (GET /ws/stats):")
+        for name, t in sorted(stats.get("timings", {}).items()):
+            print(f"   {name:>5}: n={t['count']:<6} total={t['total_ms'] / 1000:.1f}s "
+                  f"p50={t['p50_ms']}ms p95={t['p95_ms']}ms p99={t['p99_ms']}ms")
+        llm = stats.get("llm", {})
+        if llm:
+            print(f"   LLM queue wait: {llm.get('queue_wait_ms')} rejected={llm.get('rejected')}")
+        process = stats.get("process", {})
+        if process:
+            print(f"   Memory: rss={process.get('rss_bytes', 0) / 1e6:.1f} MB "
+                  f"peak={process.get('peak_rss_bytes', 0) / 1e6:.1f} MB")
+        memory = stats.get("memory", {})
+        if memory:
+            print(f"   Agent caches: {memory.get('total_bytes', 0) / 1e6:.1f} MB")
+    print(f"{'='*60}\n")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the /ws/chat WebSocket endpoint")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws/chat", help="WebSocket URL")
+    parser.add_argument("--clients", type=int, default=100, help="Concurrent simulated clients")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds to open all connections")
+    parser.add_argument("--turns", type=int, default=4, help="Messages sent per client")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean pause between messages (s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Max wait for one reply (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="Start uvicorn with LLM_PROVIDER=stub")
+    args = parser.parse_args()
+
+    http_url = args.url.replace("ws://", "http://").replace("wss://", "https://").rsplit("/ws/", 1)[0]
+    server = None
+    if args.spawn:
+        port = int(http_url.rsplit(":", 1)[1]) if http_url.count(":") > 1 else 8000
+        print(f"🚀 Starting server on port {port} (LLM_PROVIDER=stub)...")
+        server = spawn_server(port)
+
+    try:
+        rng = random.Random(args.seed)
+        print(f"🔌 Opening {args.clients} clients over {args.ramp}s against {args.url}")
+        started = time.perf_counter()
+        tasks = []
+        for i in range(args.clients):
+            tasks.append(asyncio.create_task(run_client(
+                i, args.url, args.turns, args.think_time, args.timeout, random.Random(rng.random())
+            )))
+            if args.ramp and args.clients > 1:
+                await asyncio.sleep(args.ramp / args.clients)
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        print_report(results, elapsed, fetch_stats(http_url))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -18,5 +18,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        ws_per_message_deflate=True  # compress WebSocket frames (large reports/diagrams)
     )
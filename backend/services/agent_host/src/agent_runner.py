@@ -2,19 +2,23 @@
 import os
 import time
 import json
+import sys
+from pathlib import Path
 from mcp_process import MCPProcess
-import google.generativeai as genai
 from dotenv import load_dotenv
 from prompt_store import PromptStore
 
 # load .env file if present
 load_dotenv()
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # backend/ for services.common
+from services.common.llm_provider import get_provider
+
 GENAI_API_KEY = os.getenv("GENAI_API_KEY")
 MODEL = os.getenv("LLM_MODEL","gemini-1.5-pro")
+llm = get_provider()
 
 if GENAI_API_KEY:
-    genai.configure(api_key=GENAI_API_KEY)
 
     # optional: render and print a prompt demo if PROMPT_DEMO=1
     try:
@@ -24,18 +28,14 @@ if GENAI_API_KEY:
             print('--- PROMPT DEMO ---')
             print(demo)
             print('--- END PROMPT DEMO ---')
-            return
+            sys.exit(0)
     except Exception as _:
         pass
 
 
 def call_gemini(prompt: str, schema: dict = None) -> str:
     # simple text generation; you can extend to structured outputs
-    model = genai.Predictions() if hasattr(genai, 'Predictions') else genai
-    resp = genai.generate_content(model=MODEL, prompt=prompt)
-    # adapt to real sdk response shape
-    text = getattr(resp, 'text', None) or (resp.get('candidates')[0].get('content') if isinstance(resp, dict) else str(resp))
-    return text
+    return llm.generate(prompt).text
 
 
 def main():
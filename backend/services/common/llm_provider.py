@@ -0,0 +1,379 @@
+# Pluggable LLM provider layer shared by the API (ChatAgent) and the MCP servers.
+#
+# Select the provider with LLM_PROVIDER:
+#   gemini (default) - Google Gemini through google-generativeai
+#   stub             - offline deterministic provider for load testing (no network)
+#
+# Stub tuning (env):
+#   LLM_STUB_LATENCY_MS   mean injected latency per call (default 200)
+#   LLM_STUB_JITTER_MS    uniform +/- jitter around the mean (default 50)
+#   LLM_STUB_SEED         seed for the jitter RNG (default 0)
+#   LLM_STUB_EMBED_DIM    embedding size (default 768, same as text-embedding-004)
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+@dataclass
+class FunctionCall:
+    name: str
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class LLMResponse:
+    text: str = ""
+    function_calls: List[FunctionCall] = field(default_factory=list)
+    raw: Any = None
+
+
+class ChatSession(ABC):
+    """Multi-turn chat with optional function calling."""
+
+    @abstractmethod
+    def send_message(self, message: str) -> LLMResponse:
+        ...
+
+    @abstractmethod
+    def send_function_responses(self, responses: List[Dict[str, Any]]) -> LLMResponse:
+        """Send tool results back. Each item is {"name": str, "response": dict}."""
+
+
+class LLMProvider(ABC):
+    """Provider interface: generate, stream, embed and function-calling chats.
+
+    Tool declarations are provider-neutral dicts:
+        {"name": ..., "description": ..., "parameters": {"type": "object", "properties": {...}, "required": [...]}}
+    History uses the Gemini chat shape: [{"role": "user" | "model", "parts": [text]}].
+    All methods are blocking; async callers wrap them with asyncio.to_thread.
+    """
+
+    name = "base"
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def generate(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> LLMResponse:
+        ...
+
+    def stream(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        # Default: a single chunk
+        yield self.generate(prompt, system_instruction, generation_config).text
+
+    @abstractmethod
+    def embed(self, text: str, task_type: str = "retrieval_document") -> List[float]:
+        ...
+
+    @abstractmethod
+    def start_chat(
+        self,
+        system_instruction: Optional[str] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        history: Optional[List[Dict[str, Any]]] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> ChatSession:
+        ...
+
+
+# ----------------- Gemini -----------------
+
+class GeminiChatSession(ChatSession):
+    def __init__(self, provider: "GeminiProvider", chat):
+        self.provider = provider
+        self.chat = chat
+
+    def send_message(self, message: str) -> LLMResponse:
+        return self.provider._to_response(self.chat.send_message(message))
+
+    def send_function_responses(self, responses: List[Dict[str, Any]]) -> LLMResponse:
+        genai = self.provider.genai
+        parts = [
+            genai.protos.Part(
+                function_response=genai.protos.FunctionResponse(
+                    name=r["name"],
+                    response=r["response"]
+                )
+            )
+            for r in responses
+        ]
+        return self.provider._to_response(self.chat.send_message(genai.protos.Content(parts=parts)))
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, embed_model: Optional[str] = None):
+        self.api_key = api_key or os.getenv("GENAI_API_KEY")
+        self.model = model or os.getenv("LLM_MODEL", "gemini-1.5-pro")
+        self.embed_model = embed_model or os.getenv("EMBED_MODEL") or "models/text-embedding-004"
+        if not self.embed_model.startswith("models/"):
+            self.embed_model = f"models/{self.embed_model}"
+        try:
+            import google.generativeai as genai
+            if self.api_key:
+                genai.configure(api_key=self.api_key)
+        except Exception:
+            genai = None
+        self.genai = genai
+
+    @property
+    def available(self) -> bool:
+        return bool(self.genai and self.api_key)
+
+    def _schema(self, spec: Dict[str, Any]):
+        protos = self.genai.protos
+        kwargs: Dict[str, Any] = {"type": getattr(protos.Type, str(spec.get("type", "object")).upper())}
+        if spec.get("description"):
+            kwargs["description"] = spec["description"]
+        if "properties" in spec:
+            kwargs["properties"] = {k: self._schema(v) for k, v in spec["properties"].items()}
+        if spec.get("items"):
+            kwargs["items"] = self._schema(spec["items"])
+        if spec.get("required"):
+            kwargs["required"] = list(spec["required"])
+        return protos.Schema(**kwargs)
+
+    def _tools(self, tools: Optional[List[Dict[str, Any]]]):
+        if not tools:
+            return None
+        declarations = [
+            self.genai.protos.FunctionDeclaration(
+                name=t["name"],
+                description=t.get("description", ""),
+                parameters=self._schema(t.get("parameters") or {"type": "object", "properties": {}})
+            )
+            for t in tools
+        ]
+        return [self.genai.protos.Tool(function_declarations=declarations)]
+
+    def _model(self, system_instruction=None, tools=None, generation_config=None):
+        kwargs: Dict[str, Any] = {}
+        if system_instruction:
+            kwargs["system_instruction"] = system_instruction
+        if tools:
+            kwargs["tools"] = self._tools(tools)
+        if generation_config:
+            kwargs["generation_config"] = generation_config
+        return self.genai.GenerativeModel(self.model, **kwargs)
+
+    def _to_response(self, resp) -> LLMResponse:
+        calls: List[FunctionCall] = []
+        texts: List[str] = []
+        candidates = getattr(resp, "candidates", None) or []
+        if candidates and candidates[0].content and candidates[0].content.parts:
+            for part in candidates[0].content.parts:
+                fc = getattr(part, "function_call", None)
+                if fc and fc.name:
+                    calls.append(FunctionCall(name=fc.name, args=dict(fc.args)))
+                elif getattr(part, "text", None):
+                    texts.append(part.text)
+        return LLMResponse(text="".join(texts), function_calls=calls, raw=resp)
+
+    def generate(self, prompt, system_instruction=None, generation_config=None) -> LLMResponse:
+        model = self._model(system_instruction, generation_config=generation_config)
+        return self._to_response(model.generate_content(prompt))
+
+    def stream(self, prompt, system_instruction=None, generation_config=None) -> Iterator[str]:
+        model = self._model(system_instruction, generation_config=generation_config)
+        for chunk in model.generate_content(prompt, stream=True):
+            text = getattr(chunk, "text", None)
+            if text:
+                yield text
+
+    def embed(self, text: str, task_type: str = "retrieval_document") -> List[float]:
+        result = self.genai.embed_content(model=self.embed_model, content=text, task_type=task_type)
+        return list(result["embedding"])
+
+    def start_chat(self, system_instruction=None, tools=None, history=None, generation_config=None) -> ChatSession:
+        model = self._model(system_instruction, tools, generation_config)
+        return GeminiChatSession(self, model.start_chat(history=history or []))
+
+
+# ----------------- Offline stub -----------------
+
+_REQUIREMENT_MARKERS = (
+    "story:", "as a ", "as an ", "the system shall", "the system must",
+    "requirement", "use case", "actor:", "given ", "acceptance criteria",
+)
+
+# Tool chain replayed by the stub when the user sends requirements.
+# Each step builds the call args from the user message and the previous tool result.
+STUB_TOOL_CHAIN: List[tuple] = [
+    ("ingest_raw_requirements", lambda msg, prev: {"items": [msg]}),
+    ("analyze_stories", lambda msg, prev: {"stories": prev.get("stories", [])}),
+    ("identify_requirements", lambda msg, prev: {"stories": prev.get("stories", [])}),
+    ("prioritize_requirements", lambda msg, prev: {"requirements": prev.get("requirements", [])}),
+    ("generate_context_diagram", lambda msg, prev: {"requirements": prev.get("requirements", [])}),
+]
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", (text or "").lower())
+
+
+class StubChatSession(ChatSession):
+    def __init__(self, provider: "StubProvider", tools: Optional[List[Dict[str, Any]]], history: Optional[List[Dict[str, Any]]]):
+        self.provider = provider
+        self.tool_names = {t["name"] for t in (tools or [])}
+        self.history = list(history or [])
+        self._message = ""
+        self._step = 0
+
+    def _next_call(self, prev: Dict[str, Any]) -> Optional[FunctionCall]:
+        while self._step < len(STUB_TOOL_CHAIN):
+            name, build_args = STUB_TOOL_CHAIN[self._step]
+            self._step += 1
+            if name in self.tool_names:
+                return FunctionCall(name=name, args=build_args(self._message, prev))
+        return None
+
+    def send_message(self, message: str) -> LLMResponse:
+        self.provider._sleep()
+        self._message = message
+        self._step = 0
+        self.history.append({"role": "user", "parts": [message]})
+        lowered = message.lower()
+        if self.tool_names and any(m in lowered for m in _REQUIREMENT_MARKERS):
+            call = self._next_call({})
+            if call:
+                return LLMResponse(function_calls=[call])
+        return self._reply(message)
+
+    def send_function_responses(self, responses: List[Dict[str, Any]]) -> LLMResponse:
+        self.provider._sleep()
+        prev = responses[-1].get("response", {}) if responses else {}
+        if isinstance(prev, dict) and not prev.get("error"):
+            call = self._next_call(prev)
+            if call:
+                return LLMResponse(function_calls=[call])
+        summary = ", ".join(r.get("name", "?") for r in responses)
+        return self._reply(f"{self._message}\n[tools: {summary}]")
+
+    def _reply(self, prompt: str) -> LLMResponse:
+        text = self.provider._canned_text(prompt)
+        self.history.append({"role": "model", "parts": [text]})
+        return LLMResponse(text=text)
+
+
+class StubProvider(LLMProvider):
+    """Deterministic offline provider with injected latency.
+
+    Text replies are derived from a hash of the prompt, embeddings are
+    hashed bag-of-words vectors (texts sharing words are similar), and chats
+    with tools replay STUB_TOOL_CHAIN when the message looks like requirements.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        jitter_ms: Optional[float] = None,
+        seed: Optional[int] = None,
+        embed_dim: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.latency_ms = float(latency_ms if latency_ms is not None else os.getenv("LLM_STUB_LATENCY_MS", 200))
+        self.jitter_ms = float(jitter_ms if jitter_ms is not None else os.getenv("LLM_STUB_JITTER_MS", 50))
+        self.embed_dim = int(embed_dim if embed_dim is not None else os.getenv("LLM_STUB_EMBED_DIM", 768))
+        self._rng = random.Random(int(seed if seed is not None else os.getenv("LLM_STUB_SEED", 0)))
+        self._rng_lock = threading.Lock()
+        self._sleep_fn = sleep
+
+    def _sleep(self, scale: float = 1.0):
+        with self._rng_lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        delay = max(0.0, (self.latency_ms + jitter) * scale) / 1000.0
+        if delay:
+            self._sleep_fn(delay)
+
+    def _canned_text(self, prompt: str) -> str:
+        digest = hashlib.sha256((prompt or "").encode("utf-8")).hexdigest()[:12]
+        words = _tokenize(prompt)
+        return (
+            f"[stub:{digest}] Đã nhận yêu cầu ({len(words)} từ). "
+            f"Đây là phản hồi mô phỏng cho mục đích kiểm thử tải."
+        )
+
+    def generate(self, prompt, system_instruction=None, generation_config=None) -> LLMResponse:
+        self._sleep()
+        return LLMResponse(text=self._canned_text(prompt))
+
+    def stream(self, prompt, system_instruction=None, generation_config=None) -> Iterator[str]:
+        text = self._canned_text(prompt)
+        chunks = text.split(" ")
+        for i, word in enumerate(chunks):
+            self._sleep(1.0 / max(1, len(chunks)))
+            yield word if i == len(chunks) - 1 else word + " "
+
+    def embed(self, text: str, task_type: str = "retrieval_document") -> List[float]:
+        self._sleep(0.25)
+        vec = [0.0] * self.embed_dim
+        for tok in _tokenize(text):
+            h = int.from_bytes(hashlib.md5(tok.encode("utf-8")).digest()[:8], "big")
+            vec[h % self.embed_dim] += 1.0 if (h >> 63) else -1.0
+        norm = math.sqrt(sum(v * v for v in vec))
+        if not norm:
+            vec[0] = 1.0
+            return vec
+        return [v / norm for v in vec]
+
+    def start_chat(self, system_instruction=None, tools=None, history=None, generation_config=None) -> ChatSession:
+        return StubChatSession(self, tools, history)
+
+
+# ----------------- Factory -----------------
+
+PROVIDERS: Dict[str, Callable[..., LLMProvider]] = {
+    "gemini": GeminiProvider,
+    "stub": StubProvider,
+}
+
+_instances: Dict[str, LLMProvider] = {}
+_instances_lock = threading.Lock()
+
+
+def get_provider(name: Optional[str] = None, **kwargs) -> LLMProvider:
+    """Return the (cached) provider named by `name` or the LLM_PROVIDER env var."""
+    name = (name or os.getenv("LLM_PROVIDER") or "gemini").lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {name}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = PROVIDERS[name](**kwargs)
+        return _instances[name]
+
+
+def parse_json_reply(text: str) -> Optional[Any]:
+    """Best-effort JSON parse of an LLM reply (tolerates ```json fences)."""
+    if not text:
+        return None
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`")
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:]
+    try:
+        return json.loads(cleaned)
+    except (json.JSONDecodeError, ValueError):
+        return None
@@ -16,19 +16,18 @@ try:
 except ImportError:
     pass
 
-# Optional LLM integration (uses google-generativeai if configured)
-USE_GENAI = bool(os.getenv("GENAI_API_KEY"))
+# Optional LLM integration (provider selected by LLM_PROVIDER, Gemini by default)
+from pathlib import Path
 
-# Safely import Google Generative AI if configured
-genai = None
-if USE_GENAI:
-    try:
-        import google.generativeai as genai
-        genai.configure(api_key=os.getenv("GENAI_API_KEY"))
-    except ImportError:
-        print("Warning: GENAI_API_KEY set but google-generativeai not installed", file=sys.stderr)
-    except Exception as e:
-        print(f"Warning: Failed to configure google-generativeai: {e}", file=sys.stderr)
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # backend/ for services.common
+llm = None
+try:
+    from services.common.llm_provider import get_provider, parse_json_reply
+    llm = get_provider()
+    if not llm.available:
+        llm = None
+except Exception as e:
+    print(f"Warning: Failed to configure LLM provider: {e}", file=sys.stderr)
 
 
 def detect_ambiguous_terms(text: str) -> List[Dict[str, Any]]:
@@ -122,7 +121,7 @@ def detect_unverifiable_requirements(text: str) -> List[Dict[str, Any]]:
 
 
 def suggest_improvements_via_llm(stories: List[Dict[str, Any]], top_k: int = 3) -> List[Dict[str, Any]]:
-    if not genai:
+    if not llm:
         return []
     try:
         # Prefer using centralized prompts if available by reading the prompts YAML directly
@@ -175,18 +174,12 @@ Stories to analyze:
             prompt_text += f"- Title: {s.get('title','')}. Description: {s.get('description','')}. Acceptance: {s.get('acceptance_criteria','')}.\n"
 
     try:
-        response = genai.chat.create(model=os.getenv("LLM_MODEL", "chat-bison-001"),
-                                     messages=[{"role": "user", "content": prompt_text}],
-                                     max_output_tokens=1024)
-        content = response.last["candidates"][0]["content"]
+        response = llm.generate(prompt_text, generation_config={"max_output_tokens": 1024})
+        content = response.text
         # Try to parse as JSON first
-        try:
-            import json
-            parsed = json.loads(content)
-            if isinstance(parsed, dict) and "story_analyses" in parsed:
-                return parsed["story_analyses"]
-        except:
-            pass
+        parsed = parse_json_reply(content)
+        if isinstance(parsed, dict) and "story_analyses" in parsed:
+            return parsed["story_analyses"]
         # Fallback to raw text if not JSON
         return [{"type": "llm_suggestions", "content": content}]
     except Exception as e:
@@ -235,7 +228,7 @@ def analyze_stories(stories: List[Dict[str, Any]], options: Optional[Dict] = Non
         issues.extend(unverifiable)
     
     # Get LLM suggestions if enabled
-    if options.get("use_llm") and genai:
+    if options.get("use_llm") and llm:
         suggestions = suggest_improvements_via_llm(stories)
     else:
         suggestions = []
@@ -2,6 +2,14 @@
 import sys
 import json
 import traceback
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # backend/ for services.common
+try:
+    from services.common.llm_provider import get_provider, parse_json_reply
+    llm = get_provider()
+except Exception:
+    llm = None
 
 
 def send(obj):
@@ -31,19 +39,13 @@ def handle(msg):
                         # for single item scenario, render content
                         content = items[0] if items else ""
                         prompt_text = tpl.render(doc_id=params.get('doc_id','doc'), project_id=params.get('project_id','project'), version=params.get('version','1'), source_type=params.get('source_type','upload'), filename=params.get('filename',None), uploaded_by=params.get('uploaded_by','unknown'), timestamp=params.get('timestamp',''), content=content)
-                if prompt_text and 'GENAI_API_KEY' in __import__('os').environ:
+                if prompt_text and llm and llm.available:
                     try:
-                        import google.generativeai as genai
-                        genai.configure(api_key=__import__('os').environ.get('GENAI_API_KEY'))
-                        resp = genai.chat.create(model=__import__('os').environ.get('LLM_MODEL','chat-bison-001'), messages=[{"role":"user","content":prompt_text}], max_output_tokens=1024)
-                        llm_out = resp.last['candidates'][0]['content']
-                        # try parse JSON from LLM
-                        try:
-                            parsed = json.loads(llm_out)
+                        resp = llm.generate(prompt_text, generation_config={"max_output_tokens": 1024})
+                        # try parse JSON from LLM, otherwise fallthrough to basic chunking
+                        parsed = parse_json_reply(resp.text)
+                        if isinstance(parsed, dict):
                             return {"ok": True, **parsed}
-                        except Exception:
-                            # fallthrough to basic chunking
-                            pass
                     except Exception:
                         pass
 
@@ -2,6 +2,14 @@
 import sys
 import json
 import traceback
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # backend/ for services.common
+try:
+    from services.common.llm_provider import get_provider, parse_json_reply
+    llm = get_provider()
+except Exception:
+    llm = None
 
 
 def send(obj):
@@ -115,12 +123,10 @@ def handle(msg):
             except Exception:
                 prompt_text = None
 
-            if prompt_text and 'GENAI_API_KEY' in __import__('os').environ:
+            if prompt_text and llm and llm.available:
                 try:
-                    import google.generativeai as genai
-                    genai.configure(api_key=__import__('os').environ.get('GENAI_API_KEY'))
-                    resp = genai.chat.create(model=__import__('os').environ.get('LLM_MODEL', 'chat-bison-001'), messages=[{"role": "user", "content": prompt_text}], max_output_tokens=1024)
-                    content = resp.last['candidates'][0]['content']
+                    resp = llm.generate(prompt_text, generation_config={"max_output_tokens": 1024})
+                    content = resp.text
                     # best-effort: return LLM content as single artifact
                     return {"ok": True, "report": {"llm_content": content}}
                 except Exception:
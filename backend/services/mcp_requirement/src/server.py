@@ -2,6 +2,14 @@
 import sys
 import json
 import traceback
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # backend/ for services.common
+try:
+    from services.common.llm_provider import get_provider, parse_json_reply
+    llm = get_provider()
+except Exception:
+    llm = None
 
 
 def send(obj):
@@ -38,7 +46,7 @@ def handle(msg):
                     reqs.append({"id": f"R{i}", "title": title, "description": description})
 
             # Optionally call LLM with requirement synthesis prompt
-            if use_llm and 'GENAI_API_KEY' in __import__('os').environ:
+            if use_llm and llm and llm.available:
                 try:
                     from pathlib import Path
                     import yaml
@@ -51,15 +59,10 @@ def handle(msg):
                             tpl = Template(node.get("template",""))
                             prompt_text = tpl.render(project_id=params.get('project_id','project'), normalized_requirements=reqs, analyzer_output=params.get('analyzer_output', {}), stakeholders=params.get('stakeholders', []))
                             try:
-                                import google.generativeai as genai
-                                genai.configure(api_key=__import__('os').environ.get('GENAI_API_KEY'))
-                                resp = genai.chat.create(model=__import__('os').environ.get('LLM_MODEL', 'chat-bison-001'), messages=[{"role":"user","content":prompt_text}], max_output_tokens=1024)
-                                llm_out = resp.last['candidates'][0]['content']
-                                try:
-                                    parsed = json.loads(llm_out)
+                                resp = llm.generate(prompt_text, generation_config={"max_output_tokens": 1024})
+                                parsed = parse_json_reply(resp.text)
+                                if isinstance(parsed, dict):
                                     return {"ok": True, **parsed}
-                                except Exception:
-                                    pass
                             except Exception:
                                 pass
                 except Exception:
@@ -4,17 +4,14 @@ import json
 import traceback
 import os
 
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # backend/ for services.common
 try:
-    import google.generativeai as genai
+    from services.common.llm_provider import get_provider
+    llm = get_provider()
 except Exception:
-    genai = None
-
-GENAI_API_KEY = os.getenv("GENAI_API_KEY")
-if GENAI_API_KEY and genai:
-    try:
-        genai.configure(api_key=GENAI_API_KEY)
-    except Exception:
-        pass
+    llm = None
 
 
 def send(obj):
@@ -51,13 +48,12 @@ def _simple_report_check(report, requirements):
 
 def _llm_validate(text, instruction):
     # optional LLM-based validation using Gemini if available
-    if genai is None:
+    if llm is None or not llm.available:
         return {"ok": False, "note": "LLM not available"}
     try:
         prompt = f"{instruction}\n\nContent:\n{text}"
-        resp = genai.generate_content(model=os.getenv('LLM_MODEL','gemini-1.5-pro'), prompt=prompt)
-        text_out = getattr(resp, 'text', None) or (resp.get('candidates')[0].get('content') if isinstance(resp, dict) else str(resp))
-        return {"ok": True, "result": text_out}
+        resp = llm.generate(prompt)
+        return {"ok": True, "result": resp.text}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
@@ -9,8 +9,16 @@ load_dotenv()
 # URL kết nối
 DATABASE_URL = os.getenv('DB_URL')
 
-# Tạo engine
-engine = create_engine(DATABASE_URL, echo=True)  # echo=True để in SQL ra console
+# Tạo engine (pool cấu hình qua biến môi trường; DB_ECHO=true để in SQL ra console)
+engine = create_engine(
+    DATABASE_URL,
+    echo=os.getenv('DB_ECHO', 'false').lower() == 'true',
+    pool_size=int(os.getenv('DB_POOL_SIZE', '5')),
+    max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '5')),
+    pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+    pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    pool_pre_ping=True,
+)
 
 # Base class cho ORM models
 Base = declarative_base()
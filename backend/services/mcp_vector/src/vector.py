@@ -12,13 +12,15 @@ try:
 except Exception:
 	chromadb = None
 
-import google.generativeai as genai
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # backend/ for services.common
+from services.common.llm_provider import get_provider
 
-GENAI_API_KEY = os.getenv("GENAI_API_KEY")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-004")
 
-if GENAI_API_KEY:
-	genai.configure(api_key=GENAI_API_KEY)
+llm = get_provider()
 
 
 class VectorStore:
@@ -30,11 +32,8 @@ class VectorStore:
 		self.collection = self.client.get_or_create_collection("requirements")
 
 	def embed(self, texts: List[str]) -> List[List[float]]:
-		# Use Gemini embedding API via google.generativeai
-		resp = genai.embeddings.create(model=EMBED_MODEL, input=texts)
-		# response shape varies; adapt accordingly
-		embeddings = [item.embedding for item in resp.data]
-		return embeddings
+		# Use the configured provider (Gemini embeddings, or the offline stub)
+		return [llm.embed(t) for t in texts]
 
 	def upsert(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
 		embs = self.embed(texts)
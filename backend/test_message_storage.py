@@ -0,0 +1,106 @@
+"""Out-of-line message storage and the chat context built from it.
+
+Large contents are compressed into ``message_body`` and ``message.content``
+keeps a preview (migration c5f8a2d17b36). The chat agent must read them
+back in full, otherwise a role=3 ``pipeline_result`` no longer parses and
+goes into the LLM history as truncated JSON instead of a compact reference.
+
+No database needed: a minimal session stand-in records what would be written.
+
+    python test_message_storage.py
+"""
+
+import asyncio
+import json
+
+from api.core.config import settings
+from api.core.message_storage import decompress, load_contents, set_content, split_content
+from api.core.models import Message, MessageBody
+from api.websocket.utils.context import ContextAssembler
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    """Just enough of AsyncSession for set_content / load_contents."""
+
+    def __init__(self):
+        self.added = []
+        self.next_id = 1
+
+    def add(self, obj):
+        if obj not in self.added:
+            self.added.append(obj)
+
+    async def flush(self):
+        for obj in self.added:
+            if isinstance(obj, Message) and obj.id is None:
+                obj.id = self.next_id
+                self.next_id += 1
+
+    async def execute(self, stmt):
+        # load_contents only selects message bodies
+        return FakeResult([obj for obj in self.added if isinstance(obj, MessageBody)])
+
+
+def pipeline_payload() -> str:
+    requirements = [
+        {"title": f"Requirement {i}", "description": "Hệ thống phải hỗ trợ " + "x" * 200}
+        for i in range(60)
+    ]
+    return json.dumps({
+        "type": "pipeline_result",
+        "project_id": "project_7",
+        "collector": {"chunks": 3, "normalized_chunks": 3, "stories": [{"id": 1}, {"id": 2}]},
+        "analyzer": {"summary": {"total_issues": 4}},
+        "requirements": requirements,
+        "prioritized": {},
+        "report": {"final_report_mermaid": "graph TD; A-->B"},
+    }, ensure_ascii=False)
+
+
+def test_split_content():
+    small = "ngắn"
+    assert split_content(small) == (small, None, None)
+
+    content = pipeline_payload()
+    assert len(content.encode("utf-8")) > settings.MESSAGE_INLINE_MAX_BYTES
+    inline, length, body = split_content(content)
+    assert inline == content[:settings.MESSAGE_PREVIEW_CHARS]
+    assert length == len(content)
+    assert decompress(*body) == content
+
+
+def test_out_of_line_pipeline_result_collapses_in_context():
+    async def run():
+        db = FakeSession()
+        message = Message(role=3, content_type=1, message_type=1, conversation_id=7, status=1)
+        content = pipeline_payload()
+        await set_content(db, message, content)
+
+        # Stored out of line: the row only has the preview, which is not valid JSON
+        assert message.content_length == len(content)
+        assert message.content == content[:settings.MESSAGE_PREVIEW_CHARS]
+        assert [obj for obj in db.added if isinstance(obj, MessageBody)]
+
+        contents = await load_contents(db, [message])
+        assert contents[message.id] == content
+        return message, contents[message.id]
+
+    message, full = asyncio.run(run())
+    text, tokens = ContextAssembler().render_message({"id": message.id, "role": "system", "content": full})
+    assert text.startswith(f"[Pipeline result (message #{message.id}): project=project_7")
+    assert "requirements=60" in text and "issues=4" in text and "diagram=yes" in text
+    assert tokens < 200
+
+
+if __name__ == "__main__":
+    test_split_content()
+    test_out_of_line_pipeline_result_collapses_in_context()
+    print("✅ Out-of-line messages round-trip and collapse in the chat context")
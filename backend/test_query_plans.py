@@ -0,0 +1,208 @@
+"""Query-plan regression check for the hot message and conversation queries.
+
+Runs EXPLAIN on the queries the API and the chat agent issue on every turn
+and fails if any of them falls back to a sequential scan on ``message`` or
+``conversation`` or stops using its partial index (see migration
+3b7d2e9a41c5). Sequential scans are disabled for the transaction so the check
+is meaningful on a small dev database too: if a Seq Scan still shows up,
+no usable index exists. ``message`` is partitioned (a7e3c9d51f42): partitions
+and their indexes are reported under the parent table / index names.
+
+    python test_query_plans.py        # exits 1 on regression
+
+Also collected by pytest (skipped when the database is unreachable).
+"""
+
+import asyncio
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, text, tuple_
+from sqlalchemy.exc import DBAPIError
+from api.core.db import async_session
+from api.core.models import Conversation, Message
+
+HOT_TABLES = {"message", "conversation"}
+
+
+def walk_plan(node: Dict[str, Any]):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree."""
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+async def sample_ids(db) -> Dict[str, int]:
+    """Pick real ids so the planner sees realistic selectivity."""
+    async def most_common(column) -> int:
+        stmt = select(column).where(column.isnot(None)).group_by(column) \
+            .order_by(func.count().desc()).limit(1)
+        return (await db.execute(stmt)).scalar() or 1
+
+    return {
+        "conversation_id": await most_common(Message.conversation_id),
+        "shared_conversation_id": await most_common(Message.shared_conversation_id),
+        "user_id": await most_common(Conversation.user_id),
+        "agent_id": await most_common(Message.agent_id),
+    }
+
+
+def hot_queries(ids: Dict[str, int]) -> List[Tuple[str, Any, str]]:
+    """(label, statement, expected index) for each hot query."""
+    active_messages = select(Message).where(Message.status == 1)
+    msg_order = (Message.created_at.asc(), Message.id.asc())
+    conv_order = (Conversation.created_at.desc(), Conversation.id.desc())
+
+    return [
+        (
+            "messages by conversation (history / first page)",
+            active_messages.where(Message.conversation_id == ids["conversation_id"])
+            .order_by(*msg_order).limit(51),
+            "ix_message_conversation_created_active",
+        ),
+        (
+            "messages by conversation (cursor page)",
+            active_messages.where(
+                Message.conversation_id == ids["conversation_id"],
+                tuple_(Message.created_at, Message.id) > tuple_(func.localtimestamp(), 0)
+            ).order_by(*msg_order).limit(51),
+            "ix_message_conversation_created_active",
+        ),
+        (
+            "messages by shared conversation",
+            active_messages.where(Message.shared_conversation_id == ids["shared_conversation_id"])
+            .order_by(*msg_order).limit(51),
+            "ix_message_shared_conversation_created_active",
+        ),
+        (
+            "messages by user",
+            active_messages.where(Message.user_id == ids["user_id"])
+            .order_by(*msg_order).limit(51),
+            "ix_message_user_created_active",
+        ),
+        (
+            "messages by agent",
+            active_messages.where(Message.agent_id == ids["agent_id"])
+            .order_by(*msg_order).limit(51),
+            "ix_message_agent_created_active",
+        ),
+        (
+            "conversations by user (sidebar)",
+            select(Conversation).where(
+                Conversation.user_id == ids["user_id"],
+                Conversation.status == 1
+            ).order_by(*conv_order).limit(21),
+            "ix_conversation_user_created_active",
+        ),
+        (
+            "conversations with summary embedding (semantic search)",
+            select(Conversation).where(
+                Conversation.user_id == ids["user_id"],
+                Conversation.summary_embedding.isnot(None),
+                Conversation.status == 1
+            ),
+            "ix_conversation_user_embedding_active",
+        ),
+    ]
+
+
+async def explain(db, stmt) -> Dict[str, Any]:
+    sql = str(stmt.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True}))
+    result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def partition_parents(db) -> Dict[str, str]:
+    """Partition / partition index name -> name of the partitioned parent."""
+    result = await db.execute(text(
+        "SELECT c.relname, p.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent"
+    ))
+    return dict(result.all())
+
+
+def check_plan(plan: Dict[str, Any], expected_index: str, parents: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """Return a failure reason, or None if the plan is acceptable."""
+    parents = parents or {}
+    nodes = list(walk_plan(plan))
+    seq_scans = [
+        parents.get(n.get("Relation Name"), n.get("Relation Name")) for n in nodes
+        if n.get("Node Type") == "Seq Scan"
+    ]
+    seq_scans = [name for name in seq_scans if name in HOT_TABLES]
+    if seq_scans:
+        return f"sequential scan on {', '.join(sorted(set(seq_scans)))}"
+    used = {parents.get(n["Index Name"], n["Index Name"]) for n in nodes if n.get("Index Name")}
+    if expected_index not in used:
+        return f"expected {expected_index}, plan uses {sorted(used) or 'no index'}"
+    return None
+
+
+async def check_query_plans(verbose: bool = True) -> List[str]:
+    """Explain every hot query; return the list of failures."""
+    failures = []
+    async with async_session() as db:
+        ids = await sample_ids(db)
+        parents = await partition_parents(db)
+        # Transaction-local: make the planner use any index that applies
+        await db.execute(text("SET LOCAL enable_seqscan = off"))
+        for label, stmt, expected_index in hot_queries(ids):
+            plan = await explain(db, stmt)
+            reason = check_plan(plan, expected_index, parents)
+            if verbose:
+                print(f"{'✅' if reason is None else '❌'} {label}")
+                if reason:
+                    print(f"   {reason}")
+            if reason:
+                failures.append(f"{label}: {reason}")
+        await db.rollback()
+    return failures
+
+
+def connection_errors() -> Tuple[type, ...]:
+    """Exceptions meaning the database cannot be reached (down, bad credentials, missing DB)."""
+    errors: Tuple[type, ...] = (OSError, asyncio.TimeoutError, DBAPIError)
+    try:
+        import asyncpg
+    except ImportError:
+        return errors
+    return errors + (asyncpg.PostgresError, asyncpg.InterfaceError)
+
+
+async def database_unreachable() -> Optional[str]:
+    """Reason the database cannot be used, or None if a trivial query works."""
+    try:
+        async with async_session() as db:
+            await db.execute(text("SELECT 1"))
+    except connection_errors() as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def test_hot_queries_use_indexes():
+    """pytest entry point."""
+    import pytest
+
+    async def run() -> Tuple[Optional[str], List[str]]:
+        # Only connection problems skip; errors in the checked queries still fail
+        reason = await database_unreachable()
+        if reason:
+            return reason, []
+        return None, await check_query_plans(verbose=False)
+
+    reason, failures = asyncio.run(run())
+    if reason:
+        pytest.skip(f"database unreachable: {reason}")
+    assert not failures, "\n".join(failures)
+
+
+if __name__ == "__main__":
+    failures = asyncio.run(check_query_plans())
+    if failures:
+        print(f"\n❌ {len(failures)} hot quer{'y' if len(failures) == 1 else 'ies'} regressed")
+        sys.exit(1)
+    print("\n✅ All hot queries use their indexes")
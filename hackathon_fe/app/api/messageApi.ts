@@ -43,11 +43,19 @@ export const messageApi = {
     await axiosInstance.delete(`/messages/${messageId}`);
   },
 
+  // GET /messages/{message_id}/content - Full content of a large message
+  getContent: async (messageId: string): Promise<string> => {
+    const response = await axiosInstance.get<{ id: number; content: string }>(`/messages/${messageId}/content`);
+    return response.data.content;
+  },
+
   // GET /messages/conversation/{conversation_id} - Get Conversation Messages (with pagination)
   getByConversationId: async (conversationId: string, skip: number = 0, limit: number = 50): Promise<Message[]> => {
     const response = await axiosInstance.get<Message[]>(`/messages/conversation/${conversationId}`, {
       params: { skip, limit }
     });
+    // Large messages come as previews (content_external); the chat view
+    // fetches their full content with getContent when one is expanded
     return response.data;
   },
 
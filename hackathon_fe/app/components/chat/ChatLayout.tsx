@@ -20,6 +20,9 @@ export type Message = {
   role: "user" | "assistant";
   content: string;
   time?: string;
+  // `content` is only a preview; the full text is fetched on expand
+  contentExternal?: boolean;
+  contentLength?: number | null;
 };
 
 export default function ChatLayout() {
@@ -192,6 +195,8 @@ export default function ChatLayout() {
           role: msg.user_id ? 'user' : 'assistant',
           content: msg.content,
           time: new Date(msg.created_at).toLocaleTimeString(),
+          contentExternal: msg.content_external,
+          contentLength: msg.content_length,
         }));
         
         setMessages(uiMessages);
@@ -249,6 +254,8 @@ export default function ChatLayout() {
           role: msg.user_id ? 'user' : 'assistant',
           content: msg.content,
           time: new Date(msg.created_at).toLocaleTimeString(),
+          contentExternal: msg.content_external,
+          contentLength: msg.content_length,
         }));
         
         // Prepend older messages to the beginning
@@ -262,6 +269,18 @@ export default function ChatLayout() {
     }
   }, [currentConversationId, loadingMessages, hasMoreMessages, messagePage, MESSAGES_PER_PAGE]);
 
+  // Fetch the full content of a large message when the user expands it
+  const expandMessage = useCallback(async (messageId: string) => {
+    try {
+      const content = await messageApi.getContent(messageId);
+      setMessages(prev => prev.map(msg =>
+        msg.id === messageId ? { ...msg, content, contentExternal: false } : msg
+      ));
+    } catch (error) {
+      console.error('Failed to load full message:', error);
+    }
+  }, []);
+
   // Auto scroll khi có messages mới
   useEffect(() => {
     bottomRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -474,6 +493,7 @@ export default function ChatLayout() {
               loadingMore={loadingMessages}
               hasMore={hasMoreMessages}
               onLoadMore={loadMoreMessages}
+              onExpandMessage={expandMessage}
             />
           )}
         </div>
@@ -1,6 +1,6 @@
 "use client";
 
-import React, { useEffect, useRef } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { Message } from "./ChatLayout";
 import { Bot, User } from "lucide-react";
 import TypingIndicator from "./TypingIndicator";
@@ -13,6 +13,7 @@ export default function ChatMessageList({
   loadingMore,
   hasMore,
   onLoadMore,
+  onExpandMessage,
 }: {
   messages: Message[];
   isLoading: boolean;
@@ -21,8 +22,20 @@ export default function ChatMessageList({
   loadingMore?: boolean;
   hasMore?: boolean;
   onLoadMore?: () => void;
+  onExpandMessage?: (messageId: string) => Promise<void>;
 }) {
   const containerRef = useRef<HTMLDivElement | null>(null);
+  const [expanding, setExpanding] = useState<string | null>(null);
+
+  const handleExpand = async (messageId: string) => {
+    if (!onExpandMessage || expanding) return;
+    setExpanding(messageId);
+    try {
+      await onExpandMessage(messageId);
+    } finally {
+      setExpanding(null);
+    }
+  };
   const topSentinelRef = useRef<HTMLDivElement | null>(null);
 
   useEffect(() => {
@@ -86,6 +99,21 @@ export default function ChatMessageList({
                 : "bg-[#1a1f2e] text-gray-100 border border-blue-900/30"
             }`}>
               {msg.content || (msg.role === "assistant" ? "…" : "")}
+              {msg.contentExternal && (
+                <>
+                  {"…"}
+                  <button
+                    type="button"
+                    onClick={() => handleExpand(msg.id)}
+                    disabled={expanding === msg.id}
+                    className="block mt-2 text-xs text-blue-400 hover:text-blue-300 disabled:opacity-50"
+                  >
+                    {expanding === msg.id
+                      ? "Loading..."
+                      : `Show full message${msg.contentLength ? ` (${msg.contentLength.toLocaleString()} chars)` : ""}`}
+                  </button>
+                </>
+              )}
             </div>
             {msg.time && (
               <div className={`text-xs text-gray-500 mt-2 ${msg.role === "user" ? "text-right" : "text-left"}`}>
@@ -1,3 +1,13 @@
+export type ConversationOverview = {
+    message_count: number
+    user_message_count: number
+    agent_message_count: number
+    last_message_at?: string | null
+    last_message_preview?: string | null
+    last_message_role?: number | null
+    active_agent_id?: number | null
+}
+
 export type Conversation = {
     id: string
     name: string
@@ -9,4 +19,8 @@ export type Conversation = {
     summary?: string
     summary_embedding: Float32Array
     session: string 
+    // set while the messages are archived; restored when the chat is reopened
+    archived_at?: string | null
+    // only returned by GET /conversations/user/{user_id}
+    overview?: ConversationOverview | null
 }
\ No newline at end of file
@@ -12,4 +12,7 @@ export type Message = {
     content: string
     content_type: number
     message_type: number
+    // true when `content` is only a preview of a large message
+    content_external?: boolean
+    content_length?: number | null
 }